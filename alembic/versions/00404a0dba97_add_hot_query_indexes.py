@@ -0,0 +1,55 @@
+"""add partial and covering indexes for showcase and catalog
+
+Revision ID: 00404a0dba97
+Revises: 97be33623b4e
+Create Date: 2026-03-04 18:42:07.118230
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '00404a0dba97'
+down_revision: Union[str, Sequence[str], None] = '97be33623b4e'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Сортировки каталога и трендов: направление и NULLS LAST совпадают с ORDER BY в запросах
+    op.create_index('idx_games_current_online_desc', 'games',
+                    [sa.text('current_online DESC NULLS LAST'), sa.text('id DESC')], unique=False)
+    op.create_index('idx_games_release_date_desc', 'games',
+                    [sa.text('release_date DESC NULLS LAST'), sa.text('id DESC')], unique=False)
+    op.create_index('idx_games_avg_rating_desc', 'games',
+                    [sa.text('avg_rating DESC NULLS LAST'), sa.text('id DESC')], unique=False)
+    op.create_index('idx_games_price_asc', 'games',
+                    [sa.text('price ASC NULLS LAST'), sa.text('id ASC')], unique=False)
+    op.create_index('idx_games_price_desc', 'games',
+                    [sa.text('price DESC NULLS LAST'), sa.text('id DESC')], unique=False)
+    op.create_index('idx_games_title_asc', 'games',
+                    [sa.text('title ASC NULLS LAST'), sa.text('id ASC')], unique=False)
+
+    # Частичные индексы витрины: "Новинки" (is_available) и "Скоро" (not is_available)
+    op.create_index('idx_games_released_release_date', 'games',
+                    [sa.text('release_date DESC NULLS LAST'), sa.text('id DESC')], unique=False,
+                    postgresql_where=sa.text('is_available = true'))
+    op.create_index('idx_games_upcoming_release_date', 'games',
+                    [sa.text('release_date ASC NULLS LAST'), sa.text('id ASC')], unique=False,
+                    postgresql_where=sa.text('is_available = false'))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('idx_games_upcoming_release_date', table_name='games')
+    op.drop_index('idx_games_released_release_date', table_name='games')
+    op.drop_index('idx_games_title_asc', table_name='games')
+    op.drop_index('idx_games_price_desc', table_name='games')
+    op.drop_index('idx_games_price_asc', table_name='games')
+    op.drop_index('idx_games_avg_rating_desc', table_name='games')
+    op.drop_index('idx_games_release_date_desc', table_name='games')
+    op.drop_index('idx_games_current_online_desc', table_name='games')
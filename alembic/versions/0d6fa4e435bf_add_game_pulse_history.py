@@ -0,0 +1,56 @@
+"""add game pulse history and rollups
+
+Revision ID: 0d6fa4e435bf
+Revises: bdbfcf181255
+Create Date: 2026-03-09 20:15:33.907514
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0d6fa4e435bf'
+down_revision: Union[str, Sequence[str], None] = 'bdbfcf181255'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('game_pulse_history',
+    sa.Column('game_id', sa.Integer(), nullable=False),
+    sa.Column('recorded_at', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('current_online', sa.Integer(), nullable=True),
+    sa.Column('price', sa.Float(), nullable=True),
+    sa.ForeignKeyConstraint(['game_id'], ['games.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('game_id', 'recorded_at')
+    )
+    op.create_index('idx_game_pulse_history_recorded_at', 'game_pulse_history', ['recorded_at'],
+                    unique=False, postgresql_using='brin')
+
+    op.create_table('game_pulse_rollup',
+    sa.Column('game_id', sa.Integer(), nullable=False),
+    sa.Column('resolution', sa.String(length=4), nullable=False),
+    sa.Column('bucket', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('online_avg', sa.Float(), nullable=True),
+    sa.Column('online_max', sa.Integer(), nullable=True),
+    sa.Column('price_min', sa.Float(), nullable=True),
+    sa.Column('price_max', sa.Float(), nullable=True),
+    sa.Column('price_last', sa.Float(), nullable=True),
+    sa.Column('samples', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['game_id'], ['games.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('game_id', 'resolution', 'bucket')
+    )
+    op.create_index('idx_game_pulse_rollup_resolution_bucket', 'game_pulse_rollup',
+                    ['resolution', 'bucket'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('idx_game_pulse_rollup_resolution_bucket', table_name='game_pulse_rollup')
+    op.drop_table('game_pulse_rollup')
+    op.drop_index('idx_game_pulse_history_recorded_at', table_name='game_pulse_history')
+    op.drop_table('game_pulse_history')
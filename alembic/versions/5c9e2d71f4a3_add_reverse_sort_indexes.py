@@ -0,0 +1,36 @@
+"""add indexes for reverse catalog sort directions
+
+Revision ID: 5c9e2d71f4a3
+Revises: b61e0f3c8a2d
+Create Date: 2026-03-19 14:37:52.604118
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5c9e2d71f4a3'
+down_revision: Union[str, Sequence[str], None] = 'b61e0f3c8a2d'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Обратный проход существующих индексов даёт NULLS FIRST, а каталог всегда сортирует NULLS LAST
+    op.create_index('idx_games_release_date_asc', 'games',
+                    [sa.text('release_date ASC NULLS LAST'), sa.text('id ASC')], unique=False)
+    op.create_index('idx_games_avg_rating_asc', 'games',
+                    [sa.text('avg_rating ASC NULLS LAST'), sa.text('id ASC')], unique=False)
+    op.create_index('idx_games_title_desc', 'games',
+                    [sa.text('title DESC NULLS LAST'), sa.text('id DESC')], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('idx_games_title_desc', table_name='games')
+    op.drop_index('idx_games_avg_rating_asc', table_name='games')
+    op.drop_index('idx_games_release_date_asc', table_name='games')
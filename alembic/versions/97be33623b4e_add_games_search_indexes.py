@@ -0,0 +1,93 @@
+"""add games search indexes (trigram + tsvector)
+
+Revision ID: 97be33623b4e
+Revises: f13f9faf1a83
+Create Date: 2026-03-02 12:10:41.512804
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = '97be33623b4e'
+down_revision: Union[str, Sequence[str], None] = 'f13f9faf1a83'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Вектор собирается из названия (вес A, без стемминга — чтобы работало на любом языке)
+# и описаний из game_details (en — английский стеммер, ru — русский, вес B).
+BUILD_VECTOR_SQL = """
+CREATE OR REPLACE FUNCTION games_build_search_vector(p_game_id integer, p_title text)
+RETURNS tsvector AS $$
+    SELECT setweight(to_tsvector('simple', coalesce(p_title, '')), 'A')
+        || setweight(to_tsvector('english', coalesce(d.description->>'en', '')), 'B')
+        || setweight(to_tsvector('russian', coalesce(d.description->>'ru', '')), 'B')
+    FROM (SELECT 1) AS one
+    LEFT JOIN game_details d ON d.game_id = p_game_id;
+$$ LANGUAGE sql STABLE;
+"""
+
+GAMES_TRIGGER_SQL = """
+CREATE OR REPLACE FUNCTION games_search_vector_trigger() RETURNS trigger AS $$
+BEGIN
+    NEW.search_vector := games_build_search_vector(NEW.id, NEW.title);
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER trg_games_search_vector
+    BEFORE INSERT OR UPDATE OF title ON games
+    FOR EACH ROW EXECUTE FUNCTION games_search_vector_trigger();
+"""
+
+DETAILS_TRIGGER_SQL = """
+CREATE OR REPLACE FUNCTION game_details_search_vector_trigger() RETURNS trigger AS $$
+BEGIN
+    UPDATE games SET search_vector = games_build_search_vector(id, title)
+    WHERE id = NEW.game_id;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER trg_game_details_search_vector
+    AFTER INSERT OR UPDATE OF description ON game_details
+    FOR EACH ROW EXECUTE FUNCTION game_details_search_vector_trigger();
+"""
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+
+    op.add_column('games', sa.Column('search_vector', postgresql.TSVECTOR(), nullable=True))
+
+    op.execute(BUILD_VECTOR_SQL)
+    op.execute(GAMES_TRIGGER_SQL)
+    op.execute(DETAILS_TRIGGER_SQL)
+
+    # Заполняем вектор для уже существующих игр
+    op.execute("UPDATE games SET search_vector = games_build_search_vector(id, title)")
+
+    op.create_index('idx_games_search_vector', 'games', ['search_vector'],
+                    unique=False, postgresql_using='gin')
+    op.create_index('idx_games_title_trgm', 'games', ['title'],
+                    unique=False, postgresql_using='gin',
+                    postgresql_ops={'title': 'gin_trgm_ops'})
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('idx_games_title_trgm', table_name='games')
+    op.drop_index('idx_games_search_vector', table_name='games')
+
+    op.execute("DROP TRIGGER IF EXISTS trg_game_details_search_vector ON game_details")
+    op.execute("DROP TRIGGER IF EXISTS trg_games_search_vector ON games")
+    op.execute("DROP FUNCTION IF EXISTS game_details_search_vector_trigger()")
+    op.execute("DROP FUNCTION IF EXISTS games_search_vector_trigger()")
+    op.execute("DROP FUNCTION IF EXISTS games_build_search_vector(integer, text)")
+
+    op.drop_column('games', 'search_vector')
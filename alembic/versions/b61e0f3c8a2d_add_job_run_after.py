@@ -0,0 +1,28 @@
+"""add run_after to jobs
+
+Revision ID: b61e0f3c8a2d
+Revises: eda37e31e150
+Create Date: 2026-03-19 09:12:04.318527
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b61e0f3c8a2d'
+down_revision: Union[str, Sequence[str], None] = 'eda37e31e150'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('jobs', sa.Column('run_after', sa.DateTime(timezone=True), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('jobs', 'run_after')
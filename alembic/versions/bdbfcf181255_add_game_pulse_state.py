@@ -0,0 +1,37 @@
+"""add game pulse state (tiered pulse scheduling)
+
+Revision ID: bdbfcf181255
+Revises: 00404a0dba97
+Create Date: 2026-03-07 11:03:52.640119
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'bdbfcf181255'
+down_revision: Union[str, Sequence[str], None] = '00404a0dba97'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('game_pulse_state',
+    sa.Column('game_id', sa.Integer(), nullable=False),
+    sa.Column('tier', sa.SmallInteger(), nullable=False),
+    sa.Column('last_refresh_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('next_refresh_at', sa.DateTime(timezone=True), nullable=True),
+    sa.ForeignKeyConstraint(['game_id'], ['games.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('game_id')
+    )
+    op.create_index('idx_game_pulse_state_next_refresh', 'game_pulse_state', ['next_refresh_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('idx_game_pulse_state_next_refresh', table_name='game_pulse_state')
+    op.drop_table('game_pulse_state')
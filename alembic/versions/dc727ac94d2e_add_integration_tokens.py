@@ -0,0 +1,34 @@
+"""add integration tokens (shared IGDB OAuth token)
+
+Revision ID: dc727ac94d2e
+Revises: 690c9b38b8a2
+Create Date: 2026-03-16 11:05:42.918204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'dc727ac94d2e'
+down_revision: Union[str, Sequence[str], None] = '690c9b38b8a2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('integration_tokens',
+    sa.Column('name', sa.String(length=50), nullable=False),
+    sa.Column('access_token', sa.Text(), nullable=False),
+    sa.Column('expires_at', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('NOW()'), nullable=True),
+    sa.PrimaryKeyConstraint('name')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('integration_tokens')
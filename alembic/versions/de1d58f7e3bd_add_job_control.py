@@ -0,0 +1,34 @@
+"""add job control (cross-process job coordination)
+
+Revision ID: de1d58f7e3bd
+Revises: 0d6fa4e435bf
+Create Date: 2026-03-11 14:27:09.381552
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'de1d58f7e3bd'
+down_revision: Union[str, Sequence[str], None] = '0d6fa4e435bf'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('job_control',
+    sa.Column('name', sa.String(length=50), nullable=False),
+    sa.Column('owner', sa.String(length=100), nullable=True),
+    sa.Column('started_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('stop_requested', sa.Boolean(), nullable=False),
+    sa.PrimaryKeyConstraint('name')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('job_control')
@@ -0,0 +1,40 @@
+"""add progress, checkpoint and cancellation to jobs
+
+Revision ID: eda37e31e150
+Revises: dc727ac94d2e
+Create Date: 2026-03-18 10:21:37.640915
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = 'eda37e31e150'
+down_revision: Union[str, Sequence[str], None] = 'dc727ac94d2e'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('jobs', sa.Column('total', sa.Integer(), nullable=True))
+    op.add_column('jobs', sa.Column('processed', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('jobs', sa.Column('failed', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('jobs', sa.Column('rate', sa.Float(), nullable=True))
+    op.add_column('jobs', sa.Column('checkpoint', postgresql.JSONB(astext_type=sa.Text()), nullable=True))
+    op.add_column('jobs', sa.Column('cancel_requested', sa.Boolean(), server_default='false', nullable=False))
+    op.add_column('jobs', sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('jobs', 'updated_at')
+    op.drop_column('jobs', 'cancel_requested')
+    op.drop_column('jobs', 'checkpoint')
+    op.drop_column('jobs', 'rate')
+    op.drop_column('jobs', 'failed')
+    op.drop_column('jobs', 'processed')
+    op.drop_column('jobs', 'total')
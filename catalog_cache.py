@@ -0,0 +1,111 @@
+import threading
+import time
+import logging
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger("catalog_cache")
+
+# Поколение каталога: увеличивается при любом изменении игр (создание, импорт, Game Pulse, релизы).
+# Все записи кэша, сохранённые в старом поколении, считаются устаревшими.
+_lock = threading.Lock()
+_generation = 0
+_entries: Dict[Any, tuple] = {}
+
+DEFAULT_TTL_SECONDS = 300
+MAX_ENTRIES = 1024
+
+
+def get_generation() -> int:
+    return _generation
+
+
+def invalidate_catalog(reason: str = "") -> int:
+    """Сбрасывает кэш каталога. Возвращает новое поколение."""
+    global _generation
+    with _lock:
+        _generation += 1
+        _entries.clear()
+        logger.info(f"Кэш каталога сброшен (поколение {_generation}). Причина: {reason or '-'}")
+        return _generation
+
+
+# === СОБЫТИЯ ИЗМЕНЕНИЯ КАТАЛОГА ===
+# Подписчики (например, пересборка снимка витрины) получают (событие, данные)
+# после сброса кэша. Ошибка одного подписчика не мешает остальным.
+_listeners: List[Callable[[str, dict], None]] = []
+
+
+def add_catalog_listener(callback: Callable[[str, dict], None]) -> None:
+    with _lock:
+        if callback not in _listeners:
+            _listeners.append(callback)
+
+
+def emit_catalog_event(event: str, **data) -> int:
+    """Сбрасывает кэш каталога и оповещает подписчиков. Возвращает новое поколение."""
+    generation = invalidate_catalog(event)
+    for callback in list(_listeners):
+        try:
+            callback(event, data)
+        except Exception as e:
+            logger.error(f"Подписчик события {event} упал: {e}")
+    return generation
+
+
+def get_cached(key: Any) -> Optional[Any]:
+    entry = _entries.get(key)
+    if entry is None:
+        return None
+
+    generation, expires_at, value = entry
+    if generation != _generation or expires_at < time.monotonic():
+        _entries.pop(key, None)
+        return None
+    return value
+
+
+def set_cached(key: Any, value: Any, generation: int, ttl: int = DEFAULT_TTL_SECONDS) -> None:
+    """
+    Сохраняет значение, посчитанное в поколении generation.
+    Если каталог успел измениться за время расчёта — значение не кэшируется.
+    """
+    with _lock:
+        if generation != _generation:
+            return
+        if len(_entries) >= MAX_ENTRIES:
+            _entries.clear()
+        _entries[key] = (generation, time.monotonic() + ttl, value)
+
+
+# === СНИМОК ВИТРИНЫ (главная страница) ===
+# Готовый JSON подборок. Каталог меняет воркер (пульс, релизы, импорт), а отдают его
+# API-процессы: каждый пересобирает свой снимок по событию из канала catalog_events
+# (scripts/catalog_events.py). SHOWCASE_MAX_AGE_SECONDS — страховка на случай потери события.
+SHOWCASE_MAX_AGE_SECONDS = 120
+_showcase_snapshot: Optional[tuple] = None
+_showcase_built_at = 0.0
+_showcase_generation = 0
+
+
+def get_showcase_snapshot() -> Optional[tuple]:
+    """Возвращает (поколение, JSON-байты) или None, если снимка нет или он устарел."""
+    if time.monotonic() - _showcase_built_at > SHOWCASE_MAX_AGE_SECONDS:
+        return None
+    return _showcase_snapshot
+
+
+def set_showcase_snapshot(payload: bytes) -> int:
+    """Публикует новый снимок витрины. Возвращает его поколение."""
+    global _showcase_snapshot, _showcase_generation, _showcase_built_at
+    with _lock:
+        _showcase_generation += 1
+        _showcase_built_at = time.monotonic()
+        _showcase_snapshot = (_showcase_generation, payload)
+        return _showcase_generation
+
+
+def drop_showcase_snapshot() -> None:
+    """Помечает снимок витрины устаревшим: следующий запрос пересоберёт его из БД."""
+    global _showcase_snapshot
+    with _lock:
+        _showcase_snapshot = None
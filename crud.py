@@ -1,6 +1,14 @@
+import base64
+import json
+import operator
+import re
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
 from typing import Any, Dict, Generic, List, Optional, Type, TypeVar, Union
-from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import func
+from sqlalchemy.orm import Session, joinedload, selectinload
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy import text, func, and_, or_, select, insert, update, values, column, case, cast, literal, union_all, tuple_, String, Integer, Float, DateTime
 from fastapi.encoders import jsonable_encoder
 from pydantic import BaseModel
 
@@ -11,10 +19,18 @@ from models.game_details import GameDetails
 from models.developers import Developer
 from models.genre import Genre
 from models.game_genre import GameGenre
+from models.platform import Platform
+from models.game_platform import GamePlatform
 from models.user_game_status import UserGameStatus
+from models.game_pulse_state import GamePulseState
+from models.game_pulse_history import GamePulseHistory
+from models.game_pulse_rollup import GamePulseRollup
 
 from auth import get_password_hash
-from schemas import GameCreate, GameUpdate, UserGameStatusCreate
+from catalog_cache import invalidate_catalog
+from scripts.catalog_events import publish_catalog_event
+from dimension_cache import NameIdCache, developer_ids, genre_ids, remember_after_commit
+from schemas import GameCreate, GameUpdate, UserGameStatusCreate, ShowcaseResponse
 
 # === БАЗОВЫЕ ТИПЫ ДЛЯ ГЕНЕРИКОВ ===
 ModelType = TypeVar("ModelType", bound=Base)
@@ -70,66 +86,512 @@ class CRUDUser(CRUDBase[User, BaseModel, BaseModel]):
 # ==========================================
 # РЕПОЗИТОРИЙ ИГР
 # ==========================================
+# Приоритеты Game Pulse: tier -> интервал обновления в минутах
+PULSE_TIER_MINUTES = {0: 5, 1: 60, 2: 24 * 60}
+PULSE_HOT_ONLINE, PULSE_WARM_ONLINE = 1000, 50        # текущий онлайн
+PULSE_HOT_LISTS, PULSE_WARM_LISTS = 50, 5             # в скольких списках пользователей игра
+PULSE_HOT_RELEASE_DAYS, PULSE_WARM_RELEASE_DAYS = 30, 180
+
+# Сортировки каталога (sort_by=relevance — отдельно, только вместе с search)
+SORT_FIELDS = ("release_date", "rating", "title", "price", "current_online")
+SORT_ORDERS = ("asc", "desc")
+# Направления без своего индекса (идут через Sort): current_online меняется каждые
+# несколько минут у тысяч игр, второй индекс по нему удвоил бы запись Game Pulse ради
+# сортировки "меньше всего играющих", которой витрина не пользуется
+UNINDEXED_SORTS = {("current_online", "asc")}
+
+# Колонки, которые реально отдаются в GameResponse (без HLTB, search_vector и т.п.)
+LIST_COLUMNS = (
+    Game.id, Game.title, Game.release_date, Game.dev_game, Game.price, Game.platforms,
+    Game.avg_rating, Game.cover_url, Game.steam_app_id, Game.current_online
+)
+
 class CRUDGame(CRUDBase[Game, GameCreate, GameUpdate]):
     def get_by_title(self, db: Session, title: str) -> Optional[Game]:
         return db.query(self.model).filter(Game.title == title).first()
 
-    def get_multi(
-        self, db: Session, skip: int = 0, limit: int = 100,
+    def get_order_col(self, sort_by: str):
+        """Колонка сортировки по значению параметра sort_by."""
+        if sort_by == "rating":
+            return Game.avg_rating
+        elif sort_by == "price":
+            return Game.price
+        elif sort_by == "title":
+            return Game.title
+        elif sort_by == "current_online":
+            return Game.current_online
+        return Game.release_date
+
+    def get_search_clause(self, search: str) -> tuple:
+        """
+        Условие и ранг полнотекстового поиска.
+        Совпадение — по tsvector (название + описания en/ru), по триграммной похожести
+        названия (опечатки) или по подстроке. Все три ветки покрыты GIN-индексами.
+        """
+        ts_query = func.plainto_tsquery("simple", search) \
+            .op("||")(func.plainto_tsquery("english", search)) \
+            .op("||")(func.plainto_tsquery("russian", search))
+
+        condition = or_(
+            Game.search_vector.op("@@")(ts_query),
+            Game.title.op("%")(search),
+            Game.title.ilike(f"%{search}%")
+        )
+        rank = func.ts_rank(Game.search_vector, ts_query) + func.similarity(Game.title, search)
+        return condition, rank
+
+    def encode_cursor(self, game_obj: Union[Game, dict], sort_by: str) -> str:
+        """Непрозрачный курсор (значение колонки сортировки + id) для следующей страницы."""
+        key = self.get_order_col(sort_by).key
+        if isinstance(game_obj, dict):
+            value, game_id = game_obj[key], game_obj["id"]
+        else:
+            value, game_id = getattr(game_obj, key), game_obj.id
+        if isinstance(value, datetime):
+            value = value.isoformat()
+        elif isinstance(value, Decimal):
+            value = str(value)
+        raw = json.dumps({"s": sort_by, "v": value, "id": game_id})
+        return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+    def decode_cursor(self, cursor: str, sort_by: str) -> tuple:
+        """
+        Разбирает курсор. Курсор приходит от клиента, поэтому тип значения проверяется
+        по колонке сортировки. При битом курсоре или смене sort_by бросает ValueError.
+        """
+        try:
+            data = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+            last_id, value, cursor_sort = data["id"], data["v"], data.get("s")
+            if not isinstance(last_id, int) or isinstance(last_id, bool):
+                raise TypeError("id")
+            if cursor_sort == sort_by:
+                value = self._parse_cursor_value(self.get_order_col(sort_by), value)
+        except Exception:
+            raise ValueError("Invalid cursor")
+
+        if cursor_sort != sort_by:
+            raise ValueError("Cursor does not match sort_by")
+        return value, last_id
+
+    @staticmethod
+    def _parse_cursor_value(order_col, value):
+        """Значение колонки сортировки из курсора в тип колонки (иначе ValueError)."""
+        if value is None:
+            return None
+        is_number = isinstance(value, (int, float)) and not isinstance(value, bool)
+
+        if order_col is Game.avg_rating and (is_number or isinstance(value, str)):
+            value = Decimal(str(value))
+            if value.is_finite():
+                return value
+        elif order_col is Game.release_date and isinstance(value, str):
+            return datetime.fromisoformat(value)
+        elif order_col is Game.price and is_number:
+            value = float(value)
+            if value == value and abs(value) != float("inf"):
+                return value
+        elif order_col is Game.current_online and isinstance(value, int) and not isinstance(value, bool):
+            return value
+        elif order_col is Game.title and isinstance(value, str):
+            return value
+        raise ValueError("Invalid cursor")
+
+    def apply_filters(
+        self, query,
         search: Optional[str] = None,
-
         genre_name: Optional[str] = None,
         platform_name: Optional[str] = None,
-        sort_by: str = "release_date",
-        sort_order: str = "desc"
-    ) -> List[Game]:
-        # Базовый запрос
-        query = db.query(self.model).options(
-            joinedload(Game.developer),
-            joinedload(Game.genre_associations).joinedload(GameGenre.genre)
-        )
-
-        # 1. Поиск по названию игры
+        platform_mode: str = "any"
+    ) -> tuple:
+        """Накладывает фильтры каталога на запрос. Возвращает (запрос, ранг поиска или None)."""
+        # 1. Поиск по названию и описанию игры
+        rank = None
         if search:
-            query = query.filter(Game.title.ilike(f"%{search}%"))
-
+            condition, rank = self.get_search_clause(search)
+            query = query.filter(condition)
 
         # 2. Фильтр по НАЗВАНИЮ жанра (или Steam-тегу)
+        # EXISTS вместо JOIN: строки игр не размножаются по числу жанров
         if genre_name:
-            query = query.join(GameGenre)
-            query = query.join(Genre).filter(Genre.name.ilike(f"%{genre_name}%"))
+            query = query.filter(
+                Game.genre_associations.any(GameGenre.genre.has(Genre.name.ilike(f"%{genre_name}%")))
+            )
 
-        # 3. Фильтр по Платформе
+        # 3. Фильтр по Платформе (через game_platforms, точное совпадение имени)
+        # "PC,PS5" + mode="any" — хотя бы одна; mode="all" — все сразу
         if platform_name:
-            query = query.filter(Game.platforms.ilike(f"%{platform_name}%"))
-
-        # 4. СОРТИРОВКА
-        if sort_by == "rating":
-            order_col = Game.avg_rating
-        elif sort_by == "price":
-            order_col = Game.price
-        elif sort_by == "title":
-            order_col = Game.title
-        elif sort_by == "current_online":
-            order_col = Game.current_online
-        else:
-            order_col = Game.release_date
+            names = [name.lower() for name in parse_platforms(platform_name)]
+            if platform_mode == "all":
+                for name in names:
+                    query = query.filter(Game.platform_associations.any(
+                        GamePlatform.platform_id.in_(
+                            select(Platform.id).where(func.lower(Platform.name) == name)
+                        )
+                    ))
+            elif names:
+                query = query.filter(Game.platform_associations.any(
+                    GamePlatform.platform_id.in_(
+                        select(Platform.id).where(func.lower(Platform.name).in_(names))
+                    )
+                ))
+
+        return query, rank
+
+    def get_page_ids(self, db: Session, **filters) -> List[int]:
+        """
+        Фаза 1 листинга: только id игр страницы, с фильтрами и сортировкой.
+        Keyset-страница идёт в два шага: сначала игры с непустым значением сортировки,
+        и только если их не хватило на страницу — хвост с NULL (он всегда в конце).
+        """
+        ids = [row[0] for row in self.page_ids_query(db, **filters).all()]
+        limit = filters.get("limit", 100)
+        if filters.get("cursor") and 0 < limit - len(ids) and not filters.get("null_tail"):
+            last_value, _ = self.decode_cursor(filters["cursor"], filters.get("sort_by", "release_date"))
+            if last_value is not None:
+                tail = self.page_ids_query(db, **{**filters, "limit": limit - len(ids), "null_tail": True})
+                ids += [row[0] for row in tail.all()]
+        return ids
+
+    def page_ids_query(
+        self, db: Session, skip: int = 0, limit: int = 100,
+        search: Optional[str] = None,
+        genre_name: Optional[str] = None,
+        platform_name: Optional[str] = None,
+        platform_mode: str = "any",
+        sort_by: str = "release_date",
+        sort_order: str = "desc",
+        cursor: Optional[str] = None,
+        null_tail: bool = False
+    ):
+        """
+        Запрос фазы 1 (без выполнения) — его же проверяет tests/test_query_plans.py.
+        null_tail=True — продолжение keyset-страницы: игры с NULL в колонке сортировки.
+        """
+        query, rank = self.apply_filters(db.query(Game.id), search, genre_name, platform_name, platform_mode)
+
+        # 4. СОРТИРОВКА (id — тай-брейкер, чтобы порядок был стабильным)
+        if sort_by == "relevance" and rank is not None:
+            if cursor:
+                raise ValueError("Cursor pagination is not supported for sort_by=relevance")
+            return query.order_by(rank.desc(), Game.id.desc()).offset(skip).limit(limit)
+
+        order_col = self.get_order_col(sort_by)
 
         # Направление сортировки
         if sort_order == "asc":
-            query = query.order_by(order_col.asc().nullslast())
+            query = query.order_by(order_col.asc().nullslast(), Game.id.asc())
         else:
-            query = query.order_by(order_col.desc().nullslast())
+            query = query.order_by(order_col.desc().nullslast(), Game.id.desc())
+
+        # 5. KEYSET-ПАГИНАЦИЯ: продолжаем строго после (значение, id) из курсора.
+        # Сравнение строк (col, id) > (v, id) — одно Index Cond по индексу (col, id);
+        # NULL в нём не проходит, поэтому хвост с NULL — отдельный запрос (null_tail, см. get_page_ids)
+        if cursor:
+            last_value, last_id = self.decode_cursor(cursor, sort_by)
+            after = operator.gt if sort_order == "asc" else operator.lt
+
+            if last_value is None:
+                query = query.filter(order_col.is_(None), after(Game.id, last_id))
+            elif null_tail:
+                query = query.filter(order_col.is_(None))
+            else:
+                query = query.filter(after(tuple_(order_col, Game.id), tuple_(last_value, last_id)))
+            return query.limit(limit)
+
+        return query.offset(skip).limit(limit)
+
+    def get_by_ids(self, db: Session, ids: List[int]) -> List[Game]:
+        """
+        Фаза 2 листинга: загружает игры по списку id в том же порядке.
+        Разработчики и жанры подтягиваются отдельными IN-запросами (selectinload),
+        поэтому число строк пропорционально размеру страницы.
+        """
+        if not ids:
+            return []
+
+        games = db.query(self.model).options(
+            selectinload(Game.developer),
+            selectinload(Game.genre_associations).selectinload(GameGenre.genre)
+        ).filter(Game.id.in_(ids)).all()
+
+        by_id = {g.id: g for g in games}
+        return [by_id[game_id] for game_id in ids if game_id in by_id]
+
+    def get_list_items(self, db: Session, ids: List[int]) -> List[dict]:
+        """
+        Быстрый путь для списков: без ORM-объектов, только колонки из GameResponse.
+        Игры + разработчик — одним SELECT (LEFT JOIN, один к одному),
+        жанры — одним IN-запросом по всем id. Порядок id сохраняется.
+        """
+        if not ids:
+            return []
+
+        rows = db.execute(
+            select(*LIST_COLUMNS, Developer.title.label("developer_title"))
+            .outerjoin(Developer, Developer.id == Game.dev_game)
+            .where(Game.id.in_(ids))
+        ).mappings().all()
+
+        genre_rows = db.execute(
+            select(GameGenre.game_id, GameGenre.is_primary, Genre.id, Genre.name)
+            .join(Genre, Genre.id == GameGenre.genre_id)
+            .where(GameGenre.game_id.in_(ids))
+        ).all()
+
+        genres_by_game = defaultdict(list)
+        for game_id, is_primary, genre_id, genre_name in genre_rows:
+            genres_by_game[game_id].append({
+                "genre": {"id": genre_id, "name": genre_name},
+                "is_primary": bool(is_primary)
+            })
+
+        items = {}
+        for row in rows:
+            item = dict(row)
+            developer_title = item.pop("developer_title")
+            item["developer"] = {"id": item["dev_game"], "title": developer_title} if developer_title else None
+            item["genre_associations"] = genres_by_game.get(item["id"], [])
+            items[item["id"]] = item
+
+        return [items[game_id] for game_id in ids if game_id in items]
 
-        return query.offset(skip).limit(limit).all()
+    def get_multi(
+        self, db: Session, skip: int = 0, limit: int = 100,
+        search: Optional[str] = None,
+
+        genre_name: Optional[str] = None,
+        platform_name: Optional[str] = None,
+        platform_mode: str = "any",
+        sort_by: str = "release_date",
+        sort_order: str = "desc",
+        cursor: Optional[str] = None
+    ) -> List[Game]:
+        ids = self.get_page_ids(
+            db, skip=skip, limit=limit, search=search,
+            genre_name=genre_name, platform_name=platform_name, platform_mode=platform_mode,
+            sort_by=sort_by, sort_order=sort_order, cursor=cursor
+        )
+        return self.get_by_ids(db, ids)
+
+    def get_multi_items(self, db: Session, **filters) -> List[dict]:
+        """То же, что get_multi, но через проекцию колонок (см. get_list_items)."""
+        return self.get_list_items(db, self.get_page_ids(db, **filters))
+
+
+    def showcase_queries(self, db: Session) -> dict:
+        """Запросы id подборок витрины (без выполнения) — их же проверяет tests/test_query_plans.py."""
+        return {
+            # 1. ТРЕНДЫ: Топ-10 по онлайну (Game Pulse)
+            # Используем nullslast(), чтобы игры с пустым онлайном падали вниз
+            "trending": db.query(Game.id).order_by(Game.current_online.desc().nullslast()).limit(10),
+            # 2. НОВИНКИ: Последние 10 вышедших игр
+            "new_releases": db.query(Game.id).filter(Game.is_available == True)
+                .order_by(Game.release_date.desc().nullslast()).limit(10),
+            # 3. СКОРО: Топ-10 ожидаемых
+            "upcoming": db.query(Game.id).filter(Game.is_available == False)
+                .order_by(Game.release_date.asc().nullslast()).limit(10),
+        }
+
+    def get_showcase(self, db: Session) -> Dict[str, List[dict]]:
+        """
+        Подборки для главной страницы:
+        - Тренды (по текущему онлайну)
+        - Новинки (недавно вышли)
+        - Ожидаемые (выйдут в будущем)
+        """
+        trending_ids, new_ids, upcoming_ids = (
+            [row[0] for row in query.all()] for query in self.showcase_queries(db).values()
+        )
+
+        # Карточки всех трёх подборок — одной проекцией, без ORM и ленивых связей
+        items = {item["id"]: item for item in self.get_list_items(db, list({*trending_ids, *new_ids, *upcoming_ids}))}
+
+        return {
+            "trending": [items[i] for i in trending_ids if i in items],
+            "new_releases": [items[i] for i in new_ids if i in items],
+            "upcoming": [items[i] for i in upcoming_ids if i in items]
+        }
+
+    def bulk_update_pulse(self, db: Session, rows: List[tuple]) -> int:
+        """
+        Set-based запись результатов Game Pulse: один UPDATE ... FROM (VALUES ...) на пачку.
+        rows — кортежи (game_id, current_online, price); price=None значит "цену не трогать".
+        Обновляются только строки, где онлайн или цена реально изменились.
+        Возвращает число изменённых строк. Коммит — на вызывающей стороне.
+        """
+        if not rows:
+            return 0
+
+        pulse = values(
+            column("id", Integer), column("current_online", Integer), column("price", Float),
+            name="pulse"
+        ).data(rows)
+        new_online = cast(pulse.c.current_online, Integer)
+        new_price = cast(pulse.c.price, Float)
+
+        stmt = update(Game).where(
+            Game.id == pulse.c.id,
+            or_(
+                Game.current_online.is_distinct_from(new_online),
+                and_(new_price.isnot(None), Game.price.is_distinct_from(new_price))
+            )
+        ).values(
+            current_online=new_online,
+            price=func.coalesce(new_price, Game.price)
+        ).execution_options(synchronize_session=False)
+
+        return db.execute(stmt).rowcount
+
+    def refresh_pulse_tiers(self, db: Session, game_ids: List[int]) -> None:
+        """
+        Пересчитывает приоритет Game Pulse для игр и назначает время следующего обновления.
+        Горячие (большой онлайн, свежий релиз, много в списках) — каждые несколько минут,
+        длинный хвост — раз в сутки. Один INSERT ... ON CONFLICT на всю пачку.
+        """
+        if not game_ids:
+            return
+
+        now = datetime.now(timezone.utc)
+        lists_count = select(UserGameStatus.game_id, func.count().label("cnt")) \
+            .where(UserGameStatus.game_id.in_(game_ids)) \
+            .group_by(UserGameStatus.game_id).subquery()
+        lists = func.coalesce(lists_count.c.cnt, 0)
+        online = func.coalesce(Game.current_online, 0)
+
+        tier = case(
+            (or_(
+                online >= PULSE_HOT_ONLINE,
+                lists >= PULSE_HOT_LISTS,
+                Game.release_date.between(now - timedelta(days=PULSE_HOT_RELEASE_DAYS), now)
+            ), 0),
+            (or_(
+                online >= PULSE_WARM_ONLINE,
+                lists >= PULSE_WARM_LISTS,
+                Game.release_date.between(now - timedelta(days=PULSE_WARM_RELEASE_DAYS), now)
+            ), 1),
+            else_=2
+        )
+        tiers = select(Game.id.label("game_id"), tier.label("tier")) \
+            .outerjoin(lists_count, lists_count.c.game_id == Game.id) \
+            .where(Game.id.in_(game_ids)).subquery()
+        minutes = case(*[(tiers.c.tier == t, m) for t, m in PULSE_TIER_MINUTES.items()])
+
+        stmt = pg_insert(GamePulseState).from_select(
+            ["game_id", "tier", "last_refresh_at", "next_refresh_at"],
+            select(
+                tiers.c.game_id,
+                tiers.c.tier,
+                literal(now, DateTime(timezone=True)),
+                literal(now, DateTime(timezone=True)) + func.make_interval(0, 0, 0, 0, 0, minutes)
+            )
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[GamePulseState.game_id],
+            set_={
+                "tier": stmt.excluded.tier,
+                "last_refresh_at": stmt.excluded.last_refresh_at,
+                "next_refresh_at": stmt.excluded.next_refresh_at,
+            }
+        )
+        db.execute(stmt)
+
+    def release_due_games(self, db: Session, now: datetime) -> List[tuple]:
+        """
+        Переводит вышедшие игры в доступные одним UPDATE ... RETURNING
+        (кандидатов находит частичный индекс idx_games_upcoming_release_date).
+        Возвращает [(id, title)]. Коммит — на вызывающей стороне.
+        """
+        stmt = update(Game).where(
+            Game.is_available == False,
+            Game.release_date <= now
+        ).values(is_available=True).returning(Game.id, Game.title) \
+            .execution_options(synchronize_session=False)
+        return [tuple(row) for row in db.execute(stmt).all()]
+
+    def next_release_query(self, db: Session):
+        """Ближайший релиз среди ещё не вышедших игр (первая строка того же частичного индекса)."""
+        return db.query(Game.release_date).filter(
+            Game.is_available == False,
+            Game.release_date.isnot(None)
+        ).order_by(Game.release_date.asc().nullslast(), Game.id.asc()).limit(1)
+
+    def get_next_release_date(self, db: Session) -> Optional[datetime]:
+        return self.next_release_query(db).scalar()
+
+    def build_showcase_snapshot(self, db: Session) -> bytes:
+        """Собирает витрину и сразу сериализует её в JSON (ShowcaseResponse)."""
+        return ShowcaseResponse.model_validate(self.get_showcase(db)).model_dump_json().encode("utf-8")
+
+    def get_facets(
+        self, db: Session,
+        search: Optional[str] = None,
+        genre_name: Optional[str] = None,
+        platform_name: Optional[str] = None,
+        platform_mode: str = "any"
+    ) -> Dict[str, List[dict]]:
+        """
+        Счётчики фасетов каталога для тех же фильтров, что и у листинга.
+        Всё считается одним запросом: цена/год/доступность — через GROUPING SETS
+        по games, жанры и платформы — агрегатами по таблицам связей, склеенными UNION ALL.
+        """
+        filtered, _ = self.apply_filters(db.query(Game.id), search, genre_name, platform_name, platform_mode)
+        filtered_ids = filtered.subquery()
+
+        price_bucket = case(
+            (Game.price.is_(None), "unknown"),
+            (Game.price == 0, "free"),
+            (Game.price < 10, "under_10"),
+            (Game.price < 30, "10_30"),
+            (Game.price < 60, "30_60"),
+            else_="60_plus"
+        )
+        release_year = cast(func.extract("year", Game.release_date), Integer)
+
+        games_part = select(
+            case(
+                (func.grouping(price_bucket) == 0, "price"),
+                (func.grouping(release_year) == 0, "release_year"),
+                else_="availability"
+            ).label("facet"),
+            case(
+                (func.grouping(price_bucket) == 0, price_bucket),
+                (func.grouping(release_year) == 0, cast(release_year, String)),
+                else_=cast(Game.is_available, String)
+            ).label("value"),
+            func.count().label("cnt")
+        ).join(filtered_ids, filtered_ids.c.id == Game.id).group_by(
+            func.grouping_sets(tuple_(price_bucket), tuple_(release_year), tuple_(Game.is_available))
+        )
 
+        genres_part = select(
+            literal("genre").label("facet"),
+            Genre.name.label("value"),
+            func.count().label("cnt")
+        ).select_from(GameGenre).join(Genre, Genre.id == GameGenre.genre_id) \
+            .join(filtered_ids, filtered_ids.c.id == GameGenre.game_id) \
+            .group_by(Genre.name)
+
+        platforms_part = select(
+            literal("platform").label("facet"),
+            Platform.name.label("value"),
+            func.count().label("cnt")
+        ).select_from(GamePlatform).join(Platform, Platform.id == GamePlatform.platform_id) \
+            .join(filtered_ids, filtered_ids.c.id == GamePlatform.game_id) \
+            .group_by(Platform.name)
+
+        facets = {"genre": [], "platform": [], "price": [], "release_year": [], "availability": []}
+        for facet, value, cnt in db.execute(union_all(games_part, genres_part, platforms_part)).all():
+            facets[facet].append({"value": value if value is not None else "unknown", "count": cnt})
+
+        for items in facets.values():
+            items.sort(key=lambda item: item["count"], reverse=True)
+        return facets
 
     def create_game_with_details(self, db: Session, game_in: GameCreate) -> Game:
         # 1. Ищем или создаем разработчика по тексту
         dev_id = None
         if game_in.developer_name:
-            dev = find_or_create_developer(db, title=game_in.developer_name)
-            dev_id = dev.id
+            dev_id = get_developer_id(db, game_in.developer_name)
 
         # 2. Создаем саму игру
         db_game = Game(
@@ -150,20 +612,27 @@ class CRUDGame(CRUDBase[Game, GameCreate, GameUpdate]):
         db.flush()
 
         if game_in.genres:
-            for genre_name in game_in.genres:
-                genre = find_or_create_genre(db, name=genre_name)
+            genre_map = get_or_create_genre_ids(db, game_in.genres)
+            for genre_id in dict.fromkeys(genre_map[name] for name in game_in.genres if name):
                 # Создаем связь в промежуточной таблице
-                game_genre_link = GameGenre(game_id=db_game.id, genre_id=genre.id, is_primary=False)
+                game_genre_link = GameGenre(game_id=db_game.id, genre_id=genre_id, is_primary=False)
                 db.add(game_genre_link)
 
+        if game_in.platforms:
+            set_game_platforms(db, db_game, parse_platforms(game_in.platforms))
+
         db_details = GameDetails(
             game_id=db_game.id,
             description={"en": "", "ru": ""}
         )
         db.add(db_details)
 
+        # Остальные API-процессы сбросят кэш и витрину по событию после commit,
+        # этот — сразу (клиент увидит свою игру следующим же запросом)
+        publish_catalog_event(db, "game_created", id=db_game.id)
         db.commit()
         db.refresh(db_game)
+        invalidate_catalog("create_game_with_details")
         return db_game
 
 # ==========================================
@@ -173,6 +642,14 @@ class CRUDUserGameStatus(CRUDBase[UserGameStatus, UserGameStatusCreate, BaseMode
     def get_user_statuses(self, db: Session, user_id: int) -> List[UserGameStatus]:
         return db.query(self.model).options(joinedload(UserGameStatus.game)).filter(UserGameStatus.user_id == user_id).all()
 
+    def get_user_status_items(self, db: Session, user_id: int) -> List[dict]:
+        """Проекция для списка игр профиля: только поля UserGameStatusResponse, без загрузки Game."""
+        rows = db.execute(
+            select(self.model.id, self.model.status, self.model.score)
+            .where(self.model.user_id == user_id)
+        ).mappings().all()
+        return [dict(row) for row in rows]
+
     def add_or_update(self, db: Session, user_id: int, status_data: UserGameStatusCreate) -> Optional[UserGameStatus]:
         existing = db.query(self.model).filter(
             UserGameStatus.user_id == user_id,
@@ -217,25 +694,278 @@ class CRUDUserGameStatus(CRUDBase[UserGameStatus, UserGameStatusCreate, BaseMode
                 stats[name] += count
         return stats
 
+# ==========================================
+# РЕПОЗИТОРИЙ ИСТОРИИ GAME PULSE
+# ==========================================
+# Сырые замеры живут PULSE_RAW_RETENTION, почасовые агрегаты — PULSE_HOURLY_RETENTION,
+# посуточные — бессрочно. Графики и "падения цен" читаются только из агрегатов.
+PULSE_RAW_RETENTION = timedelta(hours=48)
+PULSE_HOURLY_RETENTION = timedelta(days=90)
+
+ROLLUP_HOURLY_SQL = text("""
+    INSERT INTO game_pulse_rollup
+        (game_id, resolution, bucket, online_avg, online_max, price_min, price_max, price_last, samples)
+    SELECT game_id, 'hour', date_trunc('hour', recorded_at),
+           avg(current_online), max(current_online), min(price), max(price),
+           (array_agg(price ORDER BY recorded_at DESC) FILTER (WHERE price IS NOT NULL))[1],
+           count(*)
+    FROM game_pulse_history
+    WHERE recorded_at >= date_trunc('hour', CAST(:since AS timestamptz))
+    GROUP BY game_id, date_trunc('hour', recorded_at)
+    ON CONFLICT (game_id, resolution, bucket) DO UPDATE SET
+        online_avg = EXCLUDED.online_avg, online_max = EXCLUDED.online_max,
+        price_min = EXCLUDED.price_min, price_max = EXCLUDED.price_max,
+        price_last = EXCLUDED.price_last, samples = EXCLUDED.samples
+""")
+
+ROLLUP_DAILY_SQL = text("""
+    INSERT INTO game_pulse_rollup
+        (game_id, resolution, bucket, online_avg, online_max, price_min, price_max, price_last, samples)
+    SELECT game_id, 'day', date_trunc('day', bucket),
+           sum(online_avg * samples) / NULLIF(sum(samples), 0), max(online_max),
+           min(price_min), max(price_max),
+           (array_agg(price_last ORDER BY bucket DESC) FILTER (WHERE price_last IS NOT NULL))[1],
+           sum(samples)
+    FROM game_pulse_rollup
+    WHERE resolution = 'hour' AND bucket >= date_trunc('day', CAST(:since AS timestamptz))
+    GROUP BY game_id, date_trunc('day', bucket)
+    ON CONFLICT (game_id, resolution, bucket) DO UPDATE SET
+        online_avg = EXCLUDED.online_avg, online_max = EXCLUDED.online_max,
+        price_min = EXCLUDED.price_min, price_max = EXCLUDED.price_max,
+        price_last = EXCLUDED.price_last, samples = EXCLUDED.samples
+""")
+
+PRICE_DROPS_SQL = text("""
+    SELECT g.id AS game_id, g.title, old.price_last AS old_price, g.price AS new_price,
+           round(CAST((old.price_last - g.price) * 100 / old.price_last AS numeric), 1) AS drop_percent
+    FROM (
+        SELECT DISTINCT ON (game_id) game_id, price_last
+        FROM game_pulse_rollup
+        WHERE resolution = 'hour' AND bucket BETWEEN :window_start AND :window_end
+          AND price_last IS NOT NULL
+        ORDER BY game_id, bucket DESC
+    ) AS old
+    JOIN games g ON g.id = old.game_id
+    WHERE g.price IS NOT NULL AND old.price_last > 0 AND g.price < old.price_last
+    ORDER BY drop_percent DESC, g.id
+    LIMIT :limit
+""")
+
+
+class CRUDGamePulse(CRUDBase[GamePulseHistory, BaseModel, BaseModel]):
+    def add_samples(self, db: Session, rows: List[tuple], recorded_at: Optional[datetime] = None) -> None:
+        """Пачечная запись сырых замеров: rows — кортежи (game_id, current_online, price)."""
+        if not rows:
+            return
+        recorded_at = recorded_at or datetime.now(timezone.utc)
+        db.execute(insert(GamePulseHistory), [
+            {"game_id": game_id, "recorded_at": recorded_at, "current_online": online, "price": price}
+            for game_id, online, price in rows
+        ])
+
+    def compact(self, db: Session) -> None:
+        """
+        Сворачивает сырые замеры в почасовые агрегаты, часы — в сутки,
+        и удаляет то, что вышло за срок хранения. Можно запускать сколько угодно часто.
+        Отметка, с которой считать, — последний уже свёрнутый час/день (он мог быть
+        неполным и пересчитывается), а если агрегатов ещё нет — самый старый замер.
+        Поэтому после простоя воркера сворачивается весь пропуск, а не фиксированное окно.
+        """
+        now = datetime.now(timezone.utc)
+        hourly_since = db.query(func.max(GamePulseRollup.bucket)) \
+            .filter(GamePulseRollup.resolution == "hour").scalar() \
+            or db.query(func.min(GamePulseHistory.recorded_at)).scalar()
+        if hourly_since is not None:
+            db.execute(ROLLUP_HOURLY_SQL, {"since": hourly_since})
+
+        daily_since = db.query(func.max(GamePulseRollup.bucket)) \
+            .filter(GamePulseRollup.resolution == "day").scalar() \
+            or db.query(func.min(GamePulseRollup.bucket)).filter(GamePulseRollup.resolution == "hour").scalar()
+        if daily_since is not None:
+            db.execute(ROLLUP_DAILY_SQL, {"since": daily_since})
+        db.query(GamePulseHistory).filter(
+            GamePulseHistory.recorded_at < now - PULSE_RAW_RETENTION
+        ).delete(synchronize_session=False)
+        db.query(GamePulseRollup).filter(
+            GamePulseRollup.resolution == "hour",
+            GamePulseRollup.bucket < now - PULSE_HOURLY_RETENTION
+        ).delete(synchronize_session=False)
+
+    def get_chart(self, db: Session, game_id: int, days: int) -> List[GamePulseRollup]:
+        """Точки графика онлайна/цены: до 7 дней — почасовые агрегаты, дальше — посуточные."""
+        resolution = "hour" if days <= 7 else "day"
+        since = datetime.now(timezone.utc) - timedelta(days=days)
+        return db.query(GamePulseRollup).filter(
+            GamePulseRollup.game_id == game_id,
+            GamePulseRollup.resolution == resolution,
+            GamePulseRollup.bucket >= since
+        ).order_by(GamePulseRollup.bucket.asc()).all()
+
+    def get_price_drops(self, db: Session, hours: int = 24, limit: int = 20) -> List[dict]:
+        """Самые большие падения цены: последняя известная цена около hours назад против текущей."""
+        now = datetime.now(timezone.utc)
+        rows = db.execute(PRICE_DROPS_SQL, {
+            "window_start": now - timedelta(hours=hours * 2),
+            "window_end": now - timedelta(hours=hours),
+            "limit": limit
+        }).mappings().all()
+        return [dict(row) for row in rows]
+
 # ==========================================
 # ИНИЦИАЛИЗАЦИЯ ЭКЗЕМПЛЯРОВ (ЭКСПОРТ)
 # ==========================================
 user = CRUDUser(User)
 game = CRUDGame(Game)
 user_game_status = CRUDUserGameStatus(UserGameStatus)
+game_pulse = CRUDGamePulse(GamePulseHistory)
+
+def _get_or_create_ids(db: Session, model, name_col, cache: NameIdCache, names: List[str]) -> Dict[str, int]:
+    """
+    Пачечный find-or-create для справочника: имена берутся из кэша процесса,
+    промахи — один INSERT ... ON CONFLICT DO NOTHING RETURNING и один SELECT
+    для строк, которые уже были (или их только что вставил параллельный процесс).
+    Возвращает {имя: id}. Коммит — на вызывающей стороне.
+    """
+    names = list(dict.fromkeys(name for name in names if name))
+    result = cache.get_many(names)
+    missing = [name for name in names if name not in result]
+    if not missing:
+        return result
+
+    created = {
+        name: id_ for id_, name in db.execute(
+            pg_insert(model).values([{name_col.key: name} for name in missing])
+            .on_conflict_do_nothing(index_elements=[name_col])
+            .returning(model.id, name_col)
+        ).all()
+    }
+    existing = {}
+    if len(created) < len(missing):
+        existing = {
+            name: id_ for id_, name in db.execute(
+                select(model.id, name_col).where(name_col.in_([n for n in missing if n not in created]))
+            ).all()
+        }
+
+    cache.put_many(existing)
+    # Только что вставленные строки станут видны другим сессиям лишь после commit
+    remember_after_commit(db, cache, created)
+    return {**result, **existing, **created}
+
+def get_or_create_developer_ids(db: Session, titles: List[str]) -> Dict[str, int]:
+    return _get_or_create_ids(db, Developer, Developer.title, developer_ids, titles)
+
+def get_or_create_genre_ids(db: Session, names: List[str]) -> Dict[str, int]:
+    return _get_or_create_ids(db, Genre, Genre.name, genre_ids, names)
+
+def get_developer_id(db: Session, title: str) -> int:
+    return get_or_create_developer_ids(db, [title])[title]
+
+def get_genre_id(db: Session, name: str) -> int:
+    return get_or_create_genre_ids(db, [name])[name]
 
 def find_or_create_developer(db: Session, title: str) -> Developer:
-    dev = db.query(Developer).filter(Developer.title == title).first()
-    if not dev:
-        dev = Developer(title=title)
-        db.add(dev)
-        db.flush()
-    return dev
+    return db.get(Developer, get_developer_id(db, title))
 
 def find_or_create_genre(db: Session, name: str) -> Genre:
-    genre = db.query(Genre).filter(Genre.name == name).first()
-    if not genre:
-        genre = Genre(name=name)
-        db.add(genre)
-        db.flush()
-    return genre
\ No newline at end of file
+    return db.get(Genre, get_genre_id(db, name))
+
+# === ПЛАТФОРМЫ ===
+# Синонимы из старых строк Game.platforms -> каноническое имя платформы
+PLATFORM_ALIASES = {
+    "windows": "PC",
+    "pc (microsoft windows)": "PC",
+    "playstation 5": "PS5",
+    "playstation 4": "PS4",
+    "xbox series x|s": "Xbox Series",
+    "xbox series x": "Xbox Series",
+    "xbox series s": "Xbox Series",
+    "nintendo switch": "Switch",
+    "mac": "macOS",
+}
+
+def normalize_platforms(names: List[str]) -> List[str]:
+    """
+    Канонические имена платформ (синонимы -> PLATFORM_ALIASES), без повторов без учёта регистра.
+    Имена длиннее колонки platforms.name пропускаются: обрезка склеила бы разные платформы в одну.
+    """
+    result = []
+    for name in names:
+        name = (name or "").strip()
+        if not name:
+            continue
+        name = PLATFORM_ALIASES.get(name.lower(), name)
+        if len(name) > Platform.name.type.length:
+            continue
+        if name.lower() not in (n.lower() for n in result):
+            result.append(name)
+    return result
+
+def parse_platforms(raw: Optional[str]) -> List[str]:
+    """Разбирает строку вида "PC, PS5 / Xbox One" в список уникальных имён платформ."""
+    if not raw:
+        return []
+    return normalize_platforms(re.split(r"[,;/]", raw))
+
+def platforms_label(names: List[str]) -> Optional[str]:
+    """Строка для Game.platforms: имена через запятую, только целые и пока влезают в колонку."""
+    label = ""
+    for name in names:
+        candidate = f"{label}, {name}" if label else name
+        if len(candidate) > Game.platforms.type.length:
+            break
+        label = candidate
+    return label or None
+
+def get_or_create_platform_ids(db: Session, names: List[str]) -> Dict[str, int]:
+    """
+    Пачечный find-or-create платформ. Поиск — без учёта регистра (как в фильтре каталога),
+    недостающие — один INSERT ... ON CONFLICT DO NOTHING RETURNING; строки, которые
+    параллельно вставил другой процесс, находятся повторным SELECT.
+    Возвращает {имя: id}. Коммит — на вызывающей стороне.
+    """
+    names = list(dict.fromkeys(name for name in names if name))
+
+    def lookup(wanted: List[str]) -> Dict[str, int]:
+        rows = db.execute(
+            select(Platform.id, Platform.name).where(func.lower(Platform.name).in_([n.lower() for n in wanted]))
+        ).all() if wanted else []
+        by_lower = {name.lower(): id_ for id_, name in rows}
+        return {n: by_lower[n.lower()] for n in wanted if n.lower() in by_lower}
+
+    result = lookup(names)
+    # По одному имени на платформу без учёта регистра ("PC" и "pc" — одна строка)
+    missing = list({n.lower(): n for n in names if n not in result}.values())
+    if missing:
+        result.update({
+            name: id_ for id_, name in db.execute(
+                pg_insert(Platform).values([{"name": name} for name in sorted(missing)])
+                .on_conflict_do_nothing(index_elements=[Platform.name])
+                .returning(Platform.id, Platform.name)
+            ).all()
+        })
+        rest = [n for n in names if n not in result]
+        if rest:
+            result.update(lookup(rest))
+    return result
+
+def find_or_create_platform(db: Session, name: str) -> Platform:
+    return db.get(Platform, get_or_create_platform_ids(db, [name])[name])
+
+def set_game_platforms(db: Session, game_obj: Game, names: List[str]) -> None:
+    """Делает game_platforms источником истины: приводит связи игры к списку names."""
+    wanted_ids = set(get_or_create_platform_ids(db, names).values())
+    existing_ids = {
+        row[0] for row in db.query(GamePlatform.platform_id).filter(GamePlatform.game_id == game_obj.id).all()
+    }
+
+    for platform_id in wanted_ids - existing_ids:
+        db.add(GamePlatform(game_id=game_obj.id, platform_id=platform_id))
+    if existing_ids - wanted_ids:
+        db.query(GamePlatform).filter(
+            GamePlatform.game_id == game_obj.id,
+            GamePlatform.platform_id.in_(existing_ids - wanted_ids)
+        ).delete(synchronize_session=False)
+
+    # Строковое поле оставляем как денормализованное представление для ответа API
+    game_obj.platforms = platforms_label(names)
@@ -1,7 +1,8 @@
 
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker, DeclarativeBase
-from contextlib import contextmanager
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from contextlib import contextmanager, asynccontextmanager
 import os
 from dotenv import load_dotenv
 
@@ -22,6 +23,11 @@ if DATABASE_URL is None:
     # Если URL не задан, приложение не запустится — падаем рано
     raise ValueError("DATABASE_URL is not set in environment")
 
+# URL для асинхронного драйвера (asyncpg). По умолчанию выводится из DATABASE_URL
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL") or \
+    DATABASE_URL.replace("postgresql+psycopg2://", "postgresql://", 1) \
+                .replace("postgresql://", "postgresql+asyncpg://", 1)
+
 class Database:
     """
     Менеджер подключения к базе данных.
@@ -84,4 +90,63 @@ class Database:
             session.close()
 
 
-database = Database(DATABASE_URL)
\ No newline at end of file
+class AsyncDatabase:
+    """
+    Асинхронный менеджер подключения (AsyncEngine + asyncpg).
+    Используется async-роутами: запрос не занимает поток из threadpool Starlette,
+    пока ждёт ответа от БД.
+    """
+
+    def __init__(self, db_url: str):
+        """
+        Инициализация менеджера с указанным URL (схема postgresql+asyncpg).
+        """
+        self.db_url = db_url
+        self.engine = self._create_engine()
+        self.session_factory = self._create_session_factory()
+
+    def _create_engine(self):
+        """
+        Создаёт асинхронный движок SQLAlchemy.
+        Возвращает:
+            экземпляр AsyncEngine
+        """
+        return create_async_engine(
+            self.db_url,
+            echo=False,
+            pool_size=10,        # Отдельный пул, не конкурирует с синхронным
+            pool_pre_ping=True,
+        )
+
+    def _create_session_factory(self):
+        """
+        Создаёт фабрику асинхронных сессий.
+        Возвращает:
+            экземпляр async_sessionmaker
+        """
+        return async_sessionmaker(
+            bind=self.engine,
+            expire_on_commit=False,
+            autoflush=False,
+        )
+
+    @asynccontextmanager
+    async def get_session(self):
+        """
+        Асинхронный контекстный менеджер для сессий.
+        Использование:
+            async with async_database.get_session() as session:
+                items = await session.run_sync(lambda s: crud.game.get_list_items(s, ids))
+        """
+        session = self.session_factory()
+        try:
+            yield session
+        except Exception:
+            await session.rollback()
+            raise
+        finally:
+            await session.close()
+
+
+database = Database(DATABASE_URL)
+async_database = AsyncDatabase(ASYNC_DATABASE_URL)
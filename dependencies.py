@@ -1,11 +1,11 @@
-from typing import Generator
+from typing import AsyncGenerator, Generator
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.orm import Session
 from models.user import User
 import jwt
 
-from db import database
+from db import database, async_database
 import crud
 from auth import SECRET_KEY, ALGORITHM  # Берем настройки из auth.py
 
@@ -18,6 +18,16 @@ def get_db() -> Generator:
         yield session
 
 
+async def get_async_db() -> AsyncGenerator:
+    """
+    Асинхронная зависимость для FastAPI (AsyncSession на asyncpg).
+    Синхронный код из crud вызывается через session.run_sync(...),
+    поэтому логика запросов общая для обоих стеков.
+    """
+    async with async_database.get_session() as session:
+        yield session
+
+
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login")
 
 def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
@@ -0,0 +1,109 @@
+import threading
+import time
+import logging
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from models.developers import Developer
+from models.genre import Genre
+
+logger = logging.getLogger("dimension_cache")
+
+# Справочники (разработчики, жанры) почти не меняются, а при импорте и сборе тегов Steam
+# одни и те же несколько сотен имён ищутся десятки тысяч раз. Кэш имя -> id на процесс.
+DIMENSION_CACHE_SIZE = 10000
+# Страховка от строк, удалённых другим процессом: запись живёт не дольше TTL
+DIMENSION_TTL_SECONDS = 600
+
+
+class NameIdCache:
+    """Потокобезопасный LRU-кэш имя -> id с ограничением размера и TTL."""
+
+    def __init__(self, name: str, max_entries: int = DIMENSION_CACHE_SIZE, ttl: float = DIMENSION_TTL_SECONDS):
+        self.name = name
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[int]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[1] < time.monotonic():
+                self._entries.pop(key, None)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def get_many(self, keys: List[str]) -> Dict[str, int]:
+        found = {}
+        for key in keys:
+            value = self.get(key)
+            if value is not None:
+                found[key] = value
+        return found
+
+    def put_many(self, mapping: Dict[str, int]) -> None:
+        expires_at = time.monotonic() + self.ttl
+        with self._lock:
+            for key, value in mapping.items():
+                self._entries[key] = (value, expires_at)
+                self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def forget_id(self, value: int) -> None:
+        with self._lock:
+            for key in [k for k, entry in self._entries.items() if entry[0] == value]:
+                del self._entries[key]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        return {"size": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+developer_ids = NameIdCache("developers")
+genre_ids = NameIdCache("genres")
+
+
+# === ИДЕНТИФИКАТОРЫ, СОЗДАННЫЕ В ТЕКУЩЕЙ ТРАНЗАКЦИИ ===
+# Новая строка попадает в кэш только после commit: при rollback её id уже не существует.
+
+def remember_after_commit(db: Session, cache: NameIdCache, mapping: Dict[str, int]) -> None:
+    if mapping:
+        db.info.setdefault("pending_dimension_ids", []).append((cache, mapping))
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_pending(session: Session) -> None:
+    for cache, mapping in session.info.pop("pending_dimension_ids", []):
+        cache.put_many(mapping)
+
+
+@event.listens_for(Session, "after_rollback")
+def _drop_pending(session: Session) -> None:
+    session.info.pop("pending_dimension_ids", None)
+
+
+# === ИНВАЛИДАЦИЯ ПРИ УДАЛЕНИИ ===
+# ORM-удаление (db.delete) сразу убирает id из кэша. Массовые query(...).delete()
+# эти события не вызывают — после них нужно звать clear() у соответствующего кэша.
+
+@event.listens_for(Developer, "after_delete")
+def _forget_developer(mapper, connection, target: Developer) -> None:
+    developer_ids.forget_id(target.id)
+
+
+@event.listens_for(Genre, "after_delete")
+def _forget_genre(mapper, connection, target: Genre) -> None:
+    genre_ids.forget_id(target.id)
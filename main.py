@@ -1,32 +1,48 @@
+import os
+import threading
 from contextlib import asynccontextmanager
 from fastapi import FastAPI
-from apscheduler.schedulers.background import BackgroundScheduler
 
 from routers import auth, games, admin, users,showcase
-# Импортируем ОБЕ функции из планировщика
-from scripts.scheduler import update_released_games, update_game_pulse_and_prices
+from db import async_database
+from catalog_cache import add_catalog_listener
+from scripts.catalog_events import listen_catalog_events, on_catalog_event, rebuild_showcase_loop
+
+# Фоновую работу (планировщик + очередь задач админки) выполняет отдельный процесс: python -m worker.
+# Для локальной разработки в одном процессе можно включить встроенный воркер: RUN_EMBEDDED_WORKER=1
+RUN_EMBEDDED_WORKER = os.getenv("RUN_EMBEDDED_WORKER", "0").lower() in ("1", "true", "yes")
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    # 1. Создаем планировщик
-    scheduler = BackgroundScheduler()
+    scheduler = None
+    stop_event = threading.Event()
+
+    # События каталога от воркера (релизы, пульс, импорт, теги) и других API-процессов:
+    # кэш каталога процесса сбрасывается, снимок витрины пересобирается (не чаще SHOWCASE_REBUILD_INTERVAL)
+    add_catalog_listener(on_catalog_event)
+    threading.Thread(target=listen_catalog_events, args=(stop_event,), daemon=True, name="catalog-events").start()
+    threading.Thread(target=rebuild_showcase_loop, args=(stop_event,), daemon=True, name="showcase-rebuild").start()
 
-    # 2. Задача: Проверка релизов (раз в минуту)
-    scheduler.add_job(update_released_games, "interval", minutes=1)
+    if RUN_EMBEDDED_WORKER:
+        from worker import create_scheduler, consume_jobs
 
-    # 3. Задача: Game Pulse (Онлайн + Цены) - ставим раз в 60 минут
-    scheduler.add_job(update_game_pulse_and_prices, "interval", minutes=60)
+        # 1. Планировщик: релизы, Game Pulse, агрегаты истории, прогрев витрины
+        scheduler = create_scheduler()
+        scheduler.start()
 
-    # 4. Запуск
-    scheduler.start()
-    print("✅ APScheduler started! Auto-release and Game Pulse scanners are running.")
+        # 2. Очередь задач из админки (импорт, теги Steam, принудительный пульс)
+        threading.Thread(target=consume_jobs, args=(stop_event,), daemon=True, name="job-queue").start()
+        print("✅ Embedded worker started! Auto-release, Game Pulse and job queue are running.")
 
     yield
 
-    # 5. Остановка
-    scheduler.shutdown()
-    print("🛑 APScheduler safely stopped.")
+    # 3. Остановка
+    stop_event.set()
+    if scheduler:
+        scheduler.shutdown()
+        print("🛑 Embedded worker safely stopped.")
+    await async_database.engine.dispose()
 
 
 app = FastAPI(title="GameFinder API", lifespan=lifespan)
@@ -36,4 +52,4 @@ app.include_router(auth.router)
 app.include_router(games.router)
 app.include_router(admin.router)
 app.include_router(users.router)
-app.include_router(showcase.router)
\ No newline at end of file
+app.include_router(showcase.router)
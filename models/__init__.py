@@ -7,4 +7,10 @@ from .rating import Rating
 from .user_game_status import UserGameStatus
 from .game_genre import GameGenre
 from .game_platform import GamePlatform
-from .game_details import GameDetails
\ No newline at end of file
+from .game_details import GameDetails
+from .game_pulse_state import GamePulseState
+from .game_pulse_history import GamePulseHistory
+from .game_pulse_rollup import GamePulseRollup
+from .job_control import JobControl
+from .job import Job
+from .integration_token import IntegrationToken
\ No newline at end of file
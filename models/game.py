@@ -1,5 +1,6 @@
 from sqlalchemy import Column, Integer, String, Date, Boolean, Numeric, ForeignKey, CheckConstraint, Index, DateTime, \
     Float
+from sqlalchemy.dialects.postgresql import TSVECTOR
 from sqlalchemy.orm import relationship
 from db import Base
 
@@ -25,6 +26,9 @@ class Game(Base):
     steam_app_id = Column(Integer, unique=True, nullable=True)
     igdb_id = Column(Integer, unique=True, nullable=True)
 
+    # Поиск: заполняется триггером в БД (название + описания из game_details)
+    search_vector = Column(TSVECTOR, nullable=True)
+
     # --- СВЯЗИ ---
     # Новая связь One-to-One с деталями
     details = relationship("GameDetails", back_populates="game", uselist=False, cascade="all, delete-orphan")
@@ -43,4 +47,27 @@ class Game(Base):
         Index("idx_games_release_date", "release_date"),
         Index("idx_games_steam_app_id", "steam_app_id"),
         Index("idx_games_igdb_id", "igdb_id"),
+        Index("idx_games_search_vector", "search_vector", postgresql_using="gin"),
+        Index("idx_games_title_trgm", "title", postgresql_using="gin",
+              postgresql_ops={"title": "gin_trgm_ops"}),
+
+        # Индексы под горячие сортировки (направление и NULLS LAST — как в запросах,
+        # id — тай-брейкер из CRUDGame.get_page_ids, он же делает index-only scan по id)
+        Index("idx_games_current_online_desc", current_online.desc().nullslast(), id.desc()),
+        Index("idx_games_release_date_desc", release_date.desc().nullslast(), id.desc()),
+        Index("idx_games_avg_rating_desc", avg_rating.desc().nullslast(), id.desc()),
+        Index("idx_games_price_asc", price.asc().nullslast(), id.asc()),
+        Index("idx_games_price_desc", price.desc().nullslast(), id.desc()),
+        Index("idx_games_title_asc", title.asc().nullslast(), id.asc()),
+        # Обратные направления (NULLS LAST в обоих: обратный проход индекса дал бы NULLS FIRST).
+        # current_online ASC не индексируется — см. crud.UNINDEXED_SORTS
+        Index("idx_games_release_date_asc", release_date.asc().nullslast(), id.asc()),
+        Index("idx_games_avg_rating_asc", avg_rating.asc().nullslast(), id.asc()),
+        Index("idx_games_title_desc", title.desc().nullslast(), id.desc()),
+
+        # Частичные индексы витрины: "Новинки" и "Скоро" (а также поиск релизов в планировщике)
+        Index("idx_games_released_release_date", release_date.desc().nullslast(), id.desc(),
+              postgresql_where=(is_available == True)),
+        Index("idx_games_upcoming_release_date", release_date.asc().nullslast(), id.asc(),
+              postgresql_where=(is_available == False)),
     )
\ No newline at end of file
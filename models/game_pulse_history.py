@@ -0,0 +1,17 @@
+from sqlalchemy import Column, Integer, Float, ForeignKey, DateTime, Index
+from db import Base
+
+
+class GamePulseHistory(Base):
+    """Сырые замеры Game Pulse. Хранятся недолго — потом сворачиваются в game_pulse_rollup."""
+    __tablename__ = "game_pulse_history"
+
+    game_id = Column(Integer, ForeignKey("games.id", ondelete="CASCADE"), primary_key=True)
+    recorded_at = Column(DateTime(timezone=True), primary_key=True)
+    current_online = Column(Integer, nullable=True)
+    price = Column(Float, nullable=True)
+
+    __table_args__ = (
+        # Таблица пишется только в конец по времени — BRIN почти ничего не весит
+        Index("idx_game_pulse_history_recorded_at", "recorded_at", postgresql_using="brin"),
+    )
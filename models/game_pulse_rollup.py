@@ -0,0 +1,21 @@
+from sqlalchemy import Column, Integer, Float, String, ForeignKey, DateTime, Index
+from db import Base
+
+
+class GamePulseRollup(Base):
+    """Свёрнутая история Game Pulse: почасовые ('hour') и посуточные ('day') агрегаты."""
+    __tablename__ = "game_pulse_rollup"
+
+    game_id = Column(Integer, ForeignKey("games.id", ondelete="CASCADE"), primary_key=True)
+    resolution = Column(String(4), primary_key=True)
+    bucket = Column(DateTime(timezone=True), primary_key=True)
+    online_avg = Column(Float, nullable=True)
+    online_max = Column(Integer, nullable=True)
+    price_min = Column(Float, nullable=True)
+    price_max = Column(Float, nullable=True)
+    price_last = Column(Float, nullable=True)
+    samples = Column(Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        Index("idx_game_pulse_rollup_resolution_bucket", "resolution", "bucket"),
+    )
@@ -0,0 +1,16 @@
+from sqlalchemy import Column, Integer, SmallInteger, ForeignKey, DateTime, Index
+from db import Base
+
+
+class GamePulseState(Base):
+    """Расписание Game Pulse: приоритет (tier) игры и время следующего обновления."""
+    __tablename__ = "game_pulse_state"
+
+    game_id = Column(Integer, ForeignKey("games.id", ondelete="CASCADE"), primary_key=True)
+    tier = Column(SmallInteger, nullable=False, default=2)  # 0 — горячие, 1 — тёплые, 2 — длинный хвост
+    last_refresh_at = Column(DateTime(timezone=True), nullable=True)
+    next_refresh_at = Column(DateTime(timezone=True), nullable=True)
+
+    __table_args__ = (
+        Index("idx_game_pulse_state_next_refresh", "next_refresh_at"),
+    )
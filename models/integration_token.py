@@ -0,0 +1,15 @@
+from sqlalchemy import Column, String, Text, DateTime, func
+from db import Base
+
+
+class IntegrationToken(Base):
+    """
+    Токены доступа внешних API (IGDB/Twitch OAuth), общие для всех процессов.
+    Новый процесс берёт ещё живой токен отсюда, а не запрашивает новый.
+    """
+    __tablename__ = "integration_tokens"
+
+    name = Column(String(50), primary_key=True)
+    access_token = Column(Text, nullable=False)
+    expires_at = Column(DateTime(timezone=True), nullable=False)
+    updated_at = Column(DateTime(timezone=True), server_default='NOW()', onupdate=func.now())
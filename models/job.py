@@ -0,0 +1,41 @@
+from sqlalchemy import Column, Integer, String, Text, DateTime, Boolean, Float, Index
+from sqlalchemy.dialects.postgresql import JSONB
+from db import Base
+
+
+class Job(Base):
+    """
+    Очередь фоновых задач. API только ставит задачу (status='queued'),
+    выполняет её отдельный процесс-воркер (python -m worker).
+    Задача сама сообщает прогресс и чекпоинт; прерванная перезапуском возвращается в очередь.
+    """
+    __tablename__ = "jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    kind = Column(String(50), nullable=False)
+    params = Column(JSONB, nullable=True)
+    status = Column(String(20), nullable=False, default="queued")  # queued, running, done, failed, cancelled
+    owner = Column(String(100), nullable=True)
+    error = Column(Text, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default='NOW()')
+    started_at = Column(DateTime(timezone=True), nullable=True)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+
+    # Прогресс: пишется задачей по ходу работы (см. JobProgress в scripts/job_queue.py)
+    total = Column(Integer, nullable=True)
+    processed = Column(Integer, nullable=False, default=0, server_default="0")
+    failed = Column(Integer, nullable=False, default=0, server_default="0")
+    rate = Column(Float, nullable=True)  # элементов в секунду в текущем запуске (для ETA)
+    # Точка продолжения после перезапуска (offset IGDB, id последней игры и т.п.)
+    checkpoint = Column(JSONB, nullable=True)
+    cancel_requested = Column(Boolean, nullable=False, default=False, server_default="false")
+    # Последний отчёт о прогрессе: по нему находятся задачи упавших воркеров
+    updated_at = Column(DateTime(timezone=True), nullable=True)
+    # Не забирать из очереди раньше этого времени (повтор, если задача уже выполняется)
+    run_after = Column(DateTime(timezone=True), nullable=True)
+
+    __table_args__ = (
+        # Воркер выбирает только ожидающие задачи — индекс маленький и горячий
+        Index("idx_jobs_queued", "id", postgresql_where=(status == "queued")),
+        Index("idx_jobs_kind_status", "kind", "status"),
+    )
@@ -0,0 +1,16 @@
+from sqlalchemy import Column, String, Boolean, DateTime
+from db import Base
+
+
+class JobControl(Base):
+    """
+    Управление фоновыми задачами между процессами.
+    Кто сейчас выполняет задачу (owner) и запрошена ли её остановка.
+    Само взаимное исключение — advisory lock в Postgres (см. scripts/job_lock.py).
+    """
+    __tablename__ = "job_control"
+
+    name = Column(String(50), primary_key=True)
+    owner = Column(String(100), nullable=True)
+    started_at = Column(DateTime(timezone=True), nullable=True)
+    stop_requested = Column(Boolean, nullable=False, default=False)
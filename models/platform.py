@@ -6,7 +6,7 @@ class Platform(Base):
     __tablename__ = 'platforms'
 
     id = Column(Integer, primary_key=True, index=True)
-    name = Column(String(20), nullable=False, unique=True)
+    name = Column(String(100), nullable=False, unique=True)
 
     game_associations = relationship("GamePlatform", back_populates="platform", cascade="all, delete-orphan")
 
@@ -1,26 +1,17 @@
-from fastapi import APIRouter, Depends, HTTPException, status, BackgroundTasks
+from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
-import scripts.scheduler as my_scheduler
-from crud import find_or_create_genre
 from models.user import User
 from dependencies import get_current_admin_user, get_db
-from db import database
 import crud
-import time
 import logging
-from scripts.import_service import GameIntegrationService
-from scripts.igdb_parser import get_igdb_token, fetch_top_games, fetch_upcoming_games
-from scripts.steam_parser import fetch_steam_tags
-
-from models.game_genre import GameGenre
-from models.game import Game
+from scripts.http_client import http_client
+from scripts.job_lock import is_job_running, request_job_stop, IMPORT_JOB, STEAM_TAGS_JOB, STEAM_IDS_JOB, PULSE_JOB
+from scripts.job_queue import enqueue_job, has_queued_job, cancel_queued_jobs, get_job, list_jobs, request_job_cancel, retry_job
+import schemas
 
 logger = logging.getLogger("game_import")
 router = APIRouter(prefix="/admin", tags=["admin-panel"])
 
-IS_PARSER_RUNNING = False
-STOP_PARSER_FLAG = False
-
 
 @router.patch("/promote/{user_id}")
 def promote_user(
@@ -39,165 +30,155 @@ def promote_user(
     return {"status": "success", "message": f"User {user_to_promote.username} now is admin"}
 
 @router.post("/update-steam-ids")
-def update_steam_ids(
-        db: Session = Depends(get_db),
-        current_admin: User = Depends(get_current_admin_user)
-):
-    service = GameIntegrationService(db)
-    result = service.update_missing_steam_ids()
-    return {"status": "success", "data": result}
-
-
-def run_background_import(total_games_to_fetch: int, batch_size: int = 128, mode: str = "top"):
-    global IS_PARSER_RUNNING, STOP_PARSER_FLAG
-    IS_PARSER_RUNNING = True
-    STOP_PARSER_FLAG = False
-
-    logger.info(f"Начало фонового импорта. Режим: {mode}. Цель: {total_games_to_fetch} игр.")
-
-    token = get_igdb_token()
-    if not token:
-        logger.error("Token not found")
-        IS_PARSER_RUNNING = False
-        return
-
-    with database.get_session() as db:
-        service = GameIntegrationService(db)
-        fetched_count = 0
-        offset = 0
-
-        while fetched_count < total_games_to_fetch:
-            if STOP_PARSER_FLAG:
-                logger.info("🛑 ПАРСЕР ОСТАНОВЛЕН ПО КОМАНДЕ!")
-                break
-
-            current_limit = min(batch_size, total_games_to_fetch - fetched_count)
-            logger.info(f"Req in IGDB: limit={current_limit}, offset={offset}...")
-
-            if mode == "upcoming":
-                games_data = fetch_upcoming_games(token, limit=current_limit, offset=offset)
-            else:
-                games_data = fetch_top_games(token, limit=current_limit, offset=offset)
-
-            if not games_data:
-                logger.warning("IGDB stop give data. Stopping background import...")
-                break
-
-            for game_json in games_data:
-                try:
-                    service.import_igdb_game(game_json)
-                except Exception as e:
-                    logger.error(f"Error with input {game_json.get('name')}:{e}")
-                    db.rollback()
+def update_steam_ids(current_admin: User = Depends(get_current_admin_user)):
+    # Индекс GetAppList большой — он загружается только в процессе-воркере
+    if is_job_running(STEAM_IDS_JOB):
+        return {"status": "error", "message": "Поиск Steam ID УЖЕ запущен!"}
 
-            fetched_count += len(games_data)
-            offset += current_limit
-
-            if len(games_data) < current_limit:
-                logger.info(f"Final of list games in IGDB")
-                break
-
-        logger.info(f"Finished background import... Total: {fetched_count} games")
-        IS_PARSER_RUNNING = False
+    job_id = enqueue_job(STEAM_IDS_JOB)
+    if job_id is None:
+        return {"status": "error", "message": "Поиск Steam ID уже стоит в очереди!"}
+    return {"status": "success", "message": "Поиск Steam ID запущен в фоне!", "job_id": job_id}
 
 
 # === 1. ЭНДПОИНТ (парсит популярные игры) ===
 @router.post("/import_games")
 def import_games_from_igdb(
-        background_tasks: BackgroundTasks,
         total_limit: int = 250,
         batch_size: int = 128,
         current_admin=Depends(get_current_admin_user)
 ):
-    global IS_PARSER_RUNNING
-    if IS_PARSER_RUNNING:
+    if is_job_running(IMPORT_JOB) or has_queued_job(IMPORT_JOB):
         return {"status": "error", "message": "Парсер УЖЕ работает! Сначала остановите его."}
 
-    background_tasks.add_task(run_background_import, total_limit, batch_size, "top")
-    return {"status": "success", "message": "Запущен парсинг ПОПУЛЯРНЫХ игр."}
+    # Импорт выполняет процесс-воркер, API только ставит задачу в очередь
+    job_id = enqueue_job(IMPORT_JOB, {"total_games_to_fetch": total_limit, "batch_size": batch_size, "mode": "top"})
+    if job_id is None:
+        return {"status": "error", "message": "Парсер УЖЕ работает! Сначала остановите его."}
+    return {"status": "success", "message": "Запущен парсинг ПОПУЛЯРНЫХ игр.", "job_id": job_id}
 
 
 # === 2. ЭНДПОИНТ (парсит ожидаемые релизы) ===
 @router.post("/import-upcoming-games")
 def import_upcoming_games(
-        background_tasks: BackgroundTasks,
         total_limit: int = 100,
         batch_size: int = 50,
         current_admin=Depends(get_current_admin_user)
 ):
-    global IS_PARSER_RUNNING
-    if IS_PARSER_RUNNING:
+    if is_job_running(IMPORT_JOB) or has_queued_job(IMPORT_JOB):
         return {"status": "error", "message": "Парсер УЖЕ работает! Сначала остановите его."}
 
-    background_tasks.add_task(run_background_import, total_limit, batch_size, "upcoming")
-    return {"status": "success", "message": "Запущен парсинг БУДУЩИХ релизов."}
+    job_id = enqueue_job(IMPORT_JOB, {"total_games_to_fetch": total_limit, "batch_size": batch_size, "mode": "upcoming"})
+    if job_id is None:
+        return {"status": "error", "message": "Парсер УЖЕ работает! Сначала остановите его."}
+    return {"status": "success", "message": "Запущен парсинг БУДУЩИХ релизов.", "job_id": job_id}
 
 
 # === 3. ЭНДПОИНТ (Остановка) ===
 @router.post("/stop-import")
 def stop_import_games(current_admin=Depends(get_current_admin_user)):
-    global IS_PARSER_RUNNING, STOP_PARSER_FLAG
-
-    if not IS_PARSER_RUNNING:
+    # Флаг пишется в БД — его увидит тот процесс, где реально идёт импорт.
+    # Ещё не начатые задачи просто снимаются с очереди
+    cancelled = cancel_queued_jobs(IMPORT_JOB)
+    if not request_job_stop(IMPORT_JOB) and not cancelled:
         return {"status": "info", "message": "Парсер и так сейчас не работает."}
 
-    STOP_PARSER_FLAG = True
     return {"status": "success", "message": "Команда на остановку отправлена! Парсер завершит текущую пачку игр и выключится."}
 
 
-def run_sync_steam_tags():
-    logger.info("Начат сбор тегов Steam...")
-    with database.get_session() as db:
-        steam_games = db.query(Game).filter(Game.steam_app_id.isnot(None)).all()
-
-        for game in steam_games:
-            tags = fetch_steam_tags(game.steam_app_id)
-            if tags:
-                existing_tags = db.query(GameGenre.genre_id).filter(GameGenre.game_id == game.id).all()
-                existing_genres_ids = {link [0] for link in existing_tags}
-
-                for tag in tags:
-                    genre_obj = find_or_create_genre(db, name=tag)
-                    if genre_obj.id not in existing_genres_ids:
-                        new_link = GameGenre(game_id=game.id, genre_id=genre_obj.id, is_primary=False)
-                        db.add(new_link)
-                        existing_genres_ids.add(genre_obj.id)
-            db.commit()
-            time.sleep(1.5)
-
-    logger.info("Сбор тегов завершен!")
-
 @router.post("/sync-steam-tags")
 
 def sync_steam_tags(
-        background_tasks: BackgroundTasks,
         current_admin=Depends(get_current_admin_user),
 ):
-    background_tasks.add_task(run_sync_steam_tags)
-    return {"status": "success", "message": "Процесс сбора тегов запущен в фоне!"}
+    if is_job_running(STEAM_TAGS_JOB):
+        return {"status": "error", "message": "Сбор тегов Steam УЖЕ запущен!"}
+
+    job_id = enqueue_job(STEAM_TAGS_JOB)
+    if job_id is None:
+        return {"status": "error", "message": "Сбор тегов Steam уже стоит в очереди!"}
+    return {"status": "success", "message": "Процесс сбора тегов запущен в фоне!", "job_id": job_id}
+
+
+@router.post("/stop-steam-tags")
+def stop_sync_steam_tags(current_admin=Depends(get_current_admin_user)):
+    """Останавливает сбор тегов Steam после текущей игры."""
+
+    cancelled = cancel_queued_jobs(STEAM_TAGS_JOB)
+    if not request_job_stop(STEAM_TAGS_JOB) and not cancelled:
+        return {"status": "info", "message": "Сбор тегов Steam и так сейчас не работает."}
+
+    return {"status": "success", "message": "Команда на остановку сбора тегов Steam отправлена!"}
 
 
 @router.post("/force-update-pulse")
 def force_update_game_pulse(
-        background_tasks: BackgroundTasks,
         current_admin=Depends(get_current_admin_user)
 ):
     """Принудительно запускает обновление онлайна и цен вне расписания."""
 
-    # Обращаемся напрямую к переменной в файле scheduler
-    if my_scheduler.IS_PULSE_RUNNING:
+    if is_job_running(PULSE_JOB):
         return {"status": "error", "message": "Процесс обновления Game Pulse УЖЕ запущен!"}
 
-    background_tasks.add_task(my_scheduler.update_game_pulse_and_prices)
-    return {"status": "success", "message": "Принудительное обновление Game Pulse запущено в фоне."}
+    job_id = enqueue_job(PULSE_JOB, {"force": True})
+    if job_id is None:
+        return {"status": "error", "message": "Обновление Game Pulse уже стоит в очереди!"}
+    return {"status": "success", "message": "Принудительное обновление Game Pulse запущено в фоне.", "job_id": job_id}
 
 
 @router.post("/stop-pulse")
 def stop_game_pulse(current_admin=Depends(get_current_admin_user)):
     """Экстренно останавливает парсинг онлайна и цен."""
 
-    if not my_scheduler.IS_PULSE_RUNNING:
+    cancelled = cancel_queued_jobs(PULSE_JOB)
+    if not request_job_stop(PULSE_JOB) and not cancelled:
         return {"status": "info", "message": "Обновление Game Pulse и так сейчас не работает."}
 
-    my_scheduler.STOP_PULSE_FLAG = True
-    return {"status": "success", "message": "Команда на остановку Game Pulse отправлена!"}
\ No newline at end of file
+    return {"status": "success", "message": "Команда на остановку Game Pulse отправлена!"}
+
+
+@router.get("/http-stats")
+def get_http_stats(current_admin=Depends(get_current_admin_user)):
+    """
+    Статистика внешних HTTP-запросов по хостам: количество, ошибки, повторы, задержки.
+    cache — режим и попадания/промахи кэша ответов по видам запросов.
+    """
+    return {"status": "success", "data": http_client.get_stats(), "cache": http_client.get_cache_stats()}
+
+
+# === ФОНОВЫЕ ЗАДАЧИ (очередь воркера) ===
+@router.get("/jobs", response_model=list[schemas.JobResponse])
+def get_recent_jobs(limit: int = 20, current_admin=Depends(get_current_admin_user)):
+    """Последние задачи очереди: статус, прогресс, скорость и ETA."""
+    return list_jobs(min(limit, 100))
+
+
+@router.get("/jobs/{job_id}", response_model=schemas.JobResponse)
+def get_job_status(job_id: int, current_admin=Depends(get_current_admin_user)):
+    """Статус задачи: счётчики, скорость, ETA и чекпоинт, с которого она продолжится после перезапуска."""
+    job = get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+@router.post("/jobs/{job_id}/cancel")
+def cancel_job(job_id: int, current_admin=Depends(get_current_admin_user)):
+    """Отмена задачи: из очереди — сразу, выполняющаяся остановится на ближайшей проверке."""
+    job_status = request_job_cancel(job_id)
+    if job_status is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if job_status == "running":
+        return {"status": "success", "message": "Команда на отмену отправлена! Задача остановится после текущего шага."}
+    return {"status": "success", "message": f"Задача в статусе {job_status}."}
+
+
+@router.post("/jobs/{job_id}/retry")
+def retry_failed_job(job_id: int, current_admin=Depends(get_current_admin_user)):
+    """Повтор упавшей или отменённой задачи — продолжится с сохранённого чекпоинта."""
+    job_status = retry_job(job_id)
+    if job_status is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if job_status != "queued":
+        return {"status": "info", "message": f"Задача в статусе {job_status} — повтор не нужен."}
+    return {"status": "success", "job_id": job_id, "message": "Задача снова в очереди и продолжится с чекпоинта."}
@@ -1,36 +1,91 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
 
-from dependencies import get_db, get_current_admin_user
+from dependencies import get_db, get_async_db
 import crud
-from schemas import GameCreate, GameResponse
+from catalog_cache import get_cached, set_cached, get_generation
+from schemas import GameCreate, GameResponse, GameFacetsResponse, PulsePointResponse, PriceDropResponse
 
 router = APIRouter(prefix="/games", tags=["Games"])
 
 @router.get("/", response_model=List[GameResponse])
-def read_all_games(
+async def read_all_games(
+        response: Response,
         skip: int = Query(0, ge=0),
         limit: int = Query(100, le=100),
-        search: Optional[str] = Query(None, description="Поиск по названию игры"),
+        search: Optional[str] = Query(None, description="Поиск по названию и описанию игры (с учётом опечаток)"),
         genre_name: Optional[str] = Query(None, description="Название жанра или тега (например: RPG, Мясо)"),
-        platform: Optional[str] = Query(None, description="Платформа (например: PC, PS5)"),
-        sort_by: str = Query("release_date", description="Сортировка: release_date, rating, title, price"),
+        platform: Optional[str] = Query(None, description="Платформы через запятую (например: PC,PS5)"),
+        platform_mode: str = Query("any", description="Несколько платформ: any — любая из, all — все сразу"),
+        sort_by: str = Query("release_date", description="Сортировка: release_date, rating, title, price, current_online, relevance (только вместе с search)"),
         sort_order: str = Query("desc", description="Порядок: asc, desc"),
-        db: Session = Depends(get_db)
+        cursor: Optional[str] = Query(None, description="Курсор следующей страницы (из заголовка X-Next-Cursor). Если задан, skip игнорируется"),
+        db: AsyncSession = Depends(get_async_db)
 ):
-    games = crud.game.get_multi(
-        db=db,
-        skip=skip,
-        limit=limit,
-        search=search,
-        genre_name=genre_name,
-        platform_name=platform,
-        sort_by=sort_by,
-        sort_order=sort_order
-    )
+    try:
+        games = await db.run_sync(
+            crud.game.get_multi_items,
+            skip=skip,
+            limit=limit,
+            search=search,
+            genre_name=genre_name,
+            platform_name=platform,
+            platform_mode=platform_mode,
+            sort_by=sort_by,
+            sort_order=sort_order,
+            cursor=cursor
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    # Полная страница — значит, дальше могут быть ещё игры
+    if games and len(games) == limit and not (search and sort_by == "relevance"):
+        response.headers["X-Next-Cursor"] = crud.game.encode_cursor(games[-1], sort_by)
     return games
 
+@router.get("/facets", response_model=GameFacetsResponse)
+async def read_games_facets(
+        search: Optional[str] = Query(None, description="Поиск по названию и описанию игры"),
+        genre_name: Optional[str] = Query(None, description="Название жанра или тега"),
+        platform: Optional[str] = Query(None, description="Платформы через запятую (например: PC,PS5)"),
+        platform_mode: str = Query("any", description="Несколько платформ: any — любая из, all — все сразу"),
+        db: AsyncSession = Depends(get_async_db)
+):
+    """Счётчики по жанрам, платформам, ценам, годам и доступности для текущих фильтров."""
+    cache_key = ("facets", search, genre_name, platform, platform_mode)
+    facets = get_cached(cache_key)
+    if facets is None:
+        generation = get_generation()
+        facets = await db.run_sync(
+            crud.game.get_facets,
+            search=search,
+            genre_name=genre_name,
+            platform_name=platform,
+            platform_mode=platform_mode
+        )
+        set_cached(cache_key, facets, generation)
+    return facets
+
+@router.get("/price-drops", response_model=List[PriceDropResponse])
+async def read_price_drops(
+        hours: int = Query(24, ge=1, le=24 * 30, description="За какой период сравнивать цену"),
+        limit: int = Query(20, ge=1, le=100),
+        db: AsyncSession = Depends(get_async_db)
+):
+    """Самые большие падения цены за период (по почасовым агрегатам Game Pulse)."""
+    return await db.run_sync(crud.game_pulse.get_price_drops, hours=hours, limit=limit)
+
+@router.get("/{game_id}/pulse", response_model=List[PulsePointResponse])
+async def read_game_pulse_chart(
+        game_id: int,
+        days: int = Query(1, ge=1, le=365, description="Глубина графика в днях"),
+        db: AsyncSession = Depends(get_async_db)
+):
+    """График онлайна и цены игры: до 7 дней — по часам, больше — по дням."""
+    return await db.run_sync(crud.game_pulse.get_chart, game_id=game_id, days=days)
+
 @router.post("/", response_model=GameResponse, status_code=status.HTTP_201_CREATED)
 def create_new_game(
     game_in: GameCreate,
@@ -1,21 +1,22 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List
 
 from models.user import User
-from dependencies import get_db, get_current_user
+from dependencies import get_db, get_async_db, get_current_user
 import crud
 import schemas
 
 router = APIRouter(prefix="/GF_tag", tags=["Users & Profiles"])
 
 @router.get("/{username}", response_model=schemas.UserProfileResponse)
-def get_user_profile(username: str, db: Session = Depends(get_db)):
-    user = crud.user.get_by_username(db, username=username)
+async def get_user_profile(username: str, db: AsyncSession = Depends(get_async_db)):
+    user = await db.run_sync(crud.user.get_by_username, username=username)
     if not user:
         raise HTTPException(status_code=404, detail="Пользователь не найден")
 
-    user_stats = crud.user_game_status.get_stats(db, user_id=user.id)
+    user_stats = await db.run_sync(crud.user_game_status.get_stats, user_id=user.id)
 
     return {
         "id": user.id,
@@ -27,12 +28,12 @@ def get_user_profile(username: str, db: Session = Depends(get_db)):
     }
 
 @router.get("/{username}/games", response_model=List[schemas.UserGameStatusResponse])
-def get_user_games(username: str, db: Session = Depends(get_db)):
-    user = crud.user.get_by_username(db, username=username)
+async def get_user_games(username: str, db: AsyncSession = Depends(get_async_db)):
+    user = await db.run_sync(crud.user.get_by_username, username=username)
     if not user:
         raise HTTPException(status_code=404, detail="Пользователь не найден")
 
-    statuses = crud.user_game_status.get_user_statuses(db, user_id=user.id)
+    statuses = await db.run_sync(crud.user_game_status.get_user_status_items, user_id=user.id)
     return statuses
 
 @router.post("/{username}/games")
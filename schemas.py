@@ -1,6 +1,6 @@
 from datetime import datetime,date
 from pydantic import BaseModel, EmailStr, ConfigDict, Field, computed_field
-from typing import Optional, List
+from typing import Optional, List, Dict, Any
 from enum import Enum
 # ==========================================
 # ПОЛЬЗОВАТЕЛИ
@@ -96,6 +96,36 @@ class GameResponse(BaseModel):
 
     model_config = ConfigDict(from_attributes=True)
 
+class FacetCount(BaseModel):
+    value: str
+    count: int
+
+
+class GameFacetsResponse(BaseModel):
+    genre: List[FacetCount] = []
+    platform: List[FacetCount] = []
+    price: List[FacetCount] = []
+    release_year: List[FacetCount] = []
+    availability: List[FacetCount] = []
+
+class PulsePointResponse(BaseModel):
+    bucket: datetime
+    online_avg: Optional[float] = None
+    online_max: Optional[int] = None
+    price_min: Optional[float] = None
+    price_max: Optional[float] = None
+    price_last: Optional[float] = None
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class PriceDropResponse(BaseModel):
+    game_id: int
+    title: str
+    old_price: float
+    new_price: float
+    drop_percent: float
+
 # ==========================================
 # СТАТУСЫ ИГРОКОВ (My Games)
 # ==========================================
@@ -159,3 +189,41 @@ class ShowcaseResponse(BaseModel):
     upcoming: List[GameResponse]
 
 
+# ==========================================
+# ФОНОВЫЕ ЗАДАЧИ (админка)
+# ==========================================
+class JobResponse(BaseModel):
+    id: int
+    kind: str
+    params: Optional[Dict[str, Any]] = None
+    status: str
+    owner: Optional[str] = None
+    error: Optional[str] = None
+    created_at: Optional[datetime] = None
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+    run_after: Optional[datetime] = None
+    total: Optional[int] = None
+    processed: int = 0
+    failed: int = 0
+    rate: Optional[float] = None  # элементов в секунду в текущем запуске
+    checkpoint: Optional[Dict[str, Any]] = None
+    cancel_requested: bool = False
+
+    @computed_field
+    @property
+    def progress_percent(self) -> Optional[float]:
+        if not self.total:
+            return None
+        return round(min(100.0, (self.processed + self.failed) * 100 / self.total), 1)
+
+    @computed_field
+    @property
+    def eta_seconds(self) -> Optional[int]:
+        if self.status != "running" or not self.total or not self.rate:
+            return None
+        return int(max(0, self.total - self.processed - self.failed) / self.rate)
+
+    model_config = ConfigDict(from_attributes=True)
+
@@ -0,0 +1,124 @@
+import logging
+from typing import Optional
+
+from sqlalchemy import func
+
+from db import database
+from crud import get_or_create_genre_ids
+from scripts.catalog_events import notify_catalog_changed
+from scripts.igdb_parser import get_igdb_token
+from scripts.igdb_pipeline import IgdbImportPipeline
+from scripts.import_service import GameIntegrationService
+from scripts.steam_parser import fetch_steam_tags
+from scripts.job_lock import JobLock, JobBusyError, IMPORT_JOB, STEAM_TAGS_JOB, STEAM_IDS_JOB
+from scripts.job_queue import JobProgress
+from models.game_genre import GameGenre
+from models.game import Game
+
+logger = logging.getLogger("game_import")
+
+# Сколько игр читать из БД за раз при сборе тегов Steam
+STEAM_TAGS_BATCH_SIZE = 200
+
+
+# === ЗАДАЧИ, ЗАПУСКАЕМЫЕ ИЗ АДМИНКИ ===
+# Выполняются только в процессе-воркере (python -m worker), API лишь ставит их в очередь.
+# job — прогресс задачи из очереди: счётчики, чекпоинт (для продолжения после перезапуска), отмена.
+
+def run_background_import(total_games_to_fetch: int, batch_size: int = 128, mode: str = "top",
+                          job: Optional[JobProgress] = None):
+    # Один импорт на весь кластер: блокировка в Postgres, а не глобальная переменная процесса
+    with JobLock(IMPORT_JOB) as lock:
+        if not lock.acquired:
+            raise JobBusyError("Импорт уже выполняется в другом процессе")
+        _run_import(lock, job or JobProgress(), total_games_to_fetch, batch_size, mode)
+
+
+def _run_import(lock: JobLock, job: JobProgress, total_games_to_fetch: int, batch_size: int, mode: str):
+    start_offset = job.checkpoint.get("offset", 0)
+    logger.info(f"Начало фонового импорта. Режим: {mode}. Цель: {total_games_to_fetch} игр. "
+                f"Старт с offset={start_offset}.")
+    job.set_total(total_games_to_fetch)
+
+    token = get_igdb_token()
+    if not token:
+        raise RuntimeError("Не удалось получить токен IGDB")
+
+    # Загрузка страниц (multiquery, несколько запросов вперёд) и запись в БД идут параллельно
+    pipeline = IgdbImportPipeline(token, mode, total_games_to_fetch, batch_size,
+                                  should_stop=lambda: job.should_stop(lock), progress=job,
+                                  start_offset=start_offset)
+    fetched_count = pipeline.run()
+    job.flush()
+    logger.info(f"Finished background import... Total: {fetched_count} games")
+
+
+def run_sync_steam_tags(job: Optional[JobProgress] = None):
+    with JobLock(STEAM_TAGS_JOB) as lock:
+        if not lock.acquired:
+            raise JobBusyError("Сбор тегов Steam уже выполняется в другом процессе")
+        _run_sync_steam_tags(lock, job or JobProgress())
+
+
+def _run_sync_steam_tags(lock: JobLock, job: JobProgress):
+    last_id = job.checkpoint.get("last_game_id", 0)
+    logger.info(f"Начат сбор тегов Steam (с id > {last_id})...")
+
+    with database.get_session() as db:
+        steam_games = db.query(Game).filter(Game.steam_app_id.isnot(None))
+        job.set_total(steam_games.with_entities(func.count(Game.id)).scalar())
+
+        while not job.should_stop(lock):
+            # Пачками по id: не держим в памяти все игры и можем продолжить с last_game_id
+            batch = steam_games.filter(Game.id > last_id).order_by(Game.id).limit(STEAM_TAGS_BATCH_SIZE).all()
+            if not batch:
+                break
+
+            added_links = 0
+            for game in batch:
+                if job.should_stop(lock):
+                    logger.info("🛑 СБОР ТЕГОВ STEAM ОСТАНОВЛЕН ПО КОМАНДЕ!")
+                    break
+
+                try:
+                    tags = fetch_steam_tags(game.steam_app_id)
+                    if tags:
+                        existing_tags = db.query(GameGenre.genre_id).filter(GameGenre.game_id == game.id).all()
+                        existing_genres_ids = {link [0] for link in existing_tags}
+
+                        for genre_id in get_or_create_genre_ids(db, tags).values():
+                            if genre_id not in existing_genres_ids:
+                                new_link = GameGenre(game_id=game.id, genre_id=genre_id, is_primary=False)
+                                db.add(new_link)
+                                existing_genres_ids.add(genre_id)
+                                added_links += 1
+                    db.commit()
+                    job.report(processed=1, last_game_id=game.id)
+                except Exception as e:
+                    db.rollback()
+                    logger.error(f"Ошибка тегов Steam для игры {game.id}: {e}")
+                    job.report(failed=1, last_game_id=game.id)
+                last_id = game.id
+
+            # Фильтры по жанрам в API видят новые теги после каждой пачки, а не в конце всего сбора
+            if added_links:
+                notify_catalog_changed("tags_synced", last_game_id=last_id, links=added_links)
+
+    job.flush()
+    logger.info(f"Сбор тегов завершен! Обработано {job.processed}, ошибок {job.failed}")
+
+
+def run_update_steam_ids(job: Optional[JobProgress] = None):
+    """Заполнение steam_app_id по локальному индексу GetAppList (индекс грузится только в воркере)."""
+    with JobLock(STEAM_IDS_JOB) as lock:
+        if not lock.acquired:
+            raise JobBusyError("Поиск Steam ID уже выполняется в другом процессе")
+        job = job or JobProgress()
+        with database.get_session() as db:
+            stats = GameIntegrationService(db).update_missing_steam_ids(
+                progress=job, should_stop=lambda: job.should_stop(lock)
+            )
+        job.flush()
+        if "error" in stats:
+            raise RuntimeError(stats["error"])
+        logger.info(f"Поиск Steam ID завершён: {stats}")
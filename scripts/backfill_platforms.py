@@ -0,0 +1,44 @@
+import logging
+
+from db import database
+from models.game import Game
+from crud import parse_platforms, set_game_platforms
+
+logger = logging.getLogger("game_import")
+
+BATCH_SIZE = 500
+
+
+def backfill_game_platforms(batch_size: int = BATCH_SIZE) -> int:
+    """
+    Разовый перенос старых строк Game.platforms в таблицы platforms / game_platforms.
+    Идёт пачками по id, коммитит после каждой пачки. Повторный запуск безопасен.
+    """
+    processed = 0
+    last_id = 0
+
+    with database.get_session() as db:
+        while True:
+            games = db.query(Game).filter(
+                Game.id > last_id,
+                Game.platforms.isnot(None)
+            ).order_by(Game.id).limit(batch_size).all()
+
+            if not games:
+                break
+
+            for game in games:
+                set_game_platforms(db, game, parse_platforms(game.platforms))
+
+            db.commit()
+            processed += len(games)
+            last_id = games[-1].id
+            logger.info(f"Backfill платформ: обработано {processed} игр (last id={last_id})")
+
+    logger.info(f"Backfill платформ завершен. Всего: {processed} игр")
+    return processed
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    print(f"Обработано игр: {backfill_game_platforms()}")
@@ -0,0 +1,58 @@
+"""
+Бенчмарк списков каталога: ORM-путь (Game + selectinload + GameResponse from_attributes)
+против проекции колонок (CRUDGame.get_list_items).
+Меряет CPU-время процесса и пик аллокаций (tracemalloc) на страницу из 100 игр.
+
+Запуск (нужна заполненная БД):
+    python -m scripts.bench_listing
+"""
+import time
+import tracemalloc
+import statistics
+
+from db import database
+import crud
+from schemas import GameResponse
+
+PAGE_SIZE = 100
+REPEATS = 30
+
+
+def _orm_page(db, ids):
+    games = crud.game.get_by_ids(db, ids)
+    return [GameResponse.model_validate(g).model_dump() for g in games]
+
+
+def _projection_page(db, ids):
+    items = crud.game.get_list_items(db, ids)
+    return [GameResponse.model_validate(i).model_dump() for i in items]
+
+
+def _measure(fn, ids) -> dict:
+    cpu_ms = []
+    peak_kb = []
+    for _ in range(REPEATS):
+        # Новая сессия на каждый прогон — как на реальный запрос (без identity map)
+        with database.get_session() as db:
+            tracemalloc.start()
+            started = time.process_time()
+            fn(db, ids)
+            cpu_ms.append((time.process_time() - started) * 1000)
+            peak_kb.append(tracemalloc.get_traced_memory()[1] / 1024)
+            tracemalloc.stop()
+    return {
+        "cpu_ms_median": round(statistics.median(cpu_ms), 2),
+        "alloc_peak_kb_median": round(statistics.median(peak_kb), 1),
+    }
+
+
+def run():
+    with database.get_session() as db:
+        ids = crud.game.get_page_ids(db, limit=PAGE_SIZE)
+    print(f"Страница: {len(ids)} игр, повторов: {REPEATS}")
+    print(f"  ORM       : {_measure(_orm_page, ids)}")
+    print(f"  PROJECTION: {_measure(_projection_page, ids)}")
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,96 @@
+"""
+Бенчмарк Game Pulse на локальном стенде вместо Steam (сеть не нужна).
+Поднимает HTTP-сервер, отвечающий как GetNumberOfCurrentPlayers и appdetails
+(с задержкой и случайными 429), и прогоняет через него fetch_steam_pulse
+тем же пулом потоков, что и планировщик. Печатает игр/сек.
+
+Запуск:
+    python -m scripts.bench_pulse --games 500 --workers 8 --latency 0.05
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+import scripts.steam_parser as steam_parser
+
+
+class FakeSteamHandler(BaseHTTPRequestHandler):
+    latency = 0.05
+    error_rate = 0.02
+    requests_served = 0
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, status: int, payload: dict):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        if status == 429:
+            self.send_header("Retry-After", "1")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        FakeSteamHandler.requests_served += 1
+        time.sleep(self.latency)
+        if random.random() < self.error_rate:
+            return self._send(429, {})
+
+        url = urlparse(self.path)
+        params = parse_qs(url.query)
+        if "GetNumberOfCurrentPlayers" in url.path:
+            return self._send(200, {"response": {"result": 1, "player_count": random.randint(0, 50000)}})
+
+        app_ids = params.get("appids", [""])[0].split(",")
+        return self._send(200, {
+            app_id: {"success": True, "data": {"price_overview": {"final": random.randint(0, 6000)}}}
+            for app_id in app_ids if app_id
+        })
+
+
+def run(games: int, workers: int, latency: float, rate: float):
+    FakeSteamHandler.latency = latency
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeSteamHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+
+    steam_parser.STEAM_API_BASE = base
+    steam_parser.STEAM_STORE_BASE = base
+    steam_parser.STEAM_API_RATE = rate
+    steam_parser.STEAM_STORE_RATE = rate
+
+    # Тот же порядок, что и в update_game_pulse_and_prices: цены пачками, онлайн поштучно
+    app_ids = list(range(1, games + 1))
+    batch = steam_parser.STEAM_PRICE_BATCH_SIZE
+    started = time.monotonic()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        price_futures = [pool.submit(steam_parser.fetch_steam_prices, app_ids[i:i + batch])
+                         for i in range(0, len(app_ids), batch)]
+        online = list(pool.map(steam_parser.fetch_steam_online, app_ids))
+        prices = {}
+        for future in price_futures:
+            prices.update(future.result())
+    elapsed = time.monotonic() - started
+    server.shutdown()
+
+    priced = sum(1 for price in prices.values() if price is not None)
+    print(f"games={games} workers={workers} latency={latency}s rate={rate}/s per host")
+    print(f"  {elapsed:.2f} с, {games / elapsed:.1f} игр/с, с ценой: {priced}, "
+          f"онлайн получен: {sum(1 for o in online if o is not None)}, HTTP-запросов: {FakeSteamHandler.requests_served}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--games", type=int, default=500)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--rate", type=float, default=50.0)
+    args = parser.parse_args()
+    run(args.games, args.workers, args.latency, args.rate)
@@ -0,0 +1,59 @@
+"""
+Бенчмарк поиска по каталогу: старый путь (Game.title ILIKE '%term%')
+против нового (tsvector + pg_trgm, см. CRUDGame.get_search_clause).
+
+Запуск (нужна заполненная БД и применённые миграции):
+    python -m scripts.bench_search "witcher" "wicher" "dark souls"
+"""
+import sys
+import time
+import statistics
+
+from sqlalchemy import text
+from sqlalchemy.dialects import postgresql
+
+from db import database
+from models.game import Game
+import crud
+
+REPEATS = 20
+
+
+def _compile(query) -> str:
+    return str(query.statement.compile(dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}))
+
+
+def _measure(db, query) -> dict:
+    timings = []
+    rows = 0
+    for _ in range(REPEATS):
+        started = time.perf_counter()
+        rows = len(query.all())
+        timings.append((time.perf_counter() - started) * 1000)
+
+    plan = db.execute(text("EXPLAIN " + _compile(query))).scalars().all()
+    return {
+        "rows": rows,
+        "median_ms": round(statistics.median(timings), 2),
+        "p95_ms": round(sorted(timings)[int(len(timings) * 0.95) - 1], 2),
+        "seq_scan": any("Seq Scan on games" in line for line in plan),
+    }
+
+
+def run(terms):
+    with database.get_session() as db:
+        for term in terms:
+            ilike_query = db.query(Game.id).filter(Game.title.ilike(f"%{term}%")).limit(100)
+
+            condition, rank = crud.game.get_search_clause(term)
+            search_query = db.query(Game.id).filter(condition).order_by(rank.desc()).limit(100)
+
+            old = _measure(db, ilike_query)
+            new = _measure(db, search_query)
+            print(f"[{term}]")
+            print(f"  ILIKE : {old}")
+            print(f"  SEARCH: {new}")
+
+
+if __name__ == "__main__":
+    run(sys.argv[1:] or ["witcher", "wicher", "souls"])
@@ -0,0 +1,117 @@
+import os
+import json
+import select
+import logging
+import threading
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from db import database
+from catalog_cache import emit_catalog_event, get_generation, set_showcase_snapshot, drop_showcase_snapshot
+
+logger = logging.getLogger("catalog_cache")
+
+# Канал Postgres LISTEN/NOTIFY для событий изменения каталога между процессами
+CHANNEL = "catalog_events"
+RECONNECT_SECONDS = 5.0
+# Витрина пересобирается не чаще раза в столько секунд: импорт и пульс шлют события пачками
+SHOWCASE_REBUILD_INTERVAL = float(os.getenv("SHOWCASE_REBUILD_INTERVAL", "5"))
+
+_rebuild_requested = threading.Event()
+
+
+def publish_catalog_event(db: Session, event: str, **data) -> None:
+    """
+    Отправляет событие остальным процессам через pg_notify в текущей транзакции:
+    Postgres доставит его только после commit (при rollback события не будет).
+    """
+    payload = json.dumps({"event": event, "data": data}, default=str)
+    db.execute(text("SELECT pg_notify(:channel, :payload)"), {"channel": CHANNEL, "payload": payload})
+
+
+def notify_catalog_changed(event: str, **data) -> None:
+    """
+    То же в отдельной транзакции — для кода, который уже закоммитил свои изменения
+    (воркер: пачки импорта, Game Pulse, теги). Ошибка отправки не роняет задачу:
+    кэш в API всё равно устареет по TTL.
+    """
+    try:
+        with database.get_session() as db:
+            publish_catalog_event(db, event, **data)
+            db.commit()
+    except Exception as e:
+        logger.error(f"Не удалось отправить событие каталога {event}: {e}")
+
+
+def rebuild_showcase_snapshot() -> None:
+    """Пересобирает снимок витрины главной страницы из БД и публикует его в память процесса."""
+    import crud  # crud сам публикует события через этот модуль
+
+    try:
+        with database.get_session() as db:
+            payload = crud.game.build_showcase_snapshot(db)
+        generation = set_showcase_snapshot(payload)
+        logger.info(f"Снимок витрины пересобран (поколение {generation})")
+    except Exception as e:
+        # Без снимка следующий запрос соберёт витрину сам
+        drop_showcase_snapshot()
+        logger.error(f"Не удалось пересобрать снимок витрины: {e}")
+
+
+def on_catalog_event(event: str, data: dict) -> None:
+    """Подписчик API-процесса: кэш уже сброшен, витрину пересоберёт rebuild_showcase_loop."""
+    _rebuild_requested.set()
+
+
+def rebuild_showcase_loop(stop_event: threading.Event) -> None:
+    """
+    Пересборщик витрины (отдельный поток API-процесса). События сливаются: после
+    пересборки следующая — не раньше чем через SHOWCASE_REBUILD_INTERVAL секунд, и только
+    если поколение каталога с тех пор изменилось. Событие, пришедшее во время паузы,
+    не теряется — по нему будет одна пересборка сразу после неё.
+    """
+    built_generation = None
+    while not stop_event.is_set():
+        if not _rebuild_requested.wait(RECONNECT_SECONDS):
+            continue
+        _rebuild_requested.clear()
+        # Поколение читается до сборки: изменения во время сборки дадут ещё одну
+        generation = get_generation()
+        if generation == built_generation:
+            continue
+        rebuild_showcase_snapshot()
+        built_generation = generation
+        stop_event.wait(SHOWCASE_REBUILD_INTERVAL)
+
+
+def listen_catalog_events(stop_event: threading.Event) -> None:
+    """
+    Слушает канал catalog_events и переиздаёт события локально (emit_catalog_event):
+    кэш каталога процесса сбрасывается, подписчики (витрина) получают событие.
+    Работает в отдельном потоке до stop_event, при обрыве соединения переподключается.
+    """
+    while not stop_event.is_set():
+        conn = None
+        try:
+            conn = database.engine.raw_connection()
+            driver_conn = conn.driver_connection
+            driver_conn.autocommit = True
+            with driver_conn.cursor() as cursor:
+                cursor.execute(f"LISTEN {CHANNEL}")
+            logger.info(f"Подписка на события каталога ({CHANNEL}) активна")
+
+            while not stop_event.is_set():
+                if select.select([driver_conn], [], [], RECONNECT_SECONDS) == ([], [], []):
+                    continue
+                driver_conn.poll()
+                while driver_conn.notifies:
+                    notify = driver_conn.notifies.pop(0)
+                    message = json.loads(notify.payload)
+                    emit_catalog_event(message["event"], **message.get("data", {}))
+        except Exception as e:
+            logger.error(f"Подписка на события каталога оборвалась: {e}")
+            stop_event.wait(RECONNECT_SECONDS)
+        finally:
+            if conn is not None:
+                conn.invalidate()
@@ -0,0 +1,220 @@
+import os
+import time
+import random
+import logging
+import threading
+from collections import defaultdict, deque
+from typing import Dict, Optional
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from scripts.rate_limiter import get_bucket
+from scripts.response_cache import response_cache, cache_key, ReplayMissError
+
+logger = logging.getLogger("http_client")
+
+DEFAULT_TIMEOUT = float(os.getenv("HTTP_DEFAULT_TIMEOUT", "10"))
+MAX_RETRIES = int(os.getenv("HTTP_MAX_RETRIES", "3"))
+BACKOFF_BASE = float(os.getenv("HTTP_BACKOFF_BASE", "0.5"))
+BACKOFF_MAX = float(os.getenv("HTTP_BACKOFF_MAX", "20"))
+PER_HOST_CONCURRENCY = int(os.getenv("HTTP_PER_HOST_CONCURRENCY", "8"))
+BREAKER_THRESHOLD = int(os.getenv("HTTP_BREAKER_THRESHOLD", "10"))
+BREAKER_COOLDOWN = float(os.getenv("HTTP_BREAKER_COOLDOWN", "60"))
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class CircuitOpenError(requests.RequestException):
+    """Хост временно отключён автоматом (слишком много ошибок подряд)."""
+
+
+class CircuitBreaker:
+    """
+    Простой автомат на хост: после threshold ошибок подряд размыкается на cooldown секунд.
+    После паузы пропускает один пробный запрос (half-open): успех — замыкается, ошибка — снова пауза.
+    429 ошибкой хоста не считается (его гасит token bucket), но пробный запрос с 429
+    тоже завершает пробу: хост ещё не готов — снова пауза.
+    """
+
+    def __init__(self, threshold: int, cooldown: float):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.probing = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.opened_at is None:
+                return True
+            if time.monotonic() - self.opened_at >= self.cooldown and not self.probing:
+                self.probing = True
+                return True
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self.probing = False
+
+    def record_throttled(self) -> None:
+        with self._lock:
+            if self.probing:
+                self.probing = False
+                self.opened_at = time.monotonic()
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            self.probing = False
+            if self.failures >= self.threshold:
+                self.opened_at = time.monotonic()
+
+
+class HostStats:
+    """Счётчики и задержки запросов к одному хосту (последние 1000 замеров)."""
+
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.retries = 0
+        self.latencies = deque(maxlen=1000)
+
+    def as_dict(self) -> dict:
+        latencies = sorted(self.latencies)
+        count = len(latencies)
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "retries": self.retries,
+            "latency_avg_ms": round(sum(latencies) / count * 1000, 1) if count else None,
+            "latency_p50_ms": round(latencies[count // 2] * 1000, 1) if count else None,
+            "latency_p95_ms": round(latencies[min(count - 1, int(count * 0.95))] * 1000, 1) if count else None,
+        }
+
+
+class IntegrationHttpClient:
+    """
+    Общий HTTP-клиент для всех интеграций (Steam, IGDB, Twitch OAuth):
+    - keep-alive пулы соединений по хостам (одна requests.Session на процесс);
+    - таймауты по умолчанию;
+    - повтор с экспоненциальной паузой и джиттером на сетевых ошибках, 429 и 5xx;
+    - circuit breaker и ограничение параллельных запросов на хост;
+    - опциональный token bucket на хост (rate, запросов в секунду);
+    - статистика запросов и задержек (get_stats);
+    - кэш ответов на диске для запросов с cache="<вид>" (см. scripts/response_cache.py).
+    """
+
+    def __init__(self):
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=16, pool_maxsize=PER_HOST_CONCURRENCY * 2)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+        self._lock = threading.Lock()
+        self._semaphores: Dict[str, threading.BoundedSemaphore] = {}
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._stats: Dict[str, HostStats] = defaultdict(HostStats)
+
+    def _host_state(self, host: str) -> tuple:
+        with self._lock:
+            if host not in self._semaphores:
+                self._semaphores[host] = threading.BoundedSemaphore(PER_HOST_CONCURRENCY)
+                self._breakers[host] = CircuitBreaker(BREAKER_THRESHOLD, BREAKER_COOLDOWN)
+            return self._semaphores[host], self._breakers[host], self._stats[host]
+
+    @staticmethod
+    def _backoff(attempt: int, retry_after: Optional[float] = None) -> float:
+        if retry_after:
+            return min(retry_after, BACKOFF_MAX)
+        # "Full jitter": случайная пауза от 0 до экспоненциального потолка
+        return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * (2 ** attempt)))
+
+    def request(self, method: str, url: str, rate: Optional[float] = None,
+                max_retries: int = MAX_RETRIES, cache: Optional[str] = None, **kwargs) -> requests.Response:
+        if cache and response_cache.enabled:
+            key = cache_key(method, url, kwargs.get("params"), kwargs.get("data"))
+            cached = response_cache.get(cache, key)
+            if cached is not None:
+                return cached
+            if response_cache.mode == "replay":
+                raise ReplayMissError(f"Нет ответа в кэше (replay): {method} {url}")
+
+            response = self._request(method, url, rate, max_retries, **kwargs)
+            response_cache.put(cache, key, response)
+            return response
+
+        return self._request(method, url, rate, max_retries, **kwargs)
+
+    def _request(self, method: str, url: str, rate: Optional[float], max_retries: int,
+                 **kwargs) -> requests.Response:
+        host = urlparse(url).netloc
+        semaphore, breaker, stats = self._host_state(host)
+        bucket = get_bucket(host, rate) if rate else None
+        kwargs.setdefault("timeout", DEFAULT_TIMEOUT)
+
+        attempt = 0
+        while True:
+            if not breaker.allow():
+                raise CircuitOpenError(f"Circuit open for {host}")
+            if bucket:
+                bucket.acquire()
+
+            started = time.monotonic()
+            retry_after = None
+            try:
+                with semaphore:
+                    response = self.session.request(method, url, **kwargs)
+            except requests.RequestException as e:
+                stats.requests += 1
+                stats.errors += 1
+                breaker.record_failure()
+                if attempt >= max_retries:
+                    raise
+                logger.warning(f"{method} {host}: {e}. Повтор #{attempt + 1}")
+            else:
+                stats.requests += 1
+                stats.latencies.append(time.monotonic() - started)
+
+                if response.status_code not in RETRY_STATUSES:
+                    breaker.record_success()
+                    if bucket:
+                        bucket.reward()
+                    return response
+
+                stats.errors += 1
+                header = response.headers.get("Retry-After")
+                retry_after = float(header) if header and header.isdigit() else None
+                if bucket:
+                    bucket.penalize(retry_after)
+                if response.status_code >= 500:
+                    breaker.record_failure()
+                else:
+                    breaker.record_throttled()
+                if attempt >= max_retries:
+                    return response
+                logger.warning(f"{method} {host}: HTTP {response.status_code}. Повтор #{attempt + 1}")
+
+            stats.retries += 1
+            time.sleep(self._backoff(attempt, retry_after))
+            attempt += 1
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        return self.request("POST", url, **kwargs)
+
+    def get_stats(self) -> Dict[str, dict]:
+        with self._lock:
+            return {host: stats.as_dict() for host, stats in self._stats.items()}
+
+    def get_cache_stats(self) -> dict:
+        return response_cache.get_stats()
+
+
+http_client = IntegrationHttpClient()
@@ -0,0 +1,136 @@
+import os
+import logging
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from dotenv import load_dotenv
+
+from db import database
+from models.integration_token import IntegrationToken
+from scripts.http_client import http_client
+
+load_dotenv()
+
+logger = logging.getLogger("game_import")
+
+CLIENT_ID = os.getenv("TWITCH_CLIENT_ID")
+CLIENT_SECRET = os.getenv("TWITCH_CLIENT_SECRET")
+TWITCH_OAUTH_URL = os.getenv("TWITCH_OAUTH_URL", "https://id.twitch.tv/oauth2/token")
+
+# Токен обновляется заранее, за столько секунд до истечения expires_in
+IGDB_TOKEN_REFRESH_MARGIN = int(os.getenv("IGDB_TOKEN_REFRESH_MARGIN", "600"))
+# Хранить токен в БД (integration_tokens), чтобы процессы и перезапуски не просили новый.
+# Токен лежит в таблице открытым текстом, поэтому по умолчанию выключено
+IGDB_TOKEN_PERSIST = os.getenv("IGDB_TOKEN_PERSIST", "0").lower() in ("1", "true", "yes")
+
+TOKEN_NAME = "igdb"
+
+
+class IgdbTokenProvider:
+    """
+    OAuth-токен Twitch для IGDB (client_credentials), один на процесс:
+    - get() отдаёт закэшированный токен и обновляет его за IGDB_TOKEN_REFRESH_MARGIN до истечения;
+    - при холодном старте сначала пробует живой токен из БД (если IGDB_TOKEN_PERSIST);
+    - invalidate(token) после 401: следующий get() получит новый токен.
+    Обновление идёт под блокировкой — параллельные потоки не запрашивают токен дважды.
+    """
+
+    def __init__(self, persist: bool = IGDB_TOKEN_PERSIST):
+        self.persist = persist
+        self._token: Optional[str] = None
+        self._expires_at: Optional[datetime] = None
+        self._lock = threading.Lock()
+
+    def _is_fresh(self, expires_at: Optional[datetime]) -> bool:
+        margin = timedelta(seconds=IGDB_TOKEN_REFRESH_MARGIN)
+        return expires_at is not None and expires_at - margin > datetime.now(timezone.utc)
+
+    def is_current(self, token: Optional[str]) -> bool:
+        """Можно ли ещё пользоваться этим токеном (он текущий и не истекает)."""
+        return token is not None and token == self._token and self._is_fresh(self._expires_at)
+
+    def get(self) -> Optional[str]:
+        if self._token and self._is_fresh(self._expires_at):
+            return self._token
+
+        with self._lock:
+            if self._token and self._is_fresh(self._expires_at):
+                return self._token
+            if self.persist and self._load_from_db():
+                return self._token
+            return self._refresh()
+
+    def invalidate(self, token: str) -> None:
+        """Токен отвергнут IGDB (401). Сбрасывает его, если его ещё не заменили."""
+        with self._lock:
+            if token == self._token:
+                self._token = None
+                self._expires_at = None
+                if self.persist:
+                    self._delete_from_db(token)
+
+    def _refresh(self) -> Optional[str]:
+        # Учётные данные — в теле формы, а не в URL: URL попадает в логи ошибок http_client
+        response = http_client.post(TWITCH_OAUTH_URL, data={
+            "client_id": CLIENT_ID,
+            "client_secret": CLIENT_SECRET,
+            "grant_type": "client_credentials",
+        })
+        if response.status_code != 200:
+            logger.error(f"Ошибка авторизации Twitch (HTTP {response.status_code}): {response.text}")
+            return None
+
+        data = response.json()
+        self._token = data.get("access_token")
+        self._expires_at = datetime.now(timezone.utc) + timedelta(seconds=int(data.get("expires_in", 0)))
+        logger.info(f"Получен новый токен IGDB, действует до {self._expires_at.isoformat()}")
+        if self.persist and self._token:
+            self._save_to_db()
+        return self._token
+
+    # === ХРАНЕНИЕ В БД ===
+    # Ошибки БД не мешают работе: токен просто будет запрошен у Twitch.
+
+    def _load_from_db(self) -> bool:
+        try:
+            with database.get_session() as db:
+                row = db.get(IntegrationToken, TOKEN_NAME)
+                if row is None or not self._is_fresh(row.expires_at):
+                    return False
+                self._token, self._expires_at = row.access_token, row.expires_at
+                return True
+        except Exception as e:
+            logger.warning(f"Не удалось прочитать токен IGDB из БД: {e}")
+            return False
+
+    def _save_to_db(self) -> None:
+        try:
+            with database.get_session() as db:
+                stmt = pg_insert(IntegrationToken).values(
+                    name=TOKEN_NAME, access_token=self._token, expires_at=self._expires_at,
+                    updated_at=datetime.now(timezone.utc)
+                )
+                db.execute(stmt.on_conflict_do_update(
+                    index_elements=[IntegrationToken.name],
+                    set_={"access_token": stmt.excluded.access_token, "expires_at": stmt.excluded.expires_at,
+                          "updated_at": stmt.excluded.updated_at}
+                ))
+                db.commit()
+        except Exception as e:
+            logger.warning(f"Не удалось сохранить токен IGDB в БД: {e}")
+
+    def _delete_from_db(self, token: str) -> None:
+        try:
+            with database.get_session() as db:
+                db.query(IntegrationToken).filter(
+                    IntegrationToken.name == TOKEN_NAME,
+                    IntegrationToken.access_token == token
+                ).delete(synchronize_session=False)
+                db.commit()
+        except Exception as e:
+            logger.warning(f"Не удалось удалить токен IGDB из БД: {e}")
+
+
+igdb_token = IgdbTokenProvider()
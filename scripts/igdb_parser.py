@@ -1,52 +1,88 @@
 import os
-import requests
 import time
-from dotenv import load_dotenv
+from typing import List, Optional, Tuple
+from scripts.http_client import http_client
+from scripts.igdb_auth import igdb_token, CLIENT_ID
 
-load_dotenv()
+IGDB_API_BASE = os.getenv("IGDB_API_BASE", "https://api.igdb.com/v4")
+# Лимит IGDB — 4 запроса в секунду на клиента
+IGDB_RATE = float(os.getenv("IGDB_RATE", "4"))
+# В одном multiquery IGDB принимает не больше 10 подзапросов
+IGDB_MULTIQUERY_MAX = 10
 
-CLIENT_ID = os.getenv("TWITCH_CLIENT_ID")
-CLIENT_SECRET = os.getenv("TWITCH_CLIENT_SECRET")
+GAME_FIELDS = "name, summary, first_release_date, cover.url, genres.name, platforms.name, involved_companies.company.name, websites.url, websites.category"
 
 def get_igdb_token():
-    url = f"https://id.twitch.tv/oauth2/token?client_id={CLIENT_ID}&client_secret={CLIENT_SECRET}&grant_type=client_credentials"
-    response = requests.post(url)
-    if response.status_code == 200:
-        return response.json().get("access_token")
-    print("Ошибка авторизации:", response.text)
-    return None
+    """Текущий токен IGDB (из кэша провайдера; запрос к Twitch — только когда он истекает)."""
+    return igdb_token.get()
 
-def _make_igdb_request(token: str, query: str):
-    """Базовая функция для запросов к IGDB (убирает дублирование кода)"""
-    url = "https://api.igdb.com/v4/games"
-    headers = {
-        "Client-ID": CLIENT_ID,
-        "Authorization": f"Bearer {token}",
-        "Accept": "application/json"
-    }
-    response = requests.post(url, headers=headers, data=query)
-    if response.status_code == 200:
-        return response.json()
+def _make_igdb_request(token: Optional[str], query: str, endpoint: str = "games"):
+    """
+    Базовая функция для запросов к IGDB (убирает дублирование кода).
+    Истёкший или отозванный токен заменяется на свежий от провайдера,
+    на 401 запрос один раз повторяется с новым токеном.
+    """
+    url = f"{IGDB_API_BASE}/{endpoint}"
+    if not igdb_token.is_current(token):
+        token = igdb_token.get()
+
+    for attempt in range(2):
+        headers = {
+            "Client-ID": CLIENT_ID,
+            "Authorization": f"Bearer {token}",
+            "Accept": "application/json"
+        }
+        response = http_client.post(url, headers=headers, data=query, rate=IGDB_RATE, cache="igdb")
+        if response.status_code == 200:
+            return response.json()
+        if response.status_code == 401 and attempt == 0:
+            igdb_token.invalidate(token)
+            token = igdb_token.get()
+            if token:
+                continue
+        break
     print(f"Ошибка при получении данных из IGDB:", response.text)
     return None
 
-def fetch_top_games(token, limit=50, offset=0):
-    query = f"""
-    fields name, summary, first_release_date, cover.url, genres.name, involved_companies.company.name, websites.url, websites.category;
+def _games_query(mode: str, limit: int, offset: int) -> str:
+    """Тело запроса к /games для режима импорта: "top" (популярные) или "upcoming" (ожидаемые)."""
+    if mode == "upcoming":
+        return f"""
+    fields {GAME_FIELDS}, hypes;
+    where first_release_date > {int(time.time()) // 3600 * 3600} & hypes != null;
+    sort hypes desc;
+    limit {limit};
+    offset {offset};
+    """
+    return f"""
+    fields {GAME_FIELDS};
     where rating_count > 50;
     sort rating desc;
     limit {limit};
     offset {offset};
     """
-    return _make_igdb_request(token, query)
+
+def fetch_top_games(token, limit=50, offset=0):
+    return _make_igdb_request(token, _games_query("top", limit, offset))
 
 def fetch_upcoming_games(token, limit=50, offset=0):
-    current_time = int(time.time())
-    query = f"""
-    fields name, summary, first_release_date, cover.url, genres.name, involved_companies.company.name, websites.url, websites.category, hypes;
-    where first_release_date > {current_time} & hypes != null;
-    sort hypes desc;
-    limit {limit};
-    offset {offset};
+    return _make_igdb_request(token, _games_query("upcoming", limit, offset))
+
+def fetch_games_pages(token: str, mode: str, pages: List[Tuple[int, int]]) -> List[Optional[list]]:
+    """
+    Несколько страниц (limit, offset) одним запросом к /multiquery (до 10 страниц).
+    Возвращает результаты в том же порядке; None — страница не получена.
     """
-    return _make_igdb_request(token, query)
\ No newline at end of file
+    if len(pages) > IGDB_MULTIQUERY_MAX:
+        raise ValueError(f"IGDB multiquery accepts at most {IGDB_MULTIQUERY_MAX} queries")
+
+    body = "".join(
+        f'query games "p{i}" {{{_games_query(mode, limit, offset)}}};\n'
+        for i, (limit, offset) in enumerate(pages)
+    )
+    data = _make_igdb_request(token, body, endpoint="multiquery")
+    if data is None:
+        return [None] * len(pages)
+
+    results = {item.get("name"): item.get("result", []) for item in data}
+    return [results.get(f"p{i}") for i in range(len(pages))]
@@ -0,0 +1,191 @@
+import os
+import time
+import queue
+import logging
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from typing import Callable, List, Optional, Tuple
+
+from db import database
+from scripts.catalog_events import notify_catalog_changed
+from scripts.import_service import GameIntegrationService
+from scripts.igdb_parser import fetch_games_pages, IGDB_MULTIQUERY_MAX
+from scripts.job_lock import STOP_CHECK_INTERVAL
+from scripts.job_queue import JobProgress
+
+logger = logging.getLogger("game_import")
+
+# Сколько страниц IGDB запрашивать одним multiquery
+IGDB_PAGES_PER_REQUEST = min(int(os.getenv("IGDB_PAGES_PER_REQUEST", "4")), IGDB_MULTIQUERY_MAX)
+# Сколько multiquery-запросов держать в полёте одновременно
+IGDB_FETCH_CONCURRENCY = int(os.getenv("IGDB_FETCH_CONCURRENCY", "2"))
+# Сколько полученных страниц может ждать записи в БД (дальше загрузка ждёт запись)
+IGDB_QUEUE_SIZE = int(os.getenv("IGDB_QUEUE_SIZE", "8"))
+
+_END = object()
+
+
+class IgdbFetchError(RuntimeError):
+    """Страница IGDB не получена: импорт прерван, продолжить можно с чекпоинта."""
+
+
+def _plan_pages(total: int, batch_size: int, start_offset: int = 0) -> List[Tuple[int, int]]:
+    """Страницы (limit, offset), покрывающие total игр, начиная с start_offset."""
+    return [(min(batch_size, total - offset), offset) for offset in range(start_offset, total, batch_size)]
+
+
+class IgdbImportPipeline:
+    """
+    Импорт IGDB в две стадии, которые работают одновременно:
+    - загрузка (отдельный поток): страницы multiquery-запросами, до IGDB_FETCH_CONCURRENCY
+      запросов в полёте, результаты кладутся в ограниченную очередь строго по порядку offset;
+    - запись (вызывающий поток, владеет сессией БД): import_igdb_batch на каждую страницу.
+    Пока пишется одна страница, следующие уже скачиваются. Очередь ограничена —
+    если БД не успевает, загрузка притормаживает и память не растёт.
+    """
+
+    def __init__(self, token: str, mode: str, total: int, batch_size: int,
+                 should_stop: Callable[[], bool] = lambda: False,
+                 progress: Optional[JobProgress] = None, start_offset: int = 0):
+        self.token = token
+        self.mode = mode
+        self.total = total
+        self.batch_size = batch_size
+        self.should_stop = should_stop
+        self.progress = progress or JobProgress()
+        self.start_offset = start_offset
+        self.pages: "queue.Queue" = queue.Queue(maxsize=IGDB_QUEUE_SIZE)
+        self.stop_event = threading.Event()
+        self.error: Optional[Exception] = None
+
+    # === СТАДИЯ ЗАГРУЗКИ ===
+
+    def _put(self, item) -> bool:
+        while not self.stop_event.is_set():
+            try:
+                self.pages.put(item, timeout=1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _produce(self) -> None:
+        plan = _plan_pages(self.total, self.batch_size, self.start_offset)
+        chunks = [plan[i:i + IGDB_PAGES_PER_REQUEST] for i in range(0, len(plan), IGDB_PAGES_PER_REQUEST)]
+        # Пул закрывается без ожидания: по команде остановки не ждём ответов IGDB, которые уже в полёте
+        pool = ThreadPoolExecutor(max_workers=IGDB_FETCH_CONCURRENCY, thread_name_prefix="igdb-fetch")
+        try:
+            in_flight = deque()
+            next_chunk = 0
+            finished = False
+
+            while not finished and not self.stop_event.is_set():
+                while next_chunk < len(chunks) and len(in_flight) < IGDB_FETCH_CONCURRENCY:
+                    chunk = chunks[next_chunk]
+                    in_flight.append((chunk, pool.submit(fetch_games_pages, self.token, self.mode, chunk)))
+                    next_chunk += 1
+                if not in_flight:
+                    break
+
+                chunk, future = in_flight.popleft()
+                pages = self._wait(future)
+                if pages is None:
+                    break
+                for (limit, offset), games in zip(chunk, pages):
+                    if games is None:
+                        self.error = IgdbFetchError(f"IGDB не вернул страницу offset={offset}")
+                        logger.error(f"{self.error}. Загрузка остановлена.")
+                        finished = True
+                        break
+                    if not games:
+                        logger.info("Final of list games in IGDB")
+                        finished = True
+                        break
+                    if not self._put((offset, games)):
+                        finished = True
+                        break
+                    if len(games) < limit:
+                        logger.info("Final of list games in IGDB")
+                        finished = True
+                        break
+        except Exception as e:
+            logger.error(f"Ошибка загрузки страниц IGDB: {e}")
+            self.error = IgdbFetchError(f"Ошибка загрузки страниц IGDB: {e}")
+        finally:
+            pool.shutdown(wait=False, cancel_futures=True)
+            self._put(_END)
+
+    def _wait(self, future):
+        """Результат multiquery-запроса; None — импорт остановлен, пока запрос был в полёте."""
+        while not self.stop_event.is_set():
+            try:
+                return future.result(timeout=STOP_CHECK_INTERVAL)
+            except FutureTimeout:
+                continue
+        return None
+
+    # === СТАДИЯ ЗАПИСИ ===
+
+    def _get(self):
+        """
+        Следующая страница из очереди. Пока её нет (IGDB медленно отвечает или ждёт лимит),
+        каждые STOP_CHECK_INTERVAL секунд проверяется команда остановки. None — остановлено.
+        """
+        while True:
+            try:
+                return self.pages.get(timeout=STOP_CHECK_INTERVAL)
+            except queue.Empty:
+                if self.should_stop():
+                    return None
+
+    def run(self) -> int:
+        """
+        Выполняет импорт, возвращает число записанных игр.
+        Если страницу не удалось получить — IgdbFetchError (чекпоинт указывает на неё).
+        """
+        producer = threading.Thread(target=self._produce, name="igdb-producer", daemon=True)
+        producer.start()
+
+        imported = 0
+        started = time.monotonic()
+        with database.get_session() as db:
+            service = GameIntegrationService(db)
+            while True:
+                waited = time.monotonic()
+                item = None if self.should_stop() else self._get()
+                if item is None:
+                    logger.info("🛑 ПАРСЕР ОСТАНОВЛЕН ПО КОМАНДЕ!")
+                    break
+                if item is _END:
+                    break
+                offset, games = item
+                wait_seconds = time.monotonic() - waited
+
+                batch_started = time.monotonic()
+                try:
+                    stats = service.import_igdb_batch(games)
+                    created = stats["created"]
+                    processed, failed = created + stats["skipped"], stats["failed"]
+                except Exception as e:
+                    logger.error(f"Error with IGDB batch at offset {offset}: {e}")
+                    db.rollback()
+                    created, processed, failed = 0, 0, len(games)
+                imported += len(games)
+                # Страницы приходят строго по порядку: после перезапуска продолжим со следующей
+                self.progress.report(processed=processed, failed=failed, offset=offset + self.batch_size)
+                if created:
+                    notify_catalog_changed("games_imported", offset=offset, created=created)
+
+                elapsed = time.monotonic() - started
+                logger.info(
+                    f"IGDB offset={offset}: {len(games)} игр записано за {time.monotonic() - batch_started:.2f} с "
+                    f"(ожидание загрузки {wait_seconds:.2f} с), всего {imported} "
+                    f"({imported / max(elapsed, 0.001):.1f} игр/с), в очереди {self.pages.qsize()} страниц"
+                )
+
+        self.stop_event.set()
+        producer.join(timeout=30)
+        if self.error is not None and not self.should_stop():
+            raise self.error
+        return imported
@@ -1,15 +1,25 @@
 import os
 import re
-import time
 import logging
-import requests
+from typing import Callable
 from datetime import datetime, timezone
+from sqlalchemy import select, update, values, column, Integer
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.orm import Session
 from models.game import Game
 from models.game_details import GameDetails
+from models.game_genre import GameGenre
+from models.game_platform import GamePlatform
 from models.developers import Developer
 from models.genre import Genre
-from models.game_genre import GameGenre
+from models.platform import Platform
+from scripts.http_client import http_client
+from scripts.steam_parser import STEAM_STORE_BASE, STEAM_STORE_RATE
+from scripts.steam_app_index import SteamAppIndex, get_steam_app_index, clean_game_title, \
+    STEAM_APP_LIST_PATH, STEAM_MATCH_MIN_SCORE
+from scripts.catalog_events import publish_catalog_event
+from scripts.scheduler import arm_release_job
+import crud
 
 log_dir = "logs"
 if not os.path.exists(log_dir):
@@ -36,14 +46,11 @@ logger.info("="*50)
 class GameIntegrationService:
     def __init__(self, db: Session):
         self.db = db
-        self.http_client = requests.Session()
+        self.http_client = http_client
 
     def clean_game_title(self, title: str) -> str:
         """Очистка названия для поиска в Steam"""
-        clean = re.sub(
-            r'(?i)\s*(remastered|director\'s cut|game of the year edition|definitive edition|hd remaster|part i|part ii|part 1|part 2)',
-            '', title)
-        return re.sub(r'[™®]', '', clean).strip()
+        return clean_game_title(title)
 
     def get_steam_id_from_igdb(self, data: dict) -> int | None:
         """Извлечение ID из ссылок IGDB (категория 13)"""
@@ -57,17 +64,30 @@ class GameIntegrationService:
         return None
 
     def get_steam_app_id(self, game_name: str) -> int | None:
-        """Запасной поиск через Steam API"""
+        """
+        Steam ID по названию: сначала локальный индекс GetAppList (поиск в памяти),
+        если дампа нет — запасной поиск через storesearch. Из выдачи берётся
+        не первый результат, а самый похожий по названию (с порогом уверенности).
+        """
+        index = get_steam_app_index()
+        if index is not None:
+            app_id, score = index.match(game_name)
+            if score >= STEAM_MATCH_MIN_SCORE:
+                return app_id
+            logger.info(f"Steam ID для '{game_name}' не найден в индексе (лучшее совпадение {app_id}, {score})")
+            return None
+
         def _search(term):
-            url = "https://store.steampowered.com/api/storesearch/"
+            url = f"{STEAM_STORE_BASE}/api/storesearch/"
             params = {"term": term, "l": "english", "cc": "US"}
             try:
-                time.sleep(0.5)
-                response = self.http_client.get(url, params=params, timeout=10)
+                response = self.http_client.get(url, params=params, rate=STEAM_STORE_RATE, timeout=10,
+                                                cache="steam_search")
                 if response.status_code == 200:
                     items = response.json().get("items", [])
                     if items:
-                        return items[0].get("id")
+                        found = SteamAppIndex([{"appid": item.get("id"), "name": item.get("name")} for item in items])
+                        return found.resolve(game_name)
             except Exception:
                 pass
             return None
@@ -80,9 +100,67 @@ class GameIntegrationService:
             return _search(cleaned)
         return None
 
+    def update_missing_steam_ids(self, batch_size: int = 500, progress=None,
+                                 should_stop: Callable[[], bool] = lambda: False) -> dict:
+        """
+        Заполняет steam_app_id у игр, где его нет, через локальный индекс Steam.
+        Идёт пачками по id, пачка записывается одним UPDATE ... FROM (VALUES ...).
+        appid, уже занятые другой игрой (steam_app_id уникален), пропускаются.
+        progress — JobProgress задачи из очереди (чекпоинт last_game_id).
+        """
+        index = get_steam_app_index()
+        if index is None:
+            return {"error": f"Дамп приложений Steam не найден ({STEAM_APP_LIST_PATH}). "
+                             f"Запустите: python -m scripts.steam_app_index --download"}
+
+        taken = {row[0] for row in self.db.query(Game.steam_app_id).filter(Game.steam_app_id.isnot(None))}
+        stats = {"checked": 0, "matched": 0, "duplicates": 0, "unmatched": 0}
+        last_id = progress.checkpoint.get("last_game_id", 0) if progress else 0
+        if progress:
+            progress.set_total(progress.processed + self.db.query(Game.id).filter(
+                Game.id > last_id, Game.steam_app_id.is_(None)).count())
+
+        while not should_stop():
+            games = self.db.query(Game.id, Game.title).filter(
+                Game.id > last_id,
+                Game.steam_app_id.is_(None)
+            ).order_by(Game.id).limit(batch_size).all()
+            if not games:
+                break
+
+            matches = []
+            for game_id, title in games:
+                app_id = index.resolve(title)
+                if app_id is None:
+                    stats["unmatched"] += 1
+                elif app_id in taken:
+                    stats["duplicates"] += 1
+                else:
+                    taken.add(app_id)
+                    matches.append((game_id, app_id))
+
+            if matches:
+                found = values(column("id", Integer), column("steam_app_id", Integer), name="found").data(matches)
+                self.db.execute(
+                    update(Game).where(Game.id == found.c.id).values(steam_app_id=found.c.steam_app_id)
+                    .execution_options(synchronize_session=False)
+                )
+                publish_catalog_event(self.db, "steam_ids_updated", count=len(matches))
+                self.db.commit()
+
+            stats["checked"] += len(games)
+            stats["matched"] += len(matches)
+            last_id = games[-1][0]
+            if progress:
+                progress.report(processed=len(games), last_game_id=last_id)
+            logger.info(f"Steam ID: проверено {stats['checked']}, найдено {stats['matched']}")
+
+        return stats
+
     def import_igdb_game(self, data: dict):
         game_title = data.get("name", "Unknown Game")
         steam_id = None  # Гарантируем наличие переменной
+        upcoming_release = None  # Дата релиза, если добавлена ещё не вышедшая игра
 
         try:
             companies = data.get("involved_companies", [])
@@ -90,12 +168,7 @@ class GameIntegrationService:
             if companies:
                 dev_name = companies[0].get("company", {}).get("name")
                 if dev_name:
-                    developer = self.db.query(Developer).filter(Developer.title == dev_name).first()
-                    if not developer:
-                        developer = Developer(title=dev_name)
-                        self.db.add(developer)
-                        self.db.flush()
-                    dev_id = developer.id
+                    dev_id = crud.get_developer_id(self.db, dev_name)
 
             # Проверка игры
             game = self.db.query(Game).filter(Game.igdb_id == data.get("id")).first()
@@ -110,11 +183,14 @@ class GameIntegrationService:
                 if "first_release_date" in data:
                     release_date_obj = datetime.fromtimestamp(data["first_release_date"], tz=timezone.utc)#UTC, чтобы время везде было одинаковым
 
+                is_upcoming = release_date_obj is not None and release_date_obj > datetime.now(timezone.utc)
+
                 game = Game(
                     title=game_title,
                     igdb_id=data.get("id"),
                     steam_app_id=steam_id,
                     release_date=release_date_obj,
+                    is_available=not is_upcoming,
                     cover_url=data.get("cover", {}).get("url", "").replace('t_thumb', 't_1080p'),
                     dev_game=dev_id
                 )
@@ -129,25 +205,29 @@ class GameIntegrationService:
                 self.db.add(game_details)
                 self.db.flush()
 
+                crud.set_game_platforms(
+                    self.db, game, crud.normalize_platforms([p.get("name") for p in data.get("platforms", [])])
+                )
+
                 logger.info(f"УСПЕХ: Добавлена игра '{game_title}' (Steam ID: {steam_id})")
+                if is_upcoming:
+                    upcoming_release = release_date_obj
             else:
                 logger.info(f"ПРОПУСК: Игра '{game_title}' уже есть в базе")
 
             # Жанры...
             if "genres" in data:
                 for idx, g_info in enumerate(data["genres"]):
-                    g_name = g_info.get("name")
-                    genre = self.db.query(Genre).filter(Genre.name == g_name).first()
-                    if not genre:
-                        genre = Genre(name=g_name)
-                        self.db.add(genre)
-                        self.db.flush()
-
-                    exists = self.db.query(GameGenre).filter_by(game_id=game.id, genre_id=genre.id).first()
+                    genre_id = crud.get_genre_id(self.db, g_info.get("name"))
+
+                    exists = self.db.query(GameGenre).filter_by(game_id=game.id, genre_id=genre_id).first()
                     if not exists:
-                        self.db.add(GameGenre(game_id=game.id, genre_id=genre.id, is_primary=(idx == 0)))
+                        self.db.add(GameGenre(game_id=game.id, genre_id=genre_id, is_primary=(idx == 0)))
 
             self.db.commit()
+            if upcoming_release:
+                # Будильник релизов переставляется, если эта игра выйдет раньше уже назначенной
+                arm_release_job(upcoming_release)
             return game
 
         except Exception as e:
@@ -156,3 +236,167 @@ class GameIntegrationService:
             raise e
 
 
+
+    # === ПАЧЕЧНЫЙ ИМПОРТ ===
+
+    def _parse_igdb_game(self, data: dict) -> dict:
+        """Переводит JSON игры из IGDB в строку для таблицы games (+ разработчик и жанры)."""
+        companies = data.get("involved_companies", [])
+        dev_name = companies[0].get("company", {}).get("name") if companies else None
+
+        release_date_obj = None
+        if "first_release_date" in data:
+            release_date_obj = datetime.fromtimestamp(data["first_release_date"], tz=timezone.utc)
+
+        return {
+            "igdb_id": data.get("id"),
+            "title": data.get("name", "Unknown Game"),
+            "release_date": release_date_obj,
+            "is_available": not (release_date_obj is not None and release_date_obj > datetime.now(timezone.utc)),
+            "cover_url": data.get("cover", {}).get("url", "").replace('t_thumb', 't_1080p'),
+            "steam_app_id": self.get_steam_id_from_igdb(data),
+            "developer": dev_name,
+            "genres": [g["name"] for g in data.get("genres", []) if len(g.get("name") or "") >= 2],
+            "platforms": crud.normalize_platforms([p.get("name") for p in data.get("platforms", [])]),
+            "summary": data.get("summary"),
+        }
+
+    def _dimension_ids(self, get_or_create_ids, name_col, names: list) -> dict:
+        """
+        find-or-create справочника (разработчики, жанры) для пачки игр. Имена обрезаются
+        до длины колонки, пачка идёт в SAVEPOINT; если она падает — повторяем по одному
+        имени в своём SAVEPOINT: плохое имя пропускается (игра импортируется без него),
+        а не откатывает всю страницу. Возвращает {исходное имя: id}.
+        """
+        max_length = name_col.type.length
+        clean = {name: name.strip()[:max_length].rstrip() for name in names if name and name.strip()}
+        values = list(dict.fromkeys(clean.values()))
+        if not values:
+            return {}
+
+        try:
+            with self.db.begin_nested():
+                ids = get_or_create_ids(self.db, values)
+        except Exception as e:
+            logger.warning(f"Справочник {name_col.class_.__tablename__} не записался пачкой "
+                           f"({e.__class__.__name__}), пишем по одному имени")
+            ids = {}
+            for value in values:
+                try:
+                    with self.db.begin_nested():
+                        ids.update(get_or_create_ids(self.db, [value]))
+                except Exception as e:
+                    logger.error(f"ОШИБКА: '{value}' не добавлен в {name_col.class_.__tablename__}: "
+                                 f"{str(e).splitlines()[0]}")
+
+        return {name: ids[value] for name, value in clean.items() if value in ids}
+
+    def _insert_games(self, rows: list) -> tuple:
+        """
+        Вставляет новые игры одним INSERT ... ON CONFLICT (igdb_id) DO NOTHING RETURNING.
+        Если пачка падает (CHECK, дубль steam_app_id и т.п.) — повторяет построчно,
+        каждую строку в своём SAVEPOINT: плохие строки пропускаются, остальные сохраняются.
+        Возвращает ({igdb_id: game_id}, [(title, ошибка)]).
+        """
+        if not rows:
+            return {}, []
+
+        def insert(batch):
+            stmt = pg_insert(Game).values(batch).on_conflict_do_nothing(index_elements=[Game.igdb_id]) \
+                .returning(Game.id, Game.igdb_id)
+            return {igdb_id: game_id for game_id, igdb_id in self.db.execute(stmt).all()}
+
+        try:
+            with self.db.begin_nested():
+                return insert(rows), []
+        except Exception as e:
+            logger.warning(f"Пачка игр не вставилась целиком ({e.__class__.__name__}), вставляем построчно")
+
+        created, failed = {}, []
+        for row in rows:
+            try:
+                with self.db.begin_nested():
+                    created.update(insert([row]))
+            except Exception as e:
+                failed.append((row["title"], str(e).splitlines()[0]))
+        return created, failed
+
+    def import_igdb_batch(self, games_data: list) -> dict:
+        """
+        Импорт целой страницы IGDB за фиксированное число запросов:
+        по одному SELECT на существующие igdb_id, разработчиков, жанры и платформы,
+        пачечные INSERT ... ON CONFLICT для игр, описаний и связей с жанрами и платформами, один commit.
+        Ошибка в одной игре не откатывает остальные (SAVEPOINT на строку).
+        Возвращает счётчики {"created", "skipped", "failed"}.
+        """
+        parsed = [self._parse_igdb_game(data) for data in games_data if data.get("id")]
+        if not parsed:
+            return {"created": 0, "skipped": 0, "failed": 0}
+
+        existing = dict(self.db.execute(
+            select(Game.igdb_id, Game.id).where(Game.igdb_id.in_([row["igdb_id"] for row in parsed]))
+        ).all())
+        new_rows = [row for row in parsed if row["igdb_id"] not in existing]
+
+        # Запасной поиск Steam ID (HTTP) — только для новых игр без ссылки на Steam в IGDB
+        for row in new_rows:
+            if not row["steam_app_id"]:
+                row["steam_app_id"] = self.get_steam_app_id(row["title"])
+
+        dev_ids = self._dimension_ids(crud.get_or_create_developer_ids, Developer.title,
+                                      [row["developer"] for row in new_rows])
+        genre_ids = self._dimension_ids(crud.get_or_create_genre_ids, Genre.name,
+                                        [name for row in parsed for name in row["genres"]])
+        platform_ids = self._dimension_ids(crud.get_or_create_platform_ids, Platform.name,
+                                           [name for row in parsed for name in row["platforms"]])
+
+        created, failed = self._insert_games([{
+            "igdb_id": row["igdb_id"],
+            "title": row["title"],
+            "release_date": row["release_date"],
+            "is_available": row["is_available"],
+            "cover_url": row["cover_url"],
+            "steam_app_id": row["steam_app_id"],
+            "dev_game": dev_ids.get(row["developer"]),
+            "platforms": crud.platforms_label(row["platforms"]),
+        } for row in new_rows])
+
+        if created:
+            self.db.execute(pg_insert(GameDetails).values([
+                {"game_id": created[row["igdb_id"]], "description": {"en": row["summary"], "ru": None}}
+                for row in new_rows if row["igdb_id"] in created
+            ]).on_conflict_do_nothing())
+
+        # Жанры — и для новых, и для уже существующих игр (как в import_igdb_game)
+        game_ids = {**existing, **created}
+        links = [
+            {"game_id": game_ids[row["igdb_id"]], "genre_id": genre_ids[name], "is_primary": idx == 0}
+            for row in parsed if row["igdb_id"] in game_ids
+            for idx, name in enumerate(dict.fromkeys(row["genres"])) if name in genre_ids
+        ]
+        if links:
+            # Без цели конфликта: пропускаются и дубли связей, и второй первичный жанр у игры
+            self.db.execute(pg_insert(GameGenre).values(links).on_conflict_do_nothing())
+
+        # Платформы — тоже для всех игр страницы: game_platforms — источник истины для фильтра каталога
+        platform_links = list({
+            (game_ids[row["igdb_id"]], platform_ids[name])
+            for row in parsed if row["igdb_id"] in game_ids
+            for name in row["platforms"] if name in platform_ids
+        })
+        if platform_links:
+            self.db.execute(pg_insert(GamePlatform).values([
+                {"game_id": game_id, "platform_id": platform_id} for game_id, platform_id in platform_links
+            ]).on_conflict_do_nothing())
+
+        self.db.commit()
+
+        for title, error in failed:
+            logger.error(f"ОШИБКА: Не удалось импортировать '{title}': {error}")
+        logger.info(f"Пачка IGDB: добавлено {len(created)}, уже были {len(existing)}, ошибок {len(failed)}")
+
+        upcoming = [row["release_date"] for row in new_rows if row["igdb_id"] in created and not row["is_available"]]
+        if upcoming:
+            arm_release_job(min(upcoming))
+
+        return {"created": len(created), "skipped": len(existing), "failed": len(failed)}
@@ -0,0 +1,164 @@
+import os
+import time
+import socket
+import zlib
+import logging
+from datetime import datetime, timezone
+
+from sqlalchemy import text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+from db import database
+from models.job_control import JobControl
+
+logger = logging.getLogger("job_lock")
+
+# Пространство ключей advisory lock-ов приложения (первый int4 из пары ключей)
+LOCK_NAMESPACE = 4242
+
+# Имена задач
+PULSE_JOB = "game_pulse"
+IMPORT_JOB = "igdb_import"
+STEAM_TAGS_JOB = "steam_tags_sync"
+STEAM_IDS_JOB = "steam_ids_backfill"
+RELEASES_JOB = "release_flip"
+PULSE_COMPACT_JOB = "pulse_compact"
+
+OWNER = f"{socket.gethostname()}:{os.getpid()}"
+STOP_CHECK_INTERVAL = 2.0
+
+
+class JobBusyError(RuntimeError):
+    """Блокировка задачи занята другим процессом — задачу из очереди нужно повторить позже."""
+
+
+def _lock_key(name: str) -> int:
+    return zlib.crc32(name.encode("utf-8")) & 0x7fffffff
+
+
+class JobLock:
+    """
+    Кластерная блокировка задачи на advisory lock Postgres.
+    Блокировка живёт, пока открыто отдельное соединение: если процесс упал,
+    Postgres снимет её сам. Использование:
+        with JobLock(PULSE_JOB) as lock:
+            if not lock.acquired:
+                return
+            ...
+            if lock.should_stop():
+                break
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.key = _lock_key(name)
+        self.acquired = False
+        self._conn = None
+        self._last_stop_check = 0.0
+        self._stop = False
+
+    def acquire(self) -> bool:
+        self._conn = database.engine.connect()
+        try:
+            self.acquired = bool(self._conn.execute(
+                text("SELECT pg_try_advisory_lock(:ns, :key)"), {"ns": LOCK_NAMESPACE, "key": self.key}
+            ).scalar())
+            self._conn.commit()
+        except Exception:
+            self._discard_conn()
+            raise
+
+        if not self.acquired:
+            self._conn.close()
+            self._conn = None
+            return False
+
+        try:
+            with database.get_session() as db:
+                stmt = pg_insert(JobControl).values(
+                    name=self.name, owner=OWNER, started_at=datetime.now(timezone.utc), stop_requested=False
+                )
+                db.execute(stmt.on_conflict_do_update(
+                    index_elements=[JobControl.name],
+                    set_={"owner": stmt.excluded.owner, "started_at": stmt.excluded.started_at, "stop_requested": False}
+                ))
+                db.commit()
+        except Exception:
+            # __exit__ не вызовется: снимаем блокировку сами, иначе задача встанет во всём кластере
+            self.release()
+            raise
+        return True
+
+    def should_stop(self) -> bool:
+        """Запрошена ли остановка (из любого процесса). Проверка в БД не чаще раза в 2 секунды."""
+        now = time.monotonic()
+        if not self._stop and now - self._last_stop_check >= STOP_CHECK_INTERVAL:
+            self._last_stop_check = now
+            with database.get_session() as db:
+                self._stop = bool(db.query(JobControl.stop_requested).filter(JobControl.name == self.name).scalar())
+        return self._stop
+
+    def release(self) -> None:
+        if not self.acquired:
+            return
+        # Сначала снимаем блокировку: от неё зависит весь кластер, а job_control — лишь статус
+        try:
+            self._conn.execute(text("SELECT pg_advisory_unlock(:ns, :key)"), {"ns": LOCK_NAMESPACE, "key": self.key})
+            self._conn.commit()
+            self._conn.close()
+        except Exception as e:
+            logger.error(f"Не удалось снять блокировку {self.name}: {e}")
+            self._discard_conn()
+        finally:
+            self._conn = None
+            self.acquired = False
+
+        try:
+            with database.get_session() as db:
+                # Только если блокировку ещё не успел взять другой процесс
+                db.query(JobControl).filter(JobControl.name == self.name, JobControl.owner == OWNER).update(
+                    {"owner": None, "stop_requested": False}, synchronize_session=False
+                )
+                db.commit()
+        except Exception as e:
+            logger.error(f"Не удалось сбросить статус задачи {self.name}: {e}")
+
+    def _discard_conn(self) -> None:
+        """
+        Закрывает соединение, не возвращая его в пул. Сессионная advisory-блокировка
+        переживает rollback при возврате в пул — снимется она только вместе с соединением.
+        """
+        if self._conn is not None:
+            try:
+                self._conn.invalidate()
+            finally:
+                self._conn = None
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.release()
+        return False
+
+
+def is_job_running(name: str) -> bool:
+    """Держит ли сейчас кто-то в кластере блокировку задачи."""
+    with database.get_session() as db:
+        return bool(db.execute(text(
+            "SELECT EXISTS (SELECT 1 FROM pg_locks WHERE locktype = 'advisory' AND granted "
+            "AND classid = :ns AND objid = :key AND objsubid = 2)"
+        ), {"ns": LOCK_NAMESPACE, "key": _lock_key(name)}).scalar())
+
+
+def request_job_stop(name: str) -> bool:
+    """Просит задачу остановиться. Флаг увидит процесс-владелец, где бы он ни работал."""
+    if not is_job_running(name):
+        return False
+    with database.get_session() as db:
+        db.query(JobControl).filter(JobControl.name == name).update(
+            {"stop_requested": True}, synchronize_session=False
+        )
+        db.commit()
+    return True
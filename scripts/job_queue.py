@@ -0,0 +1,268 @@
+import os
+import time
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from sqlalchemy import text, or_
+
+from db import database
+from models.job import Job
+from scripts.job_lock import OWNER, is_job_running
+
+logger = logging.getLogger("job_queue")
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+# Как часто задача пишет прогресс в БД и проверяет запрос отмены
+PROGRESS_INTERVAL = float(os.getenv("JOB_PROGRESS_INTERVAL", "5"))
+# Задача running без отчётов дольше этого времени (и без блокировки) считается брошенной
+JOB_STALE_SECONDS = int(os.getenv("JOB_STALE_SECONDS", "120"))
+# Через сколько повторить задачу, чья блокировка занята, и сколько всего ждать до отказа
+JOB_BUSY_RETRY_SECONDS = int(os.getenv("JOB_BUSY_RETRY_SECONDS", "30"))
+JOB_BUSY_MAX_WAIT_SECONDS = int(os.getenv("JOB_BUSY_MAX_WAIT_SECONDS", "3600"))
+
+
+def enqueue_job(kind: str, params: Optional[dict] = None) -> Optional[int]:
+    """
+    Ставит задачу в очередь воркера. Возвращает id задачи или None,
+    если задача этого вида уже ждёт в очереди (дубликаты не копим).
+    """
+    with database.get_session() as db:
+        # Сериализуем постановку задач одного вида, чтобы два запроса не поставили дубль
+        db.execute(text("SELECT pg_advisory_xact_lock(hashtext(:kind))"), {"kind": kind})
+        if db.query(Job.id).filter(Job.kind == kind, Job.status == QUEUED).first():
+            return None
+
+        job = Job(kind=kind, params=params or {}, status=QUEUED)
+        db.add(job)
+        db.commit()
+        logger.info(f"Задача #{job.id} ({kind}) поставлена в очередь: {params or {}}")
+        return job.id
+
+
+def claim_next_job() -> Optional[Job]:
+    """
+    Забирает самую старую ожидающую задачу. FOR UPDATE SKIP LOCKED — несколько
+    воркеров не возьмут одну и ту же задачу и не ждут друг друга.
+    """
+    with database.get_session() as db:
+        job = db.query(Job).filter(
+            Job.status == QUEUED,
+            or_(Job.run_after.is_(None), Job.run_after <= datetime.now(timezone.utc))
+        ).order_by(Job.id).with_for_update(skip_locked=True).first()
+        if job is None:
+            return None
+
+        job.status = RUNNING
+        job.owner = OWNER
+        job.started_at = job.updated_at = datetime.now(timezone.utc)
+        job.rate = None
+        db.commit()
+        db.refresh(job)
+        db.expunge(job)
+        return job
+
+
+def finish_job(job_id: int, error: Optional[str] = None, cancelled: bool = False) -> None:
+    with database.get_session() as db:
+        db.query(Job).filter(Job.id == job_id).update({
+            "status": FAILED if error else (CANCELLED if cancelled else DONE),
+            "error": error,
+            "finished_at": datetime.now(timezone.utc),
+        }, synchronize_session=False)
+        db.commit()
+
+
+def requeue_busy_job(job_id: int) -> bool:
+    """
+    Блокировка задачи занята (например, принудительный пульс пришёл во время планового):
+    задача возвращается в очередь с паузой JOB_BUSY_RETRY_SECONDS. Если она ждёт дольше
+    JOB_BUSY_MAX_WAIT_SECONDS — помечается failed. Возвращает True, если задача снова в очереди.
+    """
+    now = datetime.now(timezone.utc)
+    with database.get_session() as db:
+        job = db.query(Job).filter(Job.id == job_id).with_for_update().first()
+        if job is None:
+            return False
+        if job.created_at and job.created_at < now - timedelta(seconds=JOB_BUSY_MAX_WAIT_SECONDS):
+            job.status = FAILED
+            job.error = f"Задача {job.kind} уже выполняется другим процессом (ожидание дольше {JOB_BUSY_MAX_WAIT_SECONDS} с)"
+            job.finished_at = now
+            requeued = False
+        else:
+            job.status = QUEUED
+            job.owner = None
+            job.run_after = now + timedelta(seconds=JOB_BUSY_RETRY_SECONDS)
+            requeued = True
+        job.updated_at = now
+        db.commit()
+        return requeued
+
+
+def has_queued_job(kind: str) -> bool:
+    with database.get_session() as db:
+        return db.query(Job.id).filter(Job.kind == kind, Job.status == QUEUED).first() is not None
+
+
+def cancel_queued_jobs(kind: str) -> int:
+    """Снимает с очереди ещё не начатые задачи вида kind. Возвращает их количество."""
+    with database.get_session() as db:
+        cancelled = db.query(Job).filter(Job.kind == kind, Job.status == QUEUED).update({
+            "status": CANCELLED,
+            "finished_at": datetime.now(timezone.utc),
+        }, synchronize_session=False)
+        db.commit()
+        return cancelled
+
+
+
+def request_job_cancel(job_id: int) -> Optional[str]:
+    """
+    Отмена задачи по id: ожидающая снимается с очереди сразу, выполняющаяся
+    получает флаг cancel_requested и останавливается на ближайшей проверке.
+    Возвращает новый статус или None, если задача не найдена.
+    """
+    with database.get_session() as db:
+        job = db.query(Job).filter(Job.id == job_id).with_for_update().first()
+        if job is None:
+            return None
+        if job.status == QUEUED:
+            job.status = CANCELLED
+            job.finished_at = datetime.now(timezone.utc)
+        elif job.status == RUNNING:
+            job.cancel_requested = True
+        db.commit()
+        return job.status
+
+
+def retry_job(job_id: int) -> Optional[str]:
+    """
+    Повторный запуск упавшей или отменённой задачи: она возвращается в очередь
+    с сохранёнными чекпоинтом и счётчиками и продолжит с того же места.
+    Возвращает новый статус (или текущий, если задача не завершилась) либо None, если её нет.
+    """
+    with database.get_session() as db:
+        job = db.query(Job).filter(Job.id == job_id).with_for_update().first()
+        if job is None:
+            return None
+        if job.status in (FAILED, CANCELLED):
+            job.status = QUEUED
+            job.owner = None
+            job.error = None
+            job.finished_at = None
+            job.run_after = None
+            job.cancel_requested = False
+        db.commit()
+        return job.status
+
+
+def get_job(job_id: int) -> Optional[Job]:
+    with database.get_session() as db:
+        job = db.get(Job, job_id)
+        if job is not None:
+            db.expunge(job)
+        return job
+
+
+def list_jobs(limit: int = 20) -> list:
+    with database.get_session() as db:
+        jobs = db.query(Job).order_by(Job.id.desc()).limit(limit).all()
+        db.expunge_all()
+        return jobs
+
+
+def requeue_stale_jobs() -> int:
+    """
+    Возвращает в очередь задачи, чей воркер умер (перезапуск, падение): статус running,
+    отчётов не было дольше JOB_STALE_SECONDS и блокировка задачи никем не удерживается.
+    Чекпоинт и счётчики сохраняются — задача продолжит с того же места.
+    """
+    stale_before = datetime.now(timezone.utc) - timedelta(seconds=JOB_STALE_SECONDS)
+    requeued = 0
+    with database.get_session() as db:
+        stale = db.query(Job).filter(Job.status == RUNNING, Job.updated_at < stale_before) \
+            .with_for_update(skip_locked=True).all()
+        for job in stale:
+            if is_job_running(job.kind):
+                continue
+            job.status = QUEUED
+            job.owner = None
+            requeued += 1
+            logger.warning(f"Задача #{job.id} ({job.kind}) брошена воркером — возвращена в очередь "
+                           f"с чекпоинтом {job.checkpoint}")
+        db.commit()
+    return requeued
+
+
+class JobProgress:
+    """
+    Прогресс выполняющейся задачи: счётчики, чекпоинт и кооперативная отмена.
+    report() копит изменения в памяти и пишет их в jobs не чаще раза в PROGRESS_INTERVAL
+    (заодно читает cancel_requested). Для запусков не из очереди (планировщик) —
+    JobProgress() без id: всё работает, но ничего не пишется в БД.
+    """
+
+    def __init__(self, job_id: Optional[int] = None, checkpoint: Optional[dict] = None,
+                 processed: int = 0, failed: int = 0):
+        self.job_id = job_id
+        self.checkpoint = dict(checkpoint or {})
+        self.processed = processed
+        self.failed = failed
+        self.total: Optional[int] = None
+        self.cancelled = False
+        self._run_started = time.monotonic()
+        self._run_base = processed + failed
+        self._last_flush = 0.0
+
+    @classmethod
+    def for_job(cls, job: Job) -> "JobProgress":
+        return cls(job.id, job.checkpoint, job.processed or 0, job.failed or 0)
+
+    @property
+    def rate(self) -> float:
+        done = self.processed + self.failed - self._run_base
+        return done / max(time.monotonic() - self._run_started, 0.001)
+
+    def set_total(self, total: int) -> None:
+        self.total = total
+        self.flush()
+
+    def report(self, processed: int = 0, failed: int = 0, **checkpoint) -> None:
+        self.processed += processed
+        self.failed += failed
+        self.checkpoint.update(checkpoint)
+        if time.monotonic() - self._last_flush >= PROGRESS_INTERVAL:
+            self.flush()
+
+    def should_stop(self, lock=None) -> bool:
+        """Запрошена ли отмена: по id задачи (jobs.cancel_requested) или стоп-флагом JobLock."""
+        if lock is not None and lock.should_stop():
+            self.cancelled = True
+        if not self.cancelled and time.monotonic() - self._last_flush >= PROGRESS_INTERVAL:
+            self.flush()
+        return self.cancelled
+
+    def flush(self) -> None:
+        """Пишет прогресс в БД (и служит heartbeat-ом), читает флаг отмены."""
+        self._last_flush = time.monotonic()
+        if self.job_id is None:
+            return
+        with database.get_session() as db:
+            values = {
+                "processed": self.processed,
+                "failed": self.failed,
+                "rate": round(self.rate, 3),
+                "checkpoint": self.checkpoint,
+                "updated_at": datetime.now(timezone.utc),
+            }
+            if self.total is not None:
+                values["total"] = self.total
+            db.query(Job).filter(Job.id == self.job_id).update(values, synchronize_session=False)
+            self.cancelled = self.cancelled or \
+                bool(db.query(Job.cancel_requested).filter(Job.id == self.job_id).scalar())
+            db.commit()
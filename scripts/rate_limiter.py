@@ -0,0 +1,71 @@
+import threading
+import time
+import logging
+from typing import Dict, Optional
+
+logger = logging.getLogger("rate_limiter")
+
+
+class TokenBucket:
+    """
+    Потокобезопасный token bucket с адаптивной скоростью (AIMD).
+    - acquire() блокирует поток, пока не появится токен;
+    - penalize() при 429/5xx: скорость делится пополам, можно поставить паузу (Retry-After);
+    - reward() при успешном ответе: скорость плавно растёт обратно до max_rate.
+    """
+
+    def __init__(self, rate: float, capacity: Optional[float] = None, min_rate: Optional[float] = None):
+        self.max_rate = rate
+        self.rate = rate
+        self.min_rate = min_rate or max(rate / 16, 0.05)
+        self.capacity = capacity or max(rate, 1.0)
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self.paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def acquire(self) -> None:
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                if now < self.paused_until:
+                    wait = self.paused_until - now
+                else:
+                    self._refill(now)
+                    if self.tokens >= 1:
+                        self.tokens -= 1
+                        return
+                    wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+    def penalize(self, retry_after: Optional[float] = None) -> None:
+        with self._lock:
+            self.rate = max(self.min_rate, self.rate / 2)
+            self.tokens = 0
+            if retry_after:
+                self.paused_until = max(self.paused_until, time.monotonic() + retry_after)
+        logger.warning(f"Лимит запросов снижен до {self.rate:.2f} req/s (retry_after={retry_after})")
+
+    def reward(self) -> None:
+        with self._lock:
+            if self.rate < self.max_rate:
+                self.rate = min(self.max_rate, self.rate + self.max_rate * 0.05)
+
+
+# === ОБЩИЕ ЛИМИТЕРЫ ПО ХОСТАМ ===
+_buckets: Dict[str, TokenBucket] = {}
+_buckets_lock = threading.Lock()
+
+
+def get_bucket(host: str, rate: float) -> TokenBucket:
+    """Один bucket на хост на весь процесс (создаётся при первом обращении)."""
+    with _buckets_lock:
+        bucket = _buckets.get(host)
+        if bucket is None:
+            bucket = TokenBucket(rate)
+            _buckets[host] = bucket
+        return bucket
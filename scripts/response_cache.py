@@ -0,0 +1,144 @@
+"""
+Кэш ответов внешних API (IGDB, Steam) на диске: SQLite, тело ответа сжато zlib.
+Ключ — sha256 от метода, URL, параметров и тела запроса (без заголовков авторизации).
+
+Режимы (HTTP_CACHE_MODE, по умолчанию off — кэш включается явно для разработки и бенчмарков):
+    off    — кэш не используется;
+    on     — свежие ответы берутся из кэша, новые сохраняются (если у вида TTL > 0);
+    record — всегда сеть, сохраняется каждый успешный ответ (для будущих прогонов без сети);
+    replay — только кэш, без сети, TTL не учитывается; промах — ReplayMissError.
+"""
+import os
+import json
+import time
+import zlib
+import sqlite3
+import hashlib
+import logging
+import threading
+from collections import defaultdict
+from typing import Dict, Optional
+
+import requests
+
+logger = logging.getLogger("http_client")
+
+HTTP_CACHE_MODE = os.getenv("HTTP_CACHE_MODE", "off").lower()
+HTTP_CACHE_PATH = os.getenv("HTTP_CACHE_PATH", "data/http_cache.sqlite3")
+
+# TTL ответов по видам запросов, в секундах (переопределяется HTTP_CACHE_TTL_<ВИД>).
+# Онлайн и цены меняются постоянно — в обычном режиме они не кэшируются, только пишутся в record
+DEFAULT_TTLS = {
+    "igdb": 7 * 24 * 3600,
+    "steam_tags": 7 * 24 * 3600,
+    "steam_search": 30 * 24 * 3600,
+    "steam_pulse": 0,
+}
+
+MODES = ("off", "on", "record", "replay")
+
+
+class ReplayMissError(requests.RequestException):
+    """В режиме replay ответа на запрос нет в кэше."""
+
+
+def _ttl(kind: str) -> int:
+    return int(os.getenv(f"HTTP_CACHE_TTL_{kind.upper()}", DEFAULT_TTLS.get(kind, 0)))
+
+
+def cache_key(method: str, url: str, params=None, data=None) -> str:
+    if isinstance(data, bytes):
+        data = data.decode("utf-8", "replace")
+    raw = json.dumps([method.upper(), url, sorted((params or {}).items()), data], default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """Потокобезопасный (своё соединение SQLite на поток) кэш ответов со счётчиками по видам."""
+
+    def __init__(self, path: str = HTTP_CACHE_PATH, mode: str = HTTP_CACHE_MODE):
+        if mode not in MODES:
+            raise ValueError(f"HTTP_CACHE_MODE must be one of {MODES}")
+        self.path = path
+        self.mode = mode
+        self._local = threading.local()
+        self._stats_lock = threading.Lock()
+        self._stats: Dict[str, Dict[str, int]] = defaultdict(lambda: {"hits": 0, "misses": 0, "writes": 0})
+
+    @property
+    def enabled(self) -> bool:
+        return self.mode != "off"
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, kind TEXT NOT NULL, url TEXT NOT NULL, status INTEGER NOT NULL, "
+                "content_type TEXT, body BLOB NOT NULL, created_at REAL NOT NULL)"
+            )
+            conn.commit()
+            self._local.conn = conn
+        return conn
+
+    def _count(self, kind: str, counter: str) -> None:
+        with self._stats_lock:
+            self._stats[kind][counter] += 1
+
+    def get(self, kind: str, key: str) -> Optional[requests.Response]:
+        """Ответ из кэша: свежий по TTL вида (в replay — любой) или None."""
+        if self.mode in ("off", "record") or (self.mode == "on" and _ttl(kind) <= 0):
+            return None
+
+        row = self._conn().execute(
+            "SELECT url, status, content_type, body, created_at FROM responses WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None or (self.mode != "replay" and row[4] + _ttl(kind) < time.time()):
+            self._count(kind, "misses")
+            return None
+
+        self._count(kind, "hits")
+        response = requests.Response()
+        response.url, response.status_code = row[0], row[1]
+        response.headers["Content-Type"] = row[2] or "application/json"
+        response.headers["X-Cache"] = "HIT"
+        response.encoding = "utf-8"
+        response._content = zlib.decompress(row[3])
+        return response
+
+    def put(self, kind: str, key: str, response: requests.Response) -> None:
+        """Сохраняет успешный ответ (в режиме on — только для видов с TTL > 0)."""
+        if response.status_code != 200 or self.mode in ("off", "replay"):
+            return
+        if self.mode == "on" and _ttl(kind) <= 0:
+            return
+
+        conn = self._conn()
+        conn.execute(
+            "INSERT OR REPLACE INTO responses (key, kind, url, status, content_type, body, created_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (key, kind, response.url, response.status_code, response.headers.get("Content-Type"),
+             zlib.compress(response.content), time.time())
+        )
+        conn.commit()
+        self._count(kind, "writes")
+
+    def purge(self, kind: Optional[str] = None) -> int:
+        """Удаляет все ответы (или только вида kind). Возвращает число строк."""
+        conn = self._conn()
+        if kind:
+            cursor = conn.execute("DELETE FROM responses WHERE kind = ?", (kind,))
+        else:
+            cursor = conn.execute("DELETE FROM responses")
+        conn.commit()
+        return cursor.rowcount
+
+    def get_stats(self) -> dict:
+        with self._stats_lock:
+            return {"mode": self.mode, "kinds": {kind: dict(stats) for kind, stats in self._stats.items()}}
+
+
+response_cache = ResponseCache()
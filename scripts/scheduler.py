@@ -1,80 +1,248 @@
+import os
 import logging
 import time
-from scripts.steam_parser import fetch_steam_pulse
+import threading
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from scripts.steam_parser import fetch_steam_online, fetch_steam_prices, STEAM_PRICE_BATCH_SIZE
 from models.game import Game
+from models.game_pulse_state import GamePulseState
 from models.game_genre import GameGenre
 from db import database
 from crud import find_or_create_genre
-from datetime import datetime, timezone
+from scripts.catalog_events import publish_catalog_event, notify_catalog_changed
+from scripts.job_lock import JobLock, JobBusyError, STOP_CHECK_INTERVAL, PULSE_JOB, RELEASES_JOB, PULSE_COMPACT_JOB
+from scripts.job_queue import JobProgress
+import crud
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+from sqlalchemy import or_
 
 
 logger = logging.getLogger("game_import")
 
-def update_released_games():
-    with database.get_session() as db:
-        now_utc = datetime.now(timezone.utc)
 
-        new_releases = db.query(Game).filter(
-            Game.release_date <= now_utc,
-            Game.is_available == False
-        ).all()
+# === РЕЛИЗЫ ===
+# Вместо опроса раз в минуту задача ставится ровно на ближайшую дату релиза (release_date)
+# и переставляется после каждого срабатывания и при импорте новой будущей игры.
+RELEASE_JOB_ID = "release_flip"
+# Страховочная перепроверка расписания: игры, добавленные другим процессом (например, через API)
+RELEASE_RESCAN_MINUTES = int(os.getenv("RELEASE_RESCAN_MINUTES", "30"))
+# Пауза перед повтором, если релизы сейчас переводит другой процесс
+RELEASE_RETRY_SECONDS = 5
 
-        if not new_releases:
-            return
+_scheduler = None
+_release_lock = threading.Lock()
 
-        logger.info(f"🕒 Detected mew releases: {len(new_releases)}. Updating...")
 
-        for game in new_releases:
-            game.is_available = True
-            logger.info(f"🔥 Game released: {game.title}. Game is now available 🔥")
+def attach_scheduler(scheduler) -> None:
+    """Запоминает планировщик процесса, чтобы arm_release_job мог переставлять задачу релизов."""
+    global _scheduler
+    _scheduler = scheduler
 
-        db.commit()
 
-logger2 = logging.getLogger("game_pulse")
+def arm_release_job(release_date: Optional[datetime] = None, not_before: Optional[datetime] = None) -> None:
+    """
+    Ставит update_released_games на ближайшую дату релиза.
+    release_date — дата только что добавленной игры: будильник переносится,
+    только если она раньше уже назначенного (без запроса в БД).
+    В процессе без планировщика (API) ничего не делает.
+    """
+    if _scheduler is None:
+        return
 
-# === ГЛОБАЛЬНЫЕ ФЛАГИ ДЛЯ УПРАВЛЕНИЯ ===
-IS_PULSE_RUNNING = False
-STOP_PULSE_FLAG = False
+    with _release_lock:
+        job = _scheduler.get_job(RELEASE_JOB_ID)
+        if release_date is not None:
+            if job and job.next_run_time and job.next_run_time <= release_date:
+                return
+            run_at = release_date
+        else:
+            with database.get_session() as db:
+                run_at = crud.game.get_next_release_date(db)
+            if run_at is None:
+                if job:
+                    job.remove()
+                return
 
+        run_at = max(run_at, not_before or datetime.now(timezone.utc))
+        _scheduler.add_job(update_released_games, "date", run_date=run_at, id=RELEASE_JOB_ID,
+                           replace_existing=True, misfire_grace_time=None)
+        logger.info(f"Следующая проверка релизов: {run_at.isoformat()}")
 
-def update_game_pulse_and_prices():
-    """Фоновая задача: обновляет ТОЛЬКО онлайн и цены для игр из Steam"""
-    global IS_PULSE_RUNNING, STOP_PULSE_FLAG
 
-    if IS_PULSE_RUNNING:
-        logger2.warning("Попытка запустить Game Pulse, но он уже работает!")
-        return
+def update_released_games():
+    # Во всех воркерах свой планировщик — выполняет только тот, кто взял блокировку
+    with JobLock(RELEASES_JOB) as lock:
+        if lock.acquired:
+            _flip_released_games()
+            arm_release_job()
+        else:
+            arm_release_job(not_before=datetime.now(timezone.utc) + timedelta(seconds=RELEASE_RETRY_SECONDS))
 
-    IS_PULSE_RUNNING = True
-    STOP_PULSE_FLAG = False
-    logger2.info("Запуск Game Pulse (Онлайн + Цены)...")
 
-    try:
-        with database.get_session() as db:
-            steam_games = db.query(Game).filter(Game.steam_app_id.isnot(None)).all()
+def _flip_released_games():
+    with database.get_session() as db:
+        released = crud.game.release_due_games(db, datetime.now(timezone.utc))
+        if not released:
+            return
 
-            if not steam_games:
-                logger2.info("Нет игр со steam_app_id для обновления.")
-                return
+        ids = [game_id for game_id, _ in released]
+        # Событие уйдёт в API-процессы (кэш и витрина) только вместе с commit
+        publish_catalog_event(db, "games_released", ids=ids)
+        db.commit()
 
-            updated_count = 0
-            for game in steam_games:
-                if STOP_PULSE_FLAG:
-                    logger2.info("🛑 ОБНОВЛЕНИЕ GAME PULSE ОСТАНОВЛЕНО ПО КОМАНДЕ!")
-                    break
+    for _, title in released:
+        logger.info(f"🔥 Game released: {title}. Game is now available 🔥")
+    logger.info(f"🕒 Released games: {len(released)}")
 
-                steam_data = fetch_steam_pulse(game.steam_app_id)
+logger2 = logging.getLogger("game_pulse")
 
-                game.current_online = steam_data["current_online"]
-                if steam_data["price"] is not None:
-                    game.price = steam_data["price"]
 
-                db.add(game)
-                db.commit()
+def compact_pulse_history():
+    """Сворачивает историю Game Pulse в почасовые/посуточные агрегаты и чистит старое."""
+    with JobLock(PULSE_COMPACT_JOB) as lock:
+        if not lock.acquired:
+            return
+        with database.get_session() as db:
+            crud.game_pulse.compact(db)
+            db.commit()
+    logger2.info("История Game Pulse свёрнута.")
+
+# Сколько запросов к Steam держим в полёте одновременно.
+# Реальную частоту ограничивают token bucket-ы по хостам (см. scripts/rate_limiter.py)
+PULSE_WORKERS = int(os.getenv("PULSE_WORKERS", "8"))
+# Отдельные потоки для пачек цен: их держит медленный лимит магазина (STEAM_STORE_RATE)
+PULSE_PRICE_WORKERS = int(os.getenv("PULSE_PRICE_WORKERS", "2"))
+
+# Сколько результатов копим перед одной пачечной записью в БД
+PULSE_WRITE_CHUNK = int(os.getenv("PULSE_WRITE_CHUNK", "500"))
+
+
+def update_game_pulse_and_prices(force: bool = False, job: Optional[JobProgress] = None):
+    """
+    Фоновая задача: обновляет ТОЛЬКО онлайн и цены для игр из Steam.
+    Берёт только игры, у которых подошло время по их приоритету (game_pulse_state),
+    горячие — первыми. force=True — обновить все игры вне расписания.
+    job — прогресс, если задача запущена из очереди (принудительный пульс из админки).
+    """
+    # Блокировка общая на кластер: сколько бы ни было воркеров, пульс идёт один
+    with JobLock(PULSE_JOB) as lock:
+        if not lock.acquired:
+            # Задача из очереди не теряется: воркер отложит её до освобождения блокировки
+            if job is not None:
+                raise JobBusyError("Game Pulse уже выполняется в другом процессе")
+            logger2.warning("Попытка запустить Game Pulse, но он уже работает!")
+            return
 
-                updated_count += 1
-                time.sleep(1.5)  # Защита от бана Steam API
+        logger2.info("Запуск Game Pulse (Онлайн + Цены)...")
+        _run_game_pulse(lock, force, job or JobProgress())
+
+
+def _run_game_pulse(lock: JobLock, force: bool, job: JobProgress):
+    with database.get_session() as db:
+        # Только (id, steam_app_id) — полные объекты Game для пульса не нужны
+        query = db.query(Game.id, Game.steam_app_id) \
+            .outerjoin(GamePulseState, GamePulseState.game_id == Game.id) \
+            .filter(Game.steam_app_id.isnot(None))
+        if not force:
+            query = query.filter(or_(
+                GamePulseState.next_refresh_at.is_(None),
+                GamePulseState.next_refresh_at <= datetime.now(timezone.utc)
+            ))
+        else:
+            # Чекпоинт принудительного пульса — время первого запуска: после перезапуска
+            # повторно обновляются только игры, которые до него не успели
+            since = job.checkpoint.get("since") or datetime.now(timezone.utc).isoformat()
+            job.report(since=since)
+            query = query.filter(or_(
+                GamePulseState.last_refresh_at.is_(None),
+                GamePulseState.last_refresh_at < datetime.fromisoformat(since)
+            ))
+        steam_games = query.order_by(GamePulseState.tier.asc().nullsfirst()).all()
+
+        if not steam_games:
+            logger2.info("Нет игр со steam_app_id, которым пора обновиться.")
+            return
+        job.set_total(job.processed + len(steam_games))
+
+        updated_count = 0
+        failed_count = 0
+        changed_count = 0
+        pending = []
+        started = time.monotonic()
+
+        def flush():
+            nonlocal changed_count
+            if pending:
+                changed_count += crud.game.bulk_update_pulse(db, pending)
+                crud.game_pulse.add_samples(db, pending)
+                # Приоритет пересчитываем уже по свежему онлайну
+                crud.game.refresh_pulse_tiers(db, [row[0] for row in pending])
+                db.commit()
+                job.report(processed=len(pending))
+                pending.clear()
+
+        # Цены — пачками по STEAM_PRICE_BATCH_SIZE appid на запрос в своём маленьком пуле
+        # (медленный лимит магазина не занимает потоки онлайна), онлайн — по одной игре.
+        # Оба потока результатов разбираются вместе: запись в БД и проверка отмены идут сразу,
+        # игра ждёт только цену своей пачки.
+        price_batches = [steam_games[i:i + STEAM_PRICE_BATCH_SIZE]
+                         for i in range(0, len(steam_games), STEAM_PRICE_BATCH_SIZE)]
+        batch_of_game = {game.id: n for n, batch in enumerate(price_batches) for game in batch}
+        prices = {}
+        done_batches = set()
+        waiting_price = defaultdict(list)  # пачка цен -> [(game, онлайн)], для которых ещё нет цены
+
+        with ThreadPoolExecutor(max_workers=PULSE_PRICE_WORKERS) as price_pool, \
+                ThreadPoolExecutor(max_workers=PULSE_WORKERS) as online_pool:
+            price_futures = {
+                price_pool.submit(fetch_steam_prices, [game.steam_app_id for game in batch]): n
+                for n, batch in enumerate(price_batches)
+            }
+            online_futures = {online_pool.submit(fetch_steam_online, game.steam_app_id): game for game in steam_games}
+
+            # Запись в БД — только из этого потока (сессия не потокобезопасна)
+            not_done = set(price_futures) | set(online_futures)
+            while not_done:
+                if job.should_stop(lock):
+                    logger2.info("🛑 ОБНОВЛЕНИЕ GAME PULSE ОСТАНОВЛЕНО ПО КОМАНДЕ!")
+                    for waiting in not_done:
+                        waiting.cancel()
+                    break
 
-            logger2.info(f"Успешно обновлен Game Pulse для {updated_count} игр!")
-    finally:
-        IS_PULSE_RUNNING = False
\ No newline at end of file
+                done, not_done = wait(not_done, timeout=STOP_CHECK_INTERVAL, return_when=FIRST_COMPLETED)
+                for future in done:
+                    if future in price_futures:
+                        batch = price_futures[future]
+                        prices.update(future.result())
+                        done_batches.add(batch)
+                        ready = waiting_price.pop(batch, [])
+                    else:
+                        game = online_futures[future]
+                        if batch_of_game[game.id] not in done_batches:
+                            waiting_price[batch_of_game[game.id]].append((game, future.result()))
+                            continue
+                        ready = [(game, future.result())]
+
+                    for game, online in ready:
+                        if online is None:
+                            # Онлайн не получен: игру не трогаем (ни онлайн, ни семпл, ни приоритет) —
+                            # next_refresh_at остаётся в прошлом, и её подберёт следующий запуск пульса
+                            failed_count += 1
+                            job.report(failed=1)
+                            continue
+                        pending.append((game.id, online, prices.get(game.steam_app_id)))
+                        updated_count += 1
+
+                if len(pending) >= PULSE_WRITE_CHUNK:
+                    flush()
+
+        flush()
+
+        elapsed = time.monotonic() - started
+        logger2.info(f"Успешно обновлен Game Pulse для {updated_count} игр "
+                     f"за {elapsed:.1f} с ({updated_count / max(elapsed, 0.001):.2f} игр/с), "
+                     f"изменилось строк: {changed_count}, без онлайна (повтор в следующий запуск): {failed_count}!")
+        if changed_count:
+            notify_catalog_changed("pulse_updated", changed=changed_count)
@@ -0,0 +1,199 @@
+"""
+Локальный индекс Steam: название приложения -> appid (из дампа ISteamApps/GetAppList).
+Поиск Steam ID при импорте становится поиском в памяти вместо запросов storesearch.
+
+Скачать/обновить дамп:
+    python -m scripts.steam_app_index --download
+Проверить сопоставление:
+    python -m scripts.steam_app_index "The Witcher 3: Wild Hunt"
+"""
+import os
+import re
+import sys
+import gzip
+import json
+import logging
+import threading
+import unicodedata
+from collections import defaultdict
+from difflib import SequenceMatcher
+from typing import Dict, List, Optional, Tuple
+
+from scripts.http_client import http_client
+from scripts.steam_parser import STEAM_API_BASE
+
+logger = logging.getLogger("steam_parser")
+
+STEAM_APP_LIST_PATH = os.getenv("STEAM_APP_LIST_PATH", "data/steam_app_list.json.gz")
+
+# Минимальная уверенность, с которой нечёткое совпадение принимается как Steam ID игры
+STEAM_MATCH_MIN_SCORE = float(os.getenv("STEAM_MATCH_MIN_SCORE", "0.85"))
+# Уверенность совпадения только без учёта издания ("Mafia" ~ "Mafia: Definitive Edition"):
+# у изданий свои appid, поэтому такое совпадение ниже порога и само не записывается
+EDITION_MATCH_SCORE = 0.75
+# Сколько кандидатов по общим словам сравнивать посимвольно
+MAX_FUZZY_CANDIDATES = 200
+
+# Приложения, которые не являются самой игрой (саундтреки, демо, серверы и т.п.)
+NON_GAME_PATTERN = re.compile(
+    r"(?i)\b(soundtrack|ost|demo|playtest|dedicated server|sdk|artbook|season pass|"
+    r"upgrade|bonus content|wallpapers?|trailer|beta)\b"
+)
+# Издания одной игры. "Part I/II" сюда не входят — это разные игры
+EDITION_PATTERN = re.compile(
+    r"(?i)\s*\b(remastered|director's cut|game of the year edition|definitive edition|hd remaster)\b"
+)
+
+# Римские номера частей приводятся к цифрам: "Red Dead Redemption II" == "Red Dead Redemption 2"
+ROMAN_NUMERALS = {"ii": "2", "iii": "3", "iv": "4", "v": "5", "vi": "6", "vii": "7", "viii": "8", "ix": "9"}
+
+
+def clean_game_title(title: str) -> str:
+    """Очистка названия для поиска в Steam (без изданий и знаков ™/®)."""
+    clean = EDITION_PATTERN.sub('', title)
+    return re.sub(r'[™®]', '', clean).strip()
+
+
+def normalize_title(title: str) -> str:
+    """Ключ сравнения: без диакритики, регистра и пунктуации (издание остаётся частью названия)."""
+    title = unicodedata.normalize("NFKD", re.sub(r'[™®]', '', title))
+    title = "".join(ch for ch in title if not unicodedata.combining(ch))
+    title = re.sub(r"[^\w\s]", " ", title.lower().replace("&", " and "))
+    return " ".join(ROMAN_NUMERALS.get(token, token) for token in title.split())
+
+
+def base_title(title: str) -> str:
+    """Ключ сравнения без издания: для запасного совпадения с пониженной уверенностью."""
+    return normalize_title(EDITION_PATTERN.sub('', title))
+
+
+class SteamAppIndex:
+    """
+    Индекс приложений Steam в памяти:
+    - точное совпадение нормализованного названия (вместе с изданием) — уверенность 1.0;
+    - иначе кандидаты по общим словам (начиная с самых редких) и оценка
+      как среднее посимвольной похожести и совпадения наборов слов (0..1);
+    - совпадение только без изданий — не выше EDITION_MATCH_SCORE (ниже порога записи).
+    """
+
+    def __init__(self, apps: List[dict]):
+        self._exact: Dict[str, int] = {}
+        self._base: Dict[str, int] = {}
+        self._names: List[str] = []
+        self._app_ids: List[int] = []
+        self._tokens: Dict[str, List[int]] = defaultdict(list)
+
+        for app in sorted(apps, key=lambda a: a.get("appid") or 0):
+            name, app_id = app.get("name"), app.get("appid")
+            if not name or not app_id or NON_GAME_PATTERN.search(name):
+                continue
+            key = normalize_title(name)
+            if not key:
+                continue
+            # При одинаковых названиях берём самый ранний appid — обычно это основная игра
+            if key in self._exact:
+                continue
+            self._exact[key] = app_id
+            self._base.setdefault(base_title(name), app_id)
+            position = len(self._names)
+            self._names.append(key)
+            self._app_ids.append(app_id)
+            for token in set(key.split()):
+                self._tokens[token].append(position)
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    @classmethod
+    def load(cls, path: str = STEAM_APP_LIST_PATH) -> "SteamAppIndex":
+        """Читает дамп GetAppList (JSON, можно .gz): {"applist": {"apps": [...]}} или просто список."""
+        opener = gzip.open if path.endswith(".gz") else open
+        with opener(path, "rt", encoding="utf-8") as f:
+            data = json.load(f)
+        apps = data.get("applist", {}).get("apps", []) if isinstance(data, dict) else data
+        index = cls(apps)
+        logger.info(f"Индекс Steam загружен из {path}: {len(index)} приложений")
+        return index
+
+    def match(self, title: str) -> Tuple[Optional[int], float]:
+        """Лучшее совпадение: (appid, уверенность 0..1) или (None, 0.0)."""
+        key = normalize_title(title)
+        if not key:
+            return None, 0.0
+        if key in self._exact:
+            return self._exact[key], 1.0
+
+        tokens = set(key.split())
+        numbers = {token for token in tokens if token.isdigit()}
+        candidates = set()
+        for token in sorted(tokens, key=lambda t: len(self._tokens.get(t, ()))):
+            candidates.update(self._tokens.get(token, ())[:MAX_FUZZY_CANDIDATES])
+            if len(candidates) >= MAX_FUZZY_CANDIDATES:
+                break
+
+        best_id, best_score = None, 0.0
+        base = base_title(title)
+        if base and base in self._base:
+            best_id, best_score = self._base[base], EDITION_MATCH_SCORE
+        for position in candidates:
+            name = self._names[position]
+            name_tokens = set(name.split())
+            # Номер части (после замены римских цифр) должен совпадать: "Mafia 3" — не "Mafia"
+            if numbers != {token for token in name_tokens if token.isdigit()}:
+                continue
+            token_score = len(tokens & name_tokens) / len(tokens | name_tokens)
+            score = (SequenceMatcher(None, key, name).ratio() + token_score) / 2
+            if score > best_score:
+                best_id, best_score = self._app_ids[position], score
+        return best_id, round(best_score, 3)
+
+    def resolve(self, title: str, min_score: float = STEAM_MATCH_MIN_SCORE) -> Optional[int]:
+        app_id, score = self.match(title)
+        return app_id if score >= min_score else None
+
+
+# === ОБЩИЙ ИНДЕКС ПРОЦЕССА ===
+_index: Optional[SteamAppIndex] = None
+_index_lock = threading.Lock()
+
+
+def get_steam_app_index() -> Optional[SteamAppIndex]:
+    """Индекс из STEAM_APP_LIST_PATH (загружается один раз). None — дампа нет."""
+    global _index
+    with _index_lock:
+        if _index is None and os.path.exists(STEAM_APP_LIST_PATH):
+            try:
+                _index = SteamAppIndex.load(STEAM_APP_LIST_PATH)
+            except Exception as e:
+                logger.error(f"Не удалось загрузить индекс Steam из {STEAM_APP_LIST_PATH}: {e}")
+        return _index
+
+
+def download_app_list(path: str = STEAM_APP_LIST_PATH) -> int:
+    """Скачивает свежий GetAppList и сохраняет в path (gzip). Возвращает число приложений."""
+    global _index
+    response = http_client.get(f"{STEAM_API_BASE}/ISteamApps/GetAppList/v2/", timeout=60)
+    response.raise_for_status()
+    apps = response.json().get("applist", {}).get("apps", [])
+
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = path + ".tmp"
+    with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+        json.dump({"applist": {"apps": apps}}, f)
+    os.replace(tmp_path, path)
+
+    with _index_lock:
+        _index = None
+    logger.info(f"Дамп приложений Steam сохранён: {path} ({len(apps)} приложений)")
+    return len(apps)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    if "--download" in sys.argv[1:]:
+        print(f"Сохранено приложений: {download_app_list()}")
+    index = get_steam_app_index()
+    if index is None:
+        sys.exit(f"Дамп не найден: {STEAM_APP_LIST_PATH} (запустите с --download)")
+    for title in (arg for arg in sys.argv[1:] if not arg.startswith("--")):
+        print(title, "->", index.match(title))
@@ -1,53 +1,153 @@
-import requests
+import os
 import logging
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
+
+from scripts.http_client import http_client
 
 logger = logging.getLogger("steam_parser")
 
+# Базовые адреса можно подменить (локальный стенд для бенчмарков, прокси)
+STEAM_API_BASE = os.getenv("STEAM_API_BASE", "https://api.steampowered.com")
+STEAM_STORE_BASE = os.getenv("STEAM_STORE_BASE", "https://store.steampowered.com")
 
-def fetch_steam_pulse(app_id: int) -> Dict[str, Any]:
-    """Быстрый запрос для планировщика: только онлайн и цена."""
-    result = {"current_online": 0, "price": None}
+# Лимиты запросов в секунду на хост (общие для всех потоков процесса).
+# На 429/5xx http_client сам снижает лимит хоста и повторяет запрос с паузой
+STEAM_API_RATE = float(os.getenv("STEAM_API_RATE", "10"))
+STEAM_STORE_RATE = float(os.getenv("STEAM_STORE_RATE", "1"))
+
+# Сколько appid отправлять в одном запросе цен (appdetails с filters=price_overview)
+STEAM_PRICE_BATCH_SIZE = int(os.getenv("STEAM_PRICE_BATCH_SIZE", "100"))
 
-    # 1. Онлайн
+
+def fetch_steam_online(app_id: int) -> Optional[int]:
+    """Текущий онлайн игры (None, если Steam не вернул данные — это не «0 игроков»)."""
     try:
-        stats_url = f"https://api.steampowered.com/ISteamUserStats/GetNumberOfCurrentPlayers/v1/?appid={app_id}"
-        response = requests.get(stats_url, timeout=5)
+        stats_url = f"{STEAM_API_BASE}/ISteamUserStats/GetNumberOfCurrentPlayers/v1/?appid={app_id}"
+        response = http_client.get(stats_url, rate=STEAM_API_RATE, timeout=5, cache="steam_pulse")
         if response.status_code == 200:
             data = response.json()
             if data.get("response", {}).get("result") == 1:
-                result["current_online"] = data["response"].get("player_count", 0)
+                return data["response"].get("player_count", 0)
     except Exception as e:
         logger.error(f"Ошибка онлайна Steam {app_id}: {e}")
+    return None
+
+
+def _parse_price(app_data: Dict[str, Any]) -> Optional[float]:
+    """Цена из ответа appdetails для одного приложения (None — нет данных)."""
+    if not app_data.get("success"):
+        return None
+    game_info = app_data.get("data")
+    if not isinstance(game_info, dict):
+        return None
+    if game_info.get("is_free"):
+        return 0.0
+    if "price_overview" in game_info:
+        final_price = game_info["price_overview"].get("final", 0)
+        return round(final_price / 100.0, 2)
+    return None
 
-    # 2. Цена (С фильтром price_overview для максимальной скорости)
+
+def _is_bad_batch(response) -> bool:
+    """
+    Steam отверг пачку из-за её содержимого (какой-то appid ему не нравится):
+    HTTP 400 или 200 с пустым/ошибочным телом (null, {"success": false}).
+    """
+    if response.status_code == 400:
+        return True
+    if response.status_code != 200:
+        return False
     try:
-        store_url = f"https://store.steampowered.com/api/appdetails?appids={app_id}&filters=price_overview"
-        response = requests.get(store_url, timeout=5)
-        if response.status_code == 200:
-            data = response.json()
-            app_data = data.get(str(app_id), {})
+        data = response.json()
+    except ValueError:
+        return True
+    return not isinstance(data, dict) or data.get("success") is False
 
-            if app_data.get("success"):
-                game_info = app_data.get("data", {})
-                if game_info.get("is_free"):
-                    result["price"] = 0.0
-                elif "price_overview" in game_info:
-                    final_price = game_info["price_overview"].get("final", 0)
-                    result["price"] = round(final_price / 100.0, 2)
+
+def _request_prices(app_ids: List[int]) -> Optional[Dict[int, Optional[float]]]:
+    """
+    Один запрос цен для пачки. None — Steam отверг пачку из-за её содержимого
+    (её стоит поделить); при прочих ошибках — пустые цены без повторов.
+    """
+    result: Dict[int, Optional[float]] = {app_id: None for app_id in app_ids}
+    try:
+        ids_param = ",".join(str(app_id) for app_id in app_ids)
+        store_url = f"{STEAM_STORE_BASE}/api/appdetails?appids={ids_param}&filters=price_overview"
+        response = http_client.get(store_url, rate=STEAM_STORE_RATE, timeout=10, cache="steam_pulse")
     except Exception as e:
-        logger.error(f"Ошибка цены Steam {app_id}: {e}")
+        logger.error(f"Ошибка цен Steam для пачки из {len(app_ids)} игр: {e}")
+        return result
+
+    if _is_bad_batch(response):
+        logger.warning(f"Steam отверг пачку цен из {len(app_ids)} игр (HTTP {response.status_code})")
+        return None
+    if response.status_code != 200:
+        logger.error(f"Ошибка цен Steam (HTTP {response.status_code}) для пачки из {len(app_ids)} игр, "
+                     f"цены пропущены")
+        return result
+
+    data = response.json()
+    for app_id in app_ids:
+        result[app_id] = _parse_price(data.get(str(app_id), {}))
+    return result
+
 
+def _split_rejected(app_ids: List[int], result: Dict[int, Optional[float]], budget: List[int]) -> None:
+    """
+    Пачка отвергнута: делим пополам и ищем "плохие" appid. Число запросов ограничено
+    budget (хватает на пару плохих игр): если отвергнуто всё подряд, дело не в одной игре.
+    """
+    if len(app_ids) <= 1:
+        return
+    middle = len(app_ids) // 2
+    for half in (app_ids[:middle], app_ids[middle:]):
+        if budget[0] <= 0:
+            logger.error(f"Лимит делений пачки цен Steam исчерпан, {len(half)} игр без цен")
+            continue
+        budget[0] -= 1
+        prices = _request_prices(half)
+        if prices is None:
+            _split_rejected(half, result, budget)
+        else:
+            result.update(prices)
+
+
+def fetch_steam_prices(app_ids: List[int]) -> Dict[int, Optional[float]]:
+    """
+    Пакетный запрос цен: appdetails?appids=1,2,3&filters=price_overview.
+    Каждой игре возвращается своя цена или None (нет данных/ошибка по этой игре).
+    Если Steam отверг пачку из-за её содержимого (400, пустой ответ) — она делится пополам,
+    чтобы одна "плохая" игра не лишала цен всех остальных. На 403/429/5xx, сетевые ошибки
+    и открытый автомат пачка не делится: повторы уже сделал http_client, а лишние
+    запросы в момент, когда Steam нас отвергает, только тратят лимит магазина.
+    """
+    if not app_ids:
+        return {}
+    prices = _request_prices(app_ids)
+    if prices is not None:
+        return prices
+
+    result: Dict[int, Optional[float]] = {app_id: None for app_id in app_ids}
+    # Один плохой appid находится за ~2*log2(n) запросов; бюджет — на два таких
+    _split_rejected(app_ids, result, [4 * len(app_ids).bit_length()])
     return result
 
 
+def fetch_steam_pulse(app_id: int) -> Dict[str, Any]:
+    """Быстрый запрос для одной игры: только онлайн и цена."""
+    return {
+        "current_online": fetch_steam_online(app_id),
+        "price": fetch_steam_prices([app_id])[app_id],
+    }
+
+
 def fetch_steam_tags(app_id: int) -> List[str]:
     """Тяжелый запрос: парсит только теги/жанры (выполняется один раз)."""
     tags = []
     try:
         # Тянем полную страницу (без фильтров), чтобы достать genres
-        store_url = f"https://store.steampowered.com/api/appdetails?appids={app_id}&l=russian"
-        response = requests.get(store_url, timeout=5)
+        store_url = f"{STEAM_STORE_BASE}/api/appdetails?appids={app_id}&l=russian"
+        response = http_client.get(store_url, rate=STEAM_STORE_RATE, timeout=5, cache="steam_tags")
 
         if response.status_code == 200:
             data = response.json()
@@ -0,0 +1,45 @@
+"""Автомат хоста в http_client: пробный запрос в half-open завершается при любом исходе."""
+import time
+
+from scripts.http_client import CircuitBreaker
+
+
+def _open_breaker() -> CircuitBreaker:
+    breaker = CircuitBreaker(threshold=2, cooldown=0.05)
+    breaker.record_failure()
+    breaker.record_failure()
+    assert not breaker.allow()
+    time.sleep(0.06)
+    return breaker
+
+
+def test_probe_success_closes_breaker():
+    breaker = _open_breaker()
+    assert breaker.allow()
+    assert not breaker.allow()  # пока идёт проба, остальные ждут
+    breaker.record_success()
+    assert breaker.allow()
+
+
+def test_probe_failure_reopens_breaker():
+    breaker = _open_breaker()
+    assert breaker.allow()
+    breaker.record_failure()
+    assert not breaker.allow()
+    time.sleep(0.06)
+    assert breaker.allow()
+
+
+def test_throttled_probe_does_not_block_host_forever():
+    breaker = _open_breaker()
+    assert breaker.allow()
+    breaker.record_throttled()  # проба получила 429
+    assert not breaker.allow()  # новая пауза...
+    time.sleep(0.06)
+    assert breaker.allow()      # ...после которой снова можно пробовать
+
+
+def test_throttled_when_closed_is_not_a_failure():
+    breaker = CircuitBreaker(threshold=1, cooldown=60)
+    breaker.record_throttled()
+    assert breaker.allow()
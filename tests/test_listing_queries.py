@@ -0,0 +1,92 @@
+"""
+Регрессия листинга /games/ (двухфазная загрузка, см. CRUDGame.get_page_ids):
+число SQL-запросов на страницу не зависит от её размера, а число строк из БД
+пропорционально размеру страницы (а не произведению игр на жанры).
+Нужна БД с применёнными миграциями и играми с жанрами; без БД тесты пропускаются.
+"""
+from contextlib import contextmanager
+
+import pytest
+from sqlalchemy import event, func
+from sqlalchemy.exc import OperationalError
+
+from db import database
+from models.game_genre import GameGenre
+from models.genre import Genre
+import crud
+
+PAGE_SIZES = (5, 50)
+
+
+@contextmanager
+def count_queries():
+    """Считает выполненные запросы и строки, которые они вернули."""
+    stats = {"statements": 0, "rows": 0}
+
+    def before(conn, cursor, statement, parameters, context, executemany):
+        stats["statements"] += 1
+
+    def after(conn, cursor, statement, parameters, context, executemany):
+        if cursor.description is not None:
+            stats["rows"] += max(cursor.rowcount, 0)
+
+    event.listen(database.engine, "before_cursor_execute", before)
+    event.listen(database.engine, "after_cursor_execute", after)
+    try:
+        yield stats
+    finally:
+        event.remove(database.engine, "before_cursor_execute", before)
+        event.remove(database.engine, "after_cursor_execute", after)
+
+
+@pytest.fixture(scope="module")
+def genre_name():
+    """Самый частый жанр: фильтр по нему раньше размножал строки игр через JOIN."""
+    try:
+        with database.get_session() as db:
+            row = db.query(Genre.name).join(GameGenre, GameGenre.genre_id == Genre.id) \
+                .group_by(Genre.name).order_by(func.count().desc()).first()
+    except OperationalError:
+        pytest.skip("Нет подключения к БД")
+    if row is None:
+        pytest.skip("В БД нет игр с жанрами")
+    return row[0]
+
+
+def _genre_links(ids) -> int:
+    with database.get_session() as db:
+        return db.query(func.count()).select_from(GameGenre).filter(GameGenre.game_id.in_(ids)).scalar()
+
+
+def _measure(method, limit: int, genre_name: str):
+    filters = {"limit": limit, "genre_name": genre_name, "sort_by": "rating", "sort_order": "desc"}
+    with database.get_session() as db:
+        with count_queries() as stats:
+            games = getattr(crud.game, method)(db, **filters)
+    ids = [g["id"] if isinstance(g, dict) else g.id for g in games]
+    return ids, stats
+
+
+def test_list_items_query_and_row_count(genre_name):
+    """Путь /games/: id страницы, игры с разработчиком, жанры — ровно три запроса."""
+    statements = set()
+    for limit in PAGE_SIZES:
+        ids, stats = _measure("get_multi_items", limit, genre_name)
+        assert 0 < len(ids) <= limit
+        statements.add(stats["statements"])
+        # id страницы + по строке на игру + по строке на связь игра-жанр
+        assert stats["rows"] == 2 * len(ids) + _genre_links(ids)
+    assert statements == {3}
+
+
+def test_orm_listing_query_and_row_count(genre_name):
+    """ORM-путь (get_multi): id страницы + игры + selectin-загрузки связей, без JOIN-размножения."""
+    statements = set()
+    for limit in PAGE_SIZES:
+        ids, stats = _measure("get_multi", limit, genre_name)
+        assert 0 < len(ids) <= limit
+        statements.add(stats["statements"])
+        # id + игры + разработчики (<= игр) + связи + жанры (<= связей)
+        assert stats["rows"] <= 3 * len(ids) + 2 * _genre_links(ids)
+    # selectin-запрос связи пропускается, если грузить нечего (например, у страницы нет разработчиков)
+    assert max(statements) <= 5
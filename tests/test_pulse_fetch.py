@@ -0,0 +1,181 @@
+"""
+Game Pulse против локального стенда вместо Steam (сеть и БД не нужны): настоящий
+_run_game_pulse с fetch_steam_online / fetch_steam_prices и общим http_client.
+Подменяются только источник игр (сессия БД) и запись результатов в crud.
+Проверяется: параллельность ограничена пулами и семафором хоста, лимитер на 429
+выдерживает Retry-After для всех потоков, а пропускная способность не ниже минимума.
+API и магазин — два стенда (разные хосты, как у Steam: у каждого свой лимит).
+"""
+import json
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+import pytest
+
+import crud
+import scripts.scheduler as scheduler
+import scripts.steam_parser as steam_parser
+from scripts.http_client import http_client, PER_HOST_CONCURRENCY
+from scripts.job_queue import JobProgress
+
+GAMES = 300
+LATENCY = 0.02
+API_RATE = 200.0
+STORE_RATE = 20.0
+MIN_GAMES_PER_SECOND = 50
+
+
+class StandInSteam(ThreadingHTTPServer):
+    """Отвечает как GetNumberOfCurrentPlayers и appdetails; считает параллельные запросы."""
+    daemon_threads = True
+
+    def __init__(self, throttle_first: int = 0):
+        super().__init__(("127.0.0.1", 0), StandInHandler)
+        self.throttle_first = throttle_first  # сколько первых запросов онлайна получат 429
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.online_requests = []            # (время прихода, статус ответа)
+
+    @property
+    def base(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def _send(self, status: int, payload, headers: dict = None):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.in_flight += 1
+            server.max_in_flight = max(server.max_in_flight, server.in_flight)
+        try:
+            time.sleep(LATENCY)
+            url = urlparse(self.path)
+            params = parse_qs(url.query)
+            if "GetNumberOfCurrentPlayers" in url.path:
+                with server.lock:
+                    throttled = len(server.online_requests) < server.throttle_first
+                    server.online_requests.append((time.monotonic(), 429 if throttled else 200))
+                if throttled:
+                    return self._send(429, {}, {"Retry-After": "1"})
+                app_id = int(params["appid"][0])
+                return self._send(200, {"response": {"result": 1, "player_count": app_id * 3}})
+
+            app_ids = params["appids"][0].split(",")
+            return self._send(200, {
+                app_id: {"success": True, "data": {"price_overview": {"final": int(app_id) * 10}}}
+                for app_id in app_ids
+            })
+        finally:
+            with server.lock:
+                server.in_flight -= 1
+
+
+class FakeQuery:
+    """Цепочка db.query(...).outerjoin(...).filter(...).order_by(...).all() из _run_game_pulse."""
+
+    def __init__(self, rows):
+        self.rows = rows
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: self
+
+    def all(self):
+        return self.rows
+
+
+class FakeSession:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def query(self, *columns):
+        return FakeQuery(self.rows)
+
+    def commit(self):
+        pass
+
+
+class NeverStop:
+    def should_stop(self) -> bool:
+        return False
+
+
+@contextmanager
+def stand_in_steam(monkeypatch, throttle_first: int = 0):
+    """Два стенда (API и магазин) на свободных портах; отдаёт (api, store)."""
+    api, store = StandInSteam(throttle_first), StandInSteam()
+    for server in (api, store):
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+    monkeypatch.setattr(steam_parser, "STEAM_API_BASE", api.base)
+    monkeypatch.setattr(steam_parser, "STEAM_STORE_BASE", store.base)
+    monkeypatch.setattr(steam_parser, "STEAM_API_RATE", API_RATE)
+    monkeypatch.setattr(steam_parser, "STEAM_STORE_RATE", STORE_RATE)
+    try:
+        yield api, store
+    finally:
+        for server in (api, store):
+            server.shutdown()
+            server.server_close()
+
+
+def _run_pulse(monkeypatch, games: int) -> tuple:
+    """Запускает _run_game_pulse по играм 1..games, возвращает (записанные строки, секунды)."""
+    rows = [type("Row", (), {"id": n, "steam_app_id": n})() for n in range(1, games + 1)]
+    written = []
+
+    @contextmanager
+    def get_session():
+        yield FakeSession(rows)
+
+    monkeypatch.setattr(scheduler.database, "get_session", get_session)
+    monkeypatch.setattr(crud.game, "bulk_update_pulse", lambda db, pending: written.extend(pending) or len(pending))
+    monkeypatch.setattr(crud.game_pulse, "add_samples", lambda db, pending: None)
+    monkeypatch.setattr(crud.game, "refresh_pulse_tiers", lambda db, ids: None)
+    monkeypatch.setattr(scheduler, "notify_catalog_changed", lambda *args, **kwargs: None)
+
+    started = time.monotonic()
+    scheduler._run_game_pulse(NeverStop(), False, JobProgress())
+    return written, time.monotonic() - started
+
+
+def test_pulse_bounded_concurrency_and_throughput(monkeypatch):
+    with stand_in_steam(monkeypatch) as (api, store):
+        written, elapsed = _run_pulse(monkeypatch, GAMES)
+
+    assert sorted(written) == [(n, n * 3, round(n * 10 / 100.0, 2)) for n in range(1, GAMES + 1)]
+    # Параллельно не больше потоков пула и семафора хоста, но и не по одному
+    assert 1 < api.max_in_flight <= min(PER_HOST_CONCURRENCY, scheduler.PULSE_WORKERS)
+    assert store.max_in_flight <= min(PER_HOST_CONCURRENCY, scheduler.PULSE_PRICE_WORKERS)
+    assert GAMES / elapsed >= MIN_GAMES_PER_SECOND, f"{GAMES / elapsed:.1f} игр/с"
+
+
+def test_pulse_backs_off_on_429(monkeypatch):
+    with stand_in_steam(monkeypatch, throttle_first=1) as (api, store):
+        written, _ = _run_pulse(monkeypatch, 40)
+
+    # Запрос, получивший 429, повторён, и все игры записаны с онлайном
+    assert sorted(row[0] for row in written) == list(range(1, 41))
+    assert all(online is not None for _, online, _ in written)
+    assert http_client.get_stats()[urlparse(api.base).netloc]["retries"] >= 1
+
+    # После 429 с Retry-After: 1 лимитер хоста держит паузу для всех потоков: кроме запросов,
+    # ушедших одновременно с ним, следующие приходят не раньше, чем через секунду
+    throttled_at = next(at for at, status in api.online_requests if status == 429)
+    assert not [at for at, _ in api.online_requests if throttled_at + 0.2 < at < throttled_at + 0.9]
+    assert max(at for at, _ in api.online_requests) >= throttled_at + 0.9
@@ -0,0 +1,115 @@
+"""
+Планы горячих запросов витрины и каталога: каждый идёт по индексу, без узла Sort,
+а keyset-условие курсора — в Index Cond (а не Filter поверх полного прохода индекса).
+Настройки планировщика не трогаются: в транзакции досеивается SEED_ROWS игр и делается
+ANALYZE, чтобы выбор плана был как на боевом объёме. Всё откатывается в конце модуля.
+Нужна БД с применёнными миграциями; без БД тесты пропускаются.
+Сортировки, оставленные без индекса намеренно, перечислены в crud.UNINDEXED_SORTS.
+"""
+import json
+from datetime import datetime, timezone
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+
+from db import database
+import crud
+
+SEED_ROWS = 50_000
+
+# Значения для курсора второй страницы (план keyset-запроса не зависит от конкретного значения)
+CURSOR_SAMPLES = {
+    "release_date": datetime(2020, 1, 1, tzinfo=timezone.utc),
+    "avg_rating": Decimal("5"),
+    "title": "m",
+    "price": 10.0,
+    "current_online": 100,
+}
+
+
+def _hot_queries(db) -> dict:
+    """Запросы строятся теми же методами crud, что и в API: план проверяется у реального SQL."""
+    queries = {f"showcase.{name}": query for name, query in crud.game.showcase_queries(db).items()}
+    # Ближайший релиз для будильника планировщика (scripts/scheduler.py: arm_release_job)
+    queries["releases.next"] = crud.game.next_release_query(db)
+
+    # Листинг каталога (фаза 1 — только id): первая страница, страница по курсору и хвост с NULL
+    for sort_by in crud.SORT_FIELDS:
+        key = crud.game.get_order_col(sort_by).key
+        cursor = crud.game.encode_cursor({"id": 1, key: CURSOR_SAMPLES[key]}, sort_by)
+        null_cursor = crud.game.encode_cursor({"id": 10 ** 9, key: None}, sort_by)
+        for sort_order in crud.SORT_ORDERS:
+            name = f"catalog.{sort_by}.{sort_order}"
+            queries[name] = crud.game.page_ids_query(db, sort_by=sort_by, sort_order=sort_order)
+            queries[f"{name}.cursor"] = crud.game.page_ids_query(
+                db, sort_by=sort_by, sort_order=sort_order, cursor=cursor
+            )
+            queries[f"{name}.null_tail"] = crud.game.page_ids_query(
+                db, sort_by=sort_by, sort_order=sort_order, cursor=cursor, null_tail=True
+            )
+            queries[f"{name}.null_cursor"] = crud.game.page_ids_query(
+                db, sort_by=sort_by, sort_order=sort_order, cursor=null_cursor
+            )
+    return queries
+
+
+# Имена для параметризации: запросы собираются без подключения, выполнять их не нужно
+QUERY_NAMES = list(_hot_queries(Session()))
+
+
+@pytest.fixture(scope="module")
+def seeded_db():
+    """Сессия с досеянными играми (NULL-ы в колонках сортировки — как в реальном каталоге)."""
+    try:
+        with database.get_session() as db:
+            db.execute(text("""
+                INSERT INTO games (title, release_date, is_available, avg_rating, current_online, price)
+                SELECT 'Plan check ' || md5(n::text),
+                       CASE WHEN n % 10 = 0 THEN NULL
+                            ELSE timestamptz '1990-01-01' + (n % 15000) * interval '1 day' END,
+                       n % 3 <> 0,
+                       CASE WHEN n % 10 = 1 THEN NULL ELSE (n % 1000) / 100.0 END,
+                       CASE WHEN n % 10 = 2 THEN NULL ELSE (n * 7919) % 100000 END,
+                       CASE WHEN n % 5 = 3 THEN NULL ELSE (n % 6000) / 100.0 END
+                FROM generate_series(1, :rows) AS n
+            """), {"rows": SEED_ROWS})
+            db.execute(text("ANALYZE games"))
+            yield db
+            db.rollback()
+    except OperationalError:
+        pytest.skip("Нет подключения к БД")
+
+
+def _plan(db, query) -> dict:
+    sql = str(query.statement.compile(dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}))
+    raw = db.execute(text("EXPLAIN (FORMAT JSON) " + sql)).scalar()
+    return (json.loads(raw) if isinstance(raw, str) else raw)[0]["Plan"]
+
+
+def _nodes(plan: dict):
+    yield plan
+    for child in plan.get("Plans", []):
+        yield from _nodes(child)
+
+
+@pytest.mark.parametrize("name", QUERY_NAMES)
+def test_hot_query_uses_index_without_sort(seeded_db, name):
+    if name.startswith("catalog.") and tuple(name.split(".")[1:3]) in crud.UNINDEXED_SORTS:
+        pytest.skip("Без индекса намеренно, см. crud.UNINDEXED_SORTS")
+
+    plan = _plan(seeded_db, _hot_queries(seeded_db)[name])
+    nodes = list(_nodes(plan))
+    node_types = [node["Node Type"] for node in nodes]
+    assert not {"Sort", "Incremental Sort"} & set(node_types), json.dumps(plan, indent=2)
+    assert {"Index Scan", "Index Only Scan"} & set(node_types), json.dumps(plan, indent=2)
+
+    index_conds = " ".join(node.get("Index Cond", "") for node in nodes)
+    if name.endswith(".cursor"):
+        # (col, id) < (значение, id) — граница диапазона индекса, а не фильтр строк
+        assert "ROW(" in index_conds, json.dumps(plan, indent=2)
+    elif name.endswith((".null_tail", ".null_cursor")):
+        assert "IS NULL" in index_conds, json.dumps(plan, indent=2)
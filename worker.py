@@ -0,0 +1,140 @@
+"""
+Отдельный процесс для фоновой работы: планировщик (релизы, Game Pulse, агрегаты)
+и задачи из админки, которые API ставит в очередь (таблица jobs).
+
+Запуск:
+    python -m worker
+
+Процессов-воркеров может быть несколько: задачи из очереди забираются через
+FOR UPDATE SKIP LOCKED, а периодические задачи защищены advisory lock-ами (JobLock).
+"""
+import os
+import signal
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from apscheduler.schedulers.background import BackgroundScheduler
+
+from scripts.scheduler import update_game_pulse_and_prices, compact_pulse_history, \
+    attach_scheduler, arm_release_job, RELEASE_RESCAN_MINUTES
+from scripts.admin_jobs import run_background_import, run_sync_steam_tags, run_update_steam_ids
+from scripts.job_queue import claim_next_job, finish_job, requeue_stale_jobs, requeue_busy_job, JobProgress
+from scripts.job_lock import JobBusyError, IMPORT_JOB, STEAM_TAGS_JOB, STEAM_IDS_JOB, PULSE_JOB
+
+logger = logging.getLogger("worker")
+
+# Сколько задач из очереди выполняется одновременно (импорт, теги, пульс — разные задачи)
+WORKER_CONCURRENCY = int(os.getenv("WORKER_CONCURRENCY", "2"))
+# Как часто проверять очередь, если она пуста
+WORKER_POLL_SECONDS = float(os.getenv("WORKER_POLL_SECONDS", "2"))
+
+# Вид задачи -> функция, которая её выполняет (params из таблицы jobs передаются как kwargs,
+# плюс job — JobProgress для счётчиков, чекпоинта и отмены)
+JOB_HANDLERS = {
+    IMPORT_JOB: run_background_import,
+    STEAM_TAGS_JOB: run_sync_steam_tags,
+    STEAM_IDS_JOB: run_update_steam_ids,
+    PULSE_JOB: update_game_pulse_and_prices,
+}
+
+
+def create_scheduler() -> BackgroundScheduler:
+    scheduler = BackgroundScheduler()
+    attach_scheduler(scheduler)
+
+    # Релизы: задача ставится на ближайшую release_date (сразу после старта — по БД),
+    # плюс редкая страховочная перепроверка расписания
+    scheduler.add_job(arm_release_job)
+    scheduler.add_job(arm_release_job, "interval", minutes=RELEASE_RESCAN_MINUTES)
+
+    # Game Pulse (Онлайн + Цены) - каждые 5 минут берёт игры, которым пора
+    # обновиться по их приоритету (горячие — раз в 5 минут, хвост — раз в сутки)
+    scheduler.add_job(update_game_pulse_and_prices, "interval", minutes=5)
+
+    # Сворачивание истории Game Pulse в агрегаты (графики читают только их)
+    scheduler.add_job(compact_pulse_history, "interval", minutes=15)
+
+    # Задачи упавших воркеров — обратно в очередь (продолжатся с чекпоинта)
+    scheduler.add_job(requeue_stale_jobs)
+    scheduler.add_job(requeue_stale_jobs, "interval", minutes=1)
+    return scheduler
+
+
+def run_job(job) -> None:
+    handler = JOB_HANDLERS.get(job.kind)
+    if handler is None:
+        finish_job(job.id, error=f"Неизвестный вид задачи: {job.kind}")
+        return
+
+    progress = JobProgress.for_job(job)
+    if progress.checkpoint:
+        logger.info(f"Задача #{job.id} ({job.kind}) продолжается с чекпоинта {progress.checkpoint}")
+    logger.info(f"Задача #{job.id} ({job.kind}) запущена: {job.params}")
+    try:
+        handler(**(job.params or {}), job=progress)
+    except JobBusyError as e:
+        # Ничего не сделано — это не успех и (пока) не ошибка: повторим позже
+        if requeue_busy_job(job.id):
+            logger.info(f"Задача #{job.id} ({job.kind}) отложена: {e}")
+        else:
+            logger.error(f"Задача #{job.id} ({job.kind}) не дождалась блокировки: {e}")
+        return
+    except Exception as e:
+        logger.exception(f"Задача #{job.id} ({job.kind}) упала: {e}")
+        progress.flush()
+        finish_job(job.id, error=str(e))
+        return
+    progress.flush()
+    finish_job(job.id, cancelled=progress.cancelled)
+    logger.info(f"Задача #{job.id} ({job.kind}) {'отменена' if progress.cancelled else 'завершена'}: "
+                f"обработано {progress.processed}, ошибок {progress.failed}")
+
+
+def consume_jobs(stop_event: threading.Event) -> None:
+    """Цикл очереди: забирает задачи, пока есть свободные потоки, до stop_event."""
+    slots = threading.BoundedSemaphore(WORKER_CONCURRENCY)
+
+    def release_slot(_future):
+        slots.release()
+
+    with ThreadPoolExecutor(max_workers=WORKER_CONCURRENCY) as pool:
+        while not stop_event.is_set():
+            # Не забираем задачу из очереди, пока нет свободного потока для неё
+            if not slots.acquire(timeout=WORKER_POLL_SECONDS):
+                continue
+            try:
+                job = claim_next_job()
+            except Exception as e:
+                logger.error(f"Не удалось прочитать очередь задач: {e}")
+                job = None
+
+            if job is None:
+                slots.release()
+                stop_event.wait(WORKER_POLL_SECONDS)
+                continue
+
+            pool.submit(run_job, job).add_done_callback(release_slot)
+
+        logger.info("Очередь задач остановлена: ждём завершения текущих задач...")
+
+
+def run_worker() -> None:
+    stop_event = threading.Event()
+    signal.signal(signal.SIGINT, lambda *_: stop_event.set())
+    signal.signal(signal.SIGTERM, lambda *_: stop_event.set())
+
+    scheduler = create_scheduler()
+    scheduler.start()
+    logger.info("Воркер запущен: планировщик и очередь задач активны.")
+
+    try:
+        consume_jobs(stop_event)
+    finally:
+        scheduler.shutdown()
+    logger.info("Воркер остановлен.")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s %(levelname)s %(message)s")
+    run_worker()